@@ -0,0 +1,118 @@
+import numpy as np
+import os
+from PyLnD.loads.file_cache import file_signature, save_npz, load_npz, same_file
+from PyLnD.loads.dof_index import DOFINDEX
+from PyLnD.loads.phi import PHI
+from PyLnD.loads.eig import EIG
+from PyLnD.loads.ltm import LTM
+
+
+def save_bundle(scr, name, dofs=None):
+    """Function to write the model of a SCR object to one model bundle file, an uncompressed npz.
+
+        The bundle holds PHI, the eigenvalues and frequencies, the LTM with its HWLIST labels and RSS index and the
+        damping, and the signature of each file they were read from.
+
+        inputs: scr <SCR object with PHI, EIG and LTM loaded (and the LTM labelled with the HWLIST)>
+                name <bundle file>
+                dofs <keep only these PHI dofs, e.g. the applied load dofs, default all>
+
+        Ex:  save_bundle(scr, 'xp93s1_model.npz')
+    """
+    if not scr.phi or not scr.eig or not scr.ltm:
+        raise Exception('!!! PHI, EIG and LTM must be loaded to save a model bundle !!!')
+
+    # Keep only the requested PHI dofs.
+    phi = scr.phi.phi
+    phi_dofs = scr.phi.dofs
+    if dofs is not None:
+        rows = scr.phi.dof_index.find(dofs)
+        if (rows < 0).any():
+            missing = [dof for dof, i in zip(dofs, rows) if i < 0]
+            raise Exception('!!! DOF {0} not in PHI !!!'.format(missing))
+        phi = phi[rows]
+        phi_dofs = [phi_dofs[i] for i in rows]
+
+    # The LTM labels, None where a LTM row is not in the HWLIST.
+    acron_dofs = scr.ltm.acron_dofs
+    labelled = np.array([item is not None for item in acron_dofs], dtype=bool)
+    acron = np.array([item[0] if item is not None else '' for item in acron_dofs], dtype=str)
+    acron_dof = np.array([item[1] if item is not None else '' for item in acron_dofs], dtype=str)
+
+    # Sign the source files so a stale bundle is found.
+    sources = [('phi_op4', scr.phi.op4file), ('phi_f06', scr.phi.f06file), ('eig', scr.eig.name),
+               ('ltm', scr.ltm.name)]
+    if scr.hwlist:
+        sources.append(('hwlist', scr.hwlist.name))
+
+    save_npz(name, phi=phi, phi_dofs=np.array(phi_dofs, dtype=np.int64).reshape(-1, 2),
+             phi_grids=np.array(list(dict.fromkeys([dof[0] for dof in phi_dofs])), dtype=np.int64),
+             phi_name=np.array(scr.phi.phi_name, dtype=str), first_mode=np.array(scr.phi.first_mode),
+             eigenvalues=np.asarray(scr.eig.eigenvalues, dtype=float),
+             frequency=np.asarray(scr.eig.frequency, dtype=float),
+             atm=scr.ltm.atm, dtm=scr.ltm.dtm, ltm_dofs=np.array(scr.ltm.dofs, dtype=np.int64).reshape(-1, 2),
+             ltm_types=np.array(scr.ltm.types, dtype=str), labelled=labelled, acron=acron, acron_dof=acron_dof,
+             rss_ptr=np.asarray(scr.ltm.rss_ptr, dtype=np.int64), rss_idx=np.asarray(scr.ltm.rss_idx, dtype=np.int64),
+             zeta=np.asarray(scr.zeta, dtype=float),
+             sources=np.array([[kind, source] for kind, source in sources], dtype=str),
+             signatures=np.array([file_signature(source) for kind, source in sources], dtype=str))
+
+
+def load_bundle(name, check='yes'):
+    """Function to load the model from a model bundle file written by save_bundle.
+
+        The arrays (PHI, ATM, DTM) are read only views of a memory map of the bundle, read as they are used.  With
+        check, a source file that still exists but changed since the bundle was written raises an exception.
+
+        inputs: name <bundle file>
+                check <'yes' to check the source files, 'no' to skip>
+        outputs: phi <PHI>, eig <EIG>, ltm <LTM>, zeta <damping of each mode>
+
+        Ex:  phi, eig, ltm, zeta = load_bundle('xp93s1_model.npz')
+    """
+    z = load_npz(name)
+
+    # Check the bundle against the files it was made from.
+    if check in ['yes', True]:
+        for (kind, source), signature in zip(z['sources'].tolist(), z['signatures'].tolist()):
+            if os.path.exists(source) and not same_file(source, signature):
+                raise Exception('!!! Model bundle {0} is stale, the {1} file {2} changed !!!'.format(
+                    name, kind, source))
+    sources = dict(z['sources'].tolist())
+
+    # Rebuild the PHI, EIG and LTM objects without reading their files.
+    phi = PHI.__new__(PHI)
+    phi.op4file = sources['phi_op4']
+    phi.f06file = sources['phi_f06']
+    phi.grids = z['phi_grids'].tolist()
+    phi.dofs = list(zip(z['phi_dofs'][:, 0].tolist(), z['phi_dofs'][:, 1].tolist()))
+    phi.dof_index = DOFINDEX(z['phi_dofs'])
+    phi.phi_name = z['phi_name'].item()
+    phi.phi = z['phi']
+    phi.num_dofs, phi.num_modes = phi.phi.shape
+    phi.modes = None
+    phi.first_mode = int(z['first_mode']) if 'first_mode' in z.keys() else 1
+
+    eig = EIG.__new__(EIG)
+    eig.name = sources['eig']
+    eig.eigenvalues = z['eigenvalues']
+    eig.frequency = z['frequency']
+
+    ltm = LTM.__new__(LTM)
+    ltm.name = sources['ltm']
+    ltm.mmap = 'yes'
+    ltm.atm = z['atm']
+    ltm.dtm = z['dtm']
+    ltm.num_ltms, ltm.num_modes = ltm.dtm.shape
+    ltm.dofs = list(zip(z['ltm_dofs'][:, 0].tolist(), z['ltm_dofs'][:, 1].tolist()))
+    ltm.dof_index = DOFINDEX(z['ltm_dofs'])
+    ltm.types = z['ltm_types'].tolist()
+    ltm.acron_dofs = [(a, d) if labelled else None
+                      for a, d, labelled in zip(z['acron'].tolist(), z['acron_dof'].tolist(), z['labelled'].tolist())]
+    ltm.rss_ptr = np.array(z['rss_ptr'])
+    ltm.rss_idx = np.array(z['rss_idx'])
+    ltm.rss_labels = ltm.acron_dofs[ltm.num_ltms:]
+    ltm.index_acron()
+
+    return phi, eig, ltm, np.array(z['zeta'])
+
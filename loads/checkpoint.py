@@ -0,0 +1,68 @@
+import numpy as np
+import hashlib
+import os
+from PyLnD.loads.file_cache import save_npz
+
+
+def checkpoint_files(checkpoint_dir, name, case):
+    """Function to name the checkpoint state file and modal displacement history file of a case."""
+    base = os.path.join(checkpoint_dir, '{0}_case{1}'.format(name, case))
+    return base + '_ckpt.npz', base + '_eta.npy'
+
+
+def run_key(method, *arrays):
+    """Function to key a run by its integration method and inputs (time, time step, modal force, modes, damping
+        and LTM signature), so a checkpoint is only resumed by the run that wrote it.  Strings are keyed as text,
+        everything else as a float array."""
+    h = hashlib.sha1(method.encode())
+    for v in arrays:
+        if isinstance(v, str):
+            h.update(v.encode())
+            continue
+        v = np.ascontiguousarray(v, dtype=float)
+        h.update(str(v.shape).encode())
+        h.update(v.tobytes())
+    return h.hexdigest()
+
+
+def ltm_signature(ltm):
+    """Function to sign a LTM for run_key, by its file (path, size and modification time) and shape when it was
+        read from a LTMFILE, otherwise by its matrices.
+
+        Ex:  sig = ltm_signature(scr.ltm)
+    """
+    name = getattr(ltm, 'name', '')
+    if isinstance(name, str) and os.path.isfile(name):
+        stat = os.stat(name)
+        return '{0}:{1}:{2}:{3}'.format(os.path.abspath(name), stat.st_size, stat.st_mtime_ns, ltm.dtm.shape)
+    return run_key('ltm', ltm.dtm, ltm.atm)
+
+
+def save_checkpoint(state_file, key, **state):
+    """Function to write the state of a run, replacing the previous checkpoint in one step.
+
+        Ex:  save_checkpoint('xp93_case1_ckpt.npz', key, i=np.array(i1), eta=eta_last, etad=etad_last)
+    """
+    save_npz(state_file, key=np.array(key), **state)
+
+
+def read_checkpoint(state_file, key):
+    """Function to read the state of a run from its checkpoint, None if there is no checkpoint.
+
+        Ex:  state = read_checkpoint('xp93_case1_ckpt.npz', key)
+    """
+    if not os.path.exists(state_file):
+        return None
+    with np.load(state_file) as z:
+        state = {k: z[k] for k in z.files}
+    if state['key'].item() != key:
+        raise Exception('!!! Checkpoint {0} was written by a different run, remove it or run without restart '
+                        '!!!'.format(state_file))
+    return state
+
+
+def remove_checkpoint(*files):
+    """Function to remove the checkpoint files of a finished run."""
+    for name in files:
+        if os.path.exists(name):
+            os.remove(name)
@@ -0,0 +1,80 @@
+import numpy as np
+
+
+def pack_dofs(dofs):
+    """Function to encode (grid or element, component) DOF tuples as packed integers.
+
+        inputs: dofs <list of (id, component) tuples or [n x 2] array>
+        outputs: keys <int64 array, id * 65536 + component>
+
+        A component outside 0 to 65535 would alias another DOF and raises a ValueError.
+    """
+    dofs = np.asarray(dofs, dtype=np.int64).reshape(-1, 2)
+    bad = (dofs[:, 1] < 0) | (dofs[:, 1] >= 65536)
+    if bad.any():
+        raise ValueError('!!! DOF {0} has a component outside 0 to 65535 !!!'.format(
+            tuple(dofs[np.argmax(bad)].tolist())))
+    return dofs[:, 0] * 65536 + dofs[:, 1]
+
+
+def unpack_dofs(keys):
+    """Function to decode packed integer DOF back into a list of (id, component) tuples."""
+    keys = np.asarray(keys, dtype=np.int64)
+    return list(zip((keys // 65536).tolist(), (keys % 65536).tolist()))
+
+
+class DOFINDEX:
+    """Sorted index of a DOF list for O(log n) lookups and vectorized joins.
+
+        Ex:  index = DOFINDEX(phi.dofs)
+             i_dof = index.index((100012, 3))
+             rows = index.find([(100012, 1), (100012, 2)])
+    """
+
+    def __init__(self, dofs):
+        """Initializing the DOFINDEX object."""
+        self.keys = pack_dofs(dofs)
+        self.order = np.argsort(self.keys, kind='stable')
+        self.sorted = self.keys[self.order]
+
+    def __len__(self):
+        return self.keys.size
+
+    def __contains__(self, dof):
+        try:
+            return self.find([dof])[0] >= 0
+        except (TypeError, ValueError):
+            return False
+
+    def find(self, dofs):
+        """Method to find the position of each DOF in the indexed list, -1 where missing.
+
+            Duplicated DOF return their first position, the same as list.index.
+
+            Ex:  rows = index.find([(100012, 1), (100012, 2)])
+        """
+        keys = pack_dofs(dofs)
+        if self.sorted.size == 0:
+            return np.full(keys.size, -1, dtype=np.int64)
+        pos = np.searchsorted(self.sorted, keys)
+        pos[pos == self.sorted.size] = 0
+        return np.where(self.sorted[pos] == keys, self.order[pos], -1)
+
+    def index(self, dof):
+        """Method to find the position of one DOF, raising ValueError if missing like list.index.
+
+            Ex:  i_dof = index.index((100012, 3))
+        """
+        i = self.find([dof])[0]
+        if i < 0:
+            raise ValueError('{0} is not in the DOF index'.format(dof))
+        return int(i)
+
+    def join(self, other):
+        """Method to join two DOF indices, returning the positions of the DOF common to both.
+
+            Ex:  i_phi, i_ltm = phi.dof_index.join(ltm.dof_index)
+        """
+        i_other = other.find(unpack_dofs(self.keys))
+        i_self = np.nonzero(i_other >= 0)[0]
+        return i_self, i_other[i_self]
@@ -0,0 +1,121 @@
+import numpy as np
+
+
+def env_dtype(labels=()):
+    """Function to build the row layout of an envelope table, one row per output DOF per case.
+
+        The acron and dof fields are sized to the longest of the (acron, dof) labels, 16 characters at least,
+        so no label is truncated.
+
+        Ex:  env_dtype(ltm.acron_dofs)
+    """
+    width = [16, 16]
+    for item in labels:
+        if item is not None:
+            width = [max(width[0], str(item[0]).__len__()), max(width[1], str(item[1]).__len__())]
+    return np.dtype([('case', np.int64), ('acron', 'U{0}'.format(width[0])), ('dof', 'U{0}'.format(width[1])),
+                     ('eid', np.int64), ('dof_id', np.int64),
+                     ('max', float), ('t_max', float), ('min', float), ('t_min', float)])
+
+
+class ENVELOPE:
+    """Running max/min envelope of response histories folded in one time block at a time."""
+
+    def __init__(self, n_rows):
+        """Initializing the ENVELOPE object.
+
+            Ex:  env = ENVELOPE(n_rows)
+        """
+        self.n_rows = n_rows
+        self.max = np.full(n_rows, -np.inf)
+        self.min = np.full(n_rows, np.inf)
+        self.t_max = np.full(n_rows, np.nan)
+        self.t_min = np.full(n_rows, np.nan)
+        self.labels = []
+
+    def fold(self, time, u):
+        """Method to fold a block of response histories [n_rows x n_points] into the envelope.
+
+            Peaks tied with an earlier block keep the earlier time, the same as argmax/argmin over
+            the full history.
+
+            Ex:  env.fold(time[i0:i1], u_block)
+        """
+        if time.size == 0:
+            return
+
+        # Find the block peaks and keep the ones that exceed the running envelope.
+        rows = np.arange(0, self.n_rows)
+        i_max = np.argmax(u, axis=1)
+        i_min = np.argmin(u, axis=1)
+        b_max = u[rows, i_max]
+        b_min = u[rows, i_min]
+        new_max = b_max > self.max
+        new_min = b_min < self.min
+        self.max[new_max] = b_max[new_max]
+        self.t_max[new_max] = time[i_max[new_max]]
+        self.min[new_min] = b_min[new_min]
+        self.t_min[new_min] = time[i_min[new_min]]
+
+    def table(self, case, dofs):
+        """Method to tabulate the envelope as a structured array keyed by case, acronym and DOF.
+
+            dofs are the (eid, dof) of the LTM rows, rows beyond them (RSS) have eid and dof_id 0.
+
+            Ex:  env.table(1, ltm.dofs)
+        """
+        tab = np.zeros(self.n_rows, dtype=env_dtype(self.labels))
+        tab['case'] = case
+        labels = [item if item is not None else ('', '') for item in self.labels]
+        labels = labels + [('', '')] * (self.n_rows - labels.__len__())
+        tab['acron'] = [item[0] for item in labels[0:self.n_rows]]
+        tab['dof'] = [item[1] for item in labels[0:self.n_rows]]
+        n_dofs = min(dofs.__len__(), self.n_rows)
+        if n_dofs > 0:
+            eid_dofs = np.asarray(dofs[0:n_dofs], dtype=np.int64).reshape(n_dofs, 2)
+            tab['eid'][0:n_dofs] = eid_dofs[:, 0]
+            tab['dof_id'][0:n_dofs] = eid_dofs[:, 1]
+        tab['max'] = self.max
+        tab['t_max'] = self.t_max
+        tab['min'] = self.min
+        tab['t_min'] = self.t_min
+        return tab
+
+
+def sweep_dtype(percentiles, labels=()):
+    """Function to build the row layout of a sweep table, one row per output DOF per case.
+
+        The labels of env_dtype(labels) are followed by the largest max and smallest min over the variants, the variant
+        (0 based) they occur in and the percentiles of the max and min across the variants (max_p50, min_p50, ...).
+    """
+    fields = env_dtype(labels).descr[0:5] + [('max', float), ('v_max', np.int64), ('min', float), ('v_min', np.int64)]
+    for q in percentiles:
+        fields += [('max_p{0:g}'.format(q), float), ('min_p{0:g}'.format(q), float)]
+    return np.dtype(fields)
+
+
+def sweep_table(case, envs, dofs, percentiles):
+    """Function to tabulate the envelopes of the variants of a sweep (a list of ENVELOPE) with their statistics
+        across the variants, see sweep_dtype.
+
+        Ex:  sweep_table(1, scr.env_sweep[1], ltm.dofs, [5, 50, 95])
+    """
+    labels = envs[0].table(case, dofs)
+    tab = np.zeros(labels.size, dtype=sweep_dtype(percentiles, envs[0].labels))
+    for field in labels.dtype.names[0:5]:
+        tab[field] = labels[field]
+
+    # The max and min of every output DOF [n_rows x n_variants].
+    e_max = np.stack([env.max for env in envs], axis=1)
+    e_min = np.stack([env.min for env in envs], axis=1)
+    tab['v_max'] = np.argmax(e_max, axis=1)
+    tab['v_min'] = np.argmin(e_min, axis=1)
+    tab['max'] = np.max(e_max, axis=1)
+    tab['min'] = np.min(e_min, axis=1)
+    if percentiles:
+        q_max = np.percentile(e_max, percentiles, axis=1)
+        q_min = np.percentile(e_min, percentiles, axis=1)
+        for i, q in enumerate(percentiles):
+            tab['max_p{0:g}'.format(q)] = q_max[i]
+            tab['min_p{0:g}'.format(q)] = q_min[i]
+    return tab
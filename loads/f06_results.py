@@ -1,3 +1,6 @@
+from PyLnD.loads.dof_index import DOFINDEX
+
+
 class GRIDLOCA:
     """Class of grid location results from NASTRAN."""
 
@@ -33,6 +36,9 @@ class USET:
         self.gset = []
         self.oset = []
         self.load_uset()
+        self.aset_index = DOFINDEX(self.aset)
+        self.gset_index = DOFINDEX(self.gset)
+        self.oset_index = DOFINDEX(self.oset)
 
     def load_uset(self):
         """Method to load the USET f06."""
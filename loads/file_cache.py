@@ -0,0 +1,82 @@
+import numpy as np
+import hashlib
+import mmap
+import os
+import struct
+import zipfile
+
+
+def file_signature(name):
+    """Function to sign a file by its size, modification time and contents.
+
+        inputs: name <file name>
+        outputs: signature <'size:mtime_ns:sha1' string, changes if the file changes>
+    """
+    stat = os.stat(name)
+    sha = hashlib.sha1()
+    with open(name, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    return '{0}:{1}:{2}'.format(stat.st_size, stat.st_mtime_ns, sha.hexdigest())
+
+
+def save_npz(name, **arrays):
+    """Function to write an uncompressed npz file, written to a temporary file and renamed so a reader never
+        sees a partial file.
+
+        Ex:  save_npz('ff_xp93s1sp0001.dat.cache/index.npz', cases=cases, loc=loc)
+    """
+    tmp = name + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, name)
+
+
+def same_file(name, signature):
+    """Function to check a file against its signature from file_signature.
+
+        The file is only hashed when its modification time changed, so a copied but unchanged file still matches.
+    """
+    try:
+        stat = os.stat(name)
+    except OSError:
+        return False
+    size, mtime_ns, sha = signature.split(':')
+    if stat.st_size != int(size):
+        return False
+    if stat.st_mtime_ns == int(mtime_ns):
+        return True
+    return file_signature(name).split(':')[2] == sha
+
+
+def load_npz(name):
+    """Function to read the arrays of an uncompressed npz file (save_npz) as read only views of one memory map of
+        the file, so only the parts used are ever read.
+
+        Ex:  arrays = load_npz('xp93s1_model.npz')
+    """
+    arrays = {}
+    with open(name, 'rb') as f, zipfile.ZipFile(f) as z:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        for info in z.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise Exception('!!! {0} in {1} is compressed and cannot be memory mapped !!!'.format(
+                    info.filename, name))
+
+            # Skip the local zip header and read the npy header of the array.
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            key = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if dtype.hasobject:
+                arrays[key] = np.lib.format.read_array(f, allow_pickle=False)
+            else:
+                count = int(np.prod(shape))
+                arrays[key] = np.frombuffer(buf, dtype=dtype, count=count, offset=f.tell()).reshape(
+                    shape, order='F' if fortran_order else 'C')
+    return arrays
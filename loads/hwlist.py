@@ -1,3 +1,6 @@
+from PyLnD.loads.dof_index import DOFINDEX
+
+
 class HWLIST:
     """Hardware List Class"""
 
@@ -10,6 +13,7 @@ class HWLIST:
         self.num_dof = 0
         self.hw_rss = []
         self.read_hwlist()
+        self.dof_index = DOFINDEX(self.eid_dofids)
 
     def read_hwlist(self):
         """Method to read in the HWLIST attributes.
@@ -1,9 +1,19 @@
+from PyLnD.loads.dof_index import DOFINDEX
+
+
 class LTM:
     """Loads Transformation Matrix class."""
 
-    def __init__(self, name):
-        """Initializing the LTM class."""
+    def __init__(self, name, mmap='no'):
+        """Initializing the LTM class.
+
+            Ex:  LTM('xp93zz_scr.pch')
+
+            Ex:  Memory map the LTMFILE and keep atm and dtm as float32 views of it.
+                LTM('xp93zz_scr.pch', mmap='yes')
+        """
         self.name = name
+        self.mmap = mmap
         self.atm = {}
         self.dtm = {}
         self.num_ltms = 0
@@ -11,62 +21,62 @@ class LTM:
         self.dofs = []
         self.acron_dofs = []
         self.types = []
+        self.rss_ptr = [0]
+        self.rss_idx = []
+        self.rss_labels = []
+        self.acron_index = {}
         self.read_ltmfile()
+        self.dof_index = DOFINDEX(self.dofs)
 
     def read_ltmfile(self):
         """Method to read the LTMFILE for screening.
 
+            The records are all the same size, [bytes, name (80 chars), number of modes, atm and dtm of each mode
+            (float32), bytes], so the whole file is read as one structured array.  With mmap the file is memory
+            mapped and atm and dtm are float32 views of it instead of float64 copies.
+
             Ex:  LTM.read_ltmfile()
         """
         import numpy as np
         import os
 
-        # Use the file size to determine the number of LTMs in the LTMFILE.
+        # Use the size of the first record to determine the number of LTMs and number of modes in the LTMFILE.
         file_size = os.path.getsize(self.name)
-
-        # Open the LTMFILE to determine the number of LTMs and number of modes.
-        with open(self.name) as f:
+        with open(self.name, 'rb') as f:
             [bytes_in_record] = np.fromfile(f, dtype=np.int32, count=1)
-            num_ltms = int(file_size/(bytes_in_record + 8))
-            self.num_ltms = num_ltms
             matrix_name = np.fromfile(f, dtype=np.int8, count=80)
             [num_modes] = np.fromfile(f, dtype=np.int32, count=1)
-            self.num_modes = num_modes
-        self.atm = np.zeros([num_ltms, num_modes])
-        self.dtm = np.zeros([num_ltms, num_modes])
-
-        # Open the LTMFILE and read the contents into ATM and DTM.
-        with open(self.name) as f:
-            # Loop over the num_ltms and read each one.
-            for i in range(self.num_ltms):
-                # Bytes in record
-                [bytes_in_record] = np.fromfile(f, dtype=np.int32, count=1)
-
-                # Define LTM type for this entry.
-                matrix_name = np.fromfile(f, dtype=np.int8, count=80)
-                matrix_name = ''.join([chr(item) for item in matrix_name]).strip()
-                elem_type = matrix_name[0:15]
-                self.types.append(elem_type)
-
-                # Define element and dof tuple for the LTM entry.
-                element = int(matrix_name[16:24])
-                dof = int(matrix_name[30:32])
-                self.dofs.append((element, dof))
-
-                # Read the LTM entry.
-                [num_modes] = np.fromfile(f, dtype=np.int32, count=1)
-                # if (element, dof) not in self.atm.keys():
-                #     self.atm[(element, dof)] = np.zeros([num_modes, 1])
-                # if (element, dof) not in self.dtm.keys():
-                #     self.dtm[(element, dof)] = np.zeros([num_modes, 1])
-                raw_otm = np.fromfile(f, dtype=np.float32, count=num_modes*2)
-                # self.atm[(element, dof)] = raw_otm[0::2]
-                # self.dtm[(element, dof)] = raw_otm[1::2]
-                self.atm[i, :] = raw_otm[0::2]
-                self.dtm[i, :] = raw_otm[1::2]
-
-                # Bytes in record, should be the same as the first.
-                [end_bytes] = np.fromfile(f, dtype=np.int32, count=1)
+        num_ltms = int(file_size/(bytes_in_record + 8))
+        self.num_ltms = num_ltms
+        self.num_modes = num_modes
+        ltm_record = np.dtype([('bytes_in_record', np.int32), ('matrix_name', np.uint8, 80), ('num_modes', np.int32),
+                               ('otm', np.float32, (num_modes, 2)), ('end_bytes', np.int32)])
+        if ltm_record.itemsize != bytes_in_record + 8 or file_size % ltm_record.itemsize != 0:
+            raise Exception('!!! {0} is not a LTMFILE of {1} modes !!!'.format(self.name, num_modes))
+
+        # Read (or memory map) the contents of the LTMFILE in one pass.
+        if self.mmap in ['yes', True]:
+            ltms = np.memmap(self.name, dtype=ltm_record, mode='r', shape=(num_ltms,))
+        else:
+            ltms = np.fromfile(self.name, dtype=ltm_record, count=num_ltms)
+        if (ltms['bytes_in_record'] != bytes_in_record).any() or (ltms['end_bytes'] != bytes_in_record).any() \
+                or (ltms['num_modes'] != num_modes).any():
+            raise Exception('!!! The records of {0} are not all {1} modes !!!'.format(self.name, num_modes))
+
+        # Define the LTM type, element and dof of each entry from the fixed columns of its name.
+        names = ltms['matrix_name']
+        self.types = [t.decode('latin-1') for t in names[:, 0:15].copy().view('S15').ravel()]
+        elements = names[:, 16:24].copy().view('S8').ravel().astype(np.int64)
+        dofs = names[:, 30:32].copy().view('S2').ravel().astype(np.int64)
+        self.dofs = list(zip(elements.tolist(), dofs.tolist()))
+
+        # Split the ATM and DTM of each mode.
+        if self.mmap in ['yes', True]:
+            self.atm = ltms['otm'][:, :, 0]
+            self.dtm = ltms['otm'][:, :, 1]
+        else:
+            self.atm = ltms['otm'][:, :, 0].astype(float)
+            self.dtm = ltms['otm'][:, :, 1].astype(float)
 
     def label_ltm(self, hwlist):
         """Method to label the LTM DOF with the HWLIST information.
@@ -75,15 +85,64 @@ class LTM:
         """
 
         # Label each eid_dof combo if it exists in the LTM.
-        for dof in self.dofs:
-            if dof in hwlist.eid_dofids:
-                i = hwlist.eid_dofids.index(dof)
+        i_hw = hwlist.dof_index.find(self.dofs)
+        for dof, i in zip(self.dofs, i_hw):
+            if i >= 0:
                 acron_dof = hwlist.acron_dofs[i]
                 if acron_dof[1][0:3].upper() == 'RSS':
                     acron_dof = (acron_dof[0], acron_dof[1] + '_' + str(dof[1]))
                 self.acron_dofs.append(acron_dof)
             else:
                 self.acron_dofs.append(None)
+        self.index_acron()
+
+    def index_rss(self, hwlist):
+        """Method to resolve the HWLIST RSS items into LTM rows once, stored CSR style.
+
+            The LTM rows of RSS item i are rss_idx[rss_ptr[i]:rss_ptr[i + 1]].  The RSS labels are added
+            to acron_dofs after the LTM rows, in the order the RSS rows follow the LTM rows in the response.
+
+            Ex:  LTM.index_rss(hwlist)
+        """
+        import numpy as np
+
+        # Loop over each HWLIST RSS items and find the LTM row of each component.
+        rss_ptr = [0]
+        rss_idx = []
+        rss_labels = []
+        for item in hwlist.hw_rss:
+            acron = item[0]
+            eid = item[1]
+            dof = item[2]
+            if acron in hwlist.hw.keys():
+                if eid in hwlist.hw[acron].keys():
+                    if dof in hwlist.hw[acron][eid].keys():
+                        for d in hwlist.hw[acron][eid][dof]['dofs']:
+                            eid_d = (eid, d)
+                            if eid_d in self.dof_index:
+                                rss_idx.append(self.dof_index.index(eid_d))
+                            else:
+                                raise Exception('Missing {0} in {1} and {2} in ltm.'.format(eid_d, acron, dof))
+                        rss_ptr.append(rss_idx.__len__())
+                        rss_labels.append((acron, dof))
+
+        # Replace the labels of any previous index.
+        del self.acron_dofs[self.dofs.__len__():]
+        self.acron_dofs.extend(rss_labels)
+        self.rss_ptr = np.array(rss_ptr, dtype=np.int64)
+        self.rss_idx = np.array(rss_idx, dtype=np.int64)
+        self.rss_labels = rss_labels
+        self.index_acron()
+
+    def index_acron(self):
+        """Method to index the first LTM row of each (acron, dof) label for O(1) lookups.
+
+            Ex:  LTM.index_acron()
+        """
+        self.acron_index = {}
+        for i, acron_dof in enumerate(self.acron_dofs):
+            if acron_dof is not None and acron_dof not in self.acron_index.keys():
+                self.acron_index[acron_dof] = i
 
     def find_dof(self, target, **kwargs):
         """Method to find the acronyms or element that match a pattern.
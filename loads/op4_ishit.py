@@ -1,8 +1,9 @@
-import numpy as np
 import re
+from PyLnD.loads.read_op4 import read_ascii_op4
 
 class read_op4_ascii:
-    """Read ascii op4 files"""
+    """Read ascii op4 files into data, each matrix the stack of its full data lines [n_lines x 5] keyed by the
+    header columns 32 to 40 with the blanks removed, and save them to a mat file."""
 
     def __init__(self, name):
         self.name = name
@@ -11,55 +12,11 @@ class read_op4_ascii:
         self.save2mat()
 
     def read_op4(self):
+        """Method to read the full data lines of each matrix of the ascii op4 into data."""
 
-        with open(self.name) as f:
-            while True:
-                line = f.readline()
-                if not line:
-                    break
-                logical = 0
-                line_temp = line
-                line_temp = re.sub('\n', '', line_temp)
-                line_temp = re.sub(r'\s+', ',', line_temp)
-                line_temp = re.sub(',', '', line_temp)
-                line_temp = line_temp.replace('.', '')
-
-                if line_temp.isalnum() and not line_temp.isnumeric() and not logical:
-                    case = line[31:40]
-                    case = re.sub(r'\s+', '', case)
-                    logical = 1
-                    s_log = 1
-
-                if line_temp.isnumeric() and not logical:
-                    line = f.readline()
-                    line_temp = line
-                    line_temp = re.sub('\n', '', line_temp)
-                    line_temp = re.sub(r'\s+', ',', line_temp)
-                    line_temp = re.sub(',', '', line_temp)
-                    line_temp = line_temp.replace('.', '')
-
-                line_temp = line_temp.replace('+', '')
-                line_temp = line_temp.replace('-', '')
-
-                if line_temp.isalnum() and not logical:
-                    c1 = float(line[0:16])
-                    try:
-                        c2 = float(line[16:32])
-                        c3 = float(line[32:48])
-                        c4 = float(line[48:64])
-                        c5 = float(line[64:80])
-
-                        logical = 1
-                        new_row = np.array([[c1, c2, c3, c4, c5]])
-
-                        if s_log:
-                            self.data[case] = new_row
-                            s_log = 0
-                        else:
-                            self.data[case] = np.append(self.data[case], new_row, axis=0)
-                    except:
-                        logical = 1
-
+        for matrix in read_ascii_op4(self.name, lines=True).values():
+            case = re.sub(r'\s+', '', matrix['header'][31:40])
+            self.data[case] = matrix['lines']
 
     def save2mat(self):
         from scipy.io import savemat
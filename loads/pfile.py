@@ -1,22 +1,45 @@
 import numpy as np
-from scipy.interpolate import interp1d
-import re
+from collections import OrderedDict
+from PyLnD.loads.file_cache import file_signature, save_npz
 
 
 class PFILE:
     """Forcing function class for screening code."""
 
     def __init__(self, name, **kwargs):
-        """Initializing the PFILE object."""
+        """Initializing the PFILE object.
+
+            Ex:  Keep at most 16 parsed cases in memory.
+                pfile = PFILE('ff_xp93s1sp0001.dat', filetype='pfile', max_cases=16)
+
+            Ex:  Keep the index and the parsed and synced cases in a cache next to the pfile
+                 (ff_xp93s1sp0001.dat.cache) to be reused by later sessions.
+                pfile = PFILE('ff_xp93s1sp0001.dat', filetype='pfile', cache='yes')
+
+            Ex:  Check the cache against the contents of the pfile, not only its size and modification time.
+                pfile = PFILE('ff_xp93s1sp0001.dat', filetype='pfile', cache='strict')
+        """
         if 'filetype' not in kwargs.keys():
             raise Exception("!!! filetype must be specified !!!")
         else:
             filetype = kwargs['filetype']
+        if 'max_cases' in kwargs.keys():
+            max_cases = kwargs['max_cases']
+        else:
+            max_cases = 64
+        if 'cache' in kwargs.keys():
+            cache = kwargs['cache'].lower()
+        else:
+            cache = 'no'
 
         self.name = name
-        self.pf_lines = []
+        self.pf_map = None
+        self.index = {}
         self.case = {}
         if filetype == 'pfile':
+            self.case = CASEMAP(self, max_cases)
+            if cache in ['yes', 'strict']:
+                self.case.cache = PCACHE(name, strict=cache == 'strict')
             self.load_pfile()
         elif filetype == 'matfile':
             self.read_matfile()
@@ -28,7 +51,7 @@ class PFILE:
         """
         from PyLnD.matlab.mat_utilities import save2mat
 
-        save2mat(key='pfile', olist=self.case, ofile=outfile)
+        save2mat(key='pfile', olist={c: dict(self.case[c].items()) for c in self.case.keys()}, ofile=outfile)
 
     def plot_p(self, **kwargs):
         """Method to plot the forcing function time domain.
@@ -114,6 +137,10 @@ class PFILE:
         Ex:  Sync and set the run to have an auto time step with the times were force exists = 0.02 sec
             pfile.sync(case=76, auto='yes', tstep=0.02)
 
+        Ex:  Sync with an auto time step keeping changes in any grid's force over 1 lbs or moment over 10 in-lbs.
+            pfile.sync(case=76, auto='yes', tol=[1.0, 1.0, 1.0, 10.0, 10.0, 10.0])
+
+        * A case that has not been parsed yet is synced when it is first accessed.
         """
 
         # Find the keyword arguments.
@@ -144,119 +171,215 @@ class PFILE:
             auto = False
 
         # Loop over each case in the case_list and sync.
+        dt = float(dt)
+        ring = float(ring)
+        if np.ndim(tol) > 0:
+            tol = tuple(float(x) for x in tol)
+        else:
+            tol = float(tol)
         for c in case_list:
-            # Determine the max and min times for all grids in this case.
-            self.case[c]['dt'] = dt
-            min_time = 1e6
-            max_time = -1e6
-            g = 0
-            for g in self.case[c]['grids']:
-                # Check if the case has been parsed.
-                if type(self.case[c][g]) is list:
-                    raise Exception("!!! This case {0} must be parsed first !!!".format(c))
-                min_t = np.min(self.case[c][g][:, 0], axis=0)
-                if min_t < min_time:
-                    min_time = min_t
-                max_t = np.max(self.case[c][g][:, 0], axis=0)
-                if max_t > max_time:
-                    max_time = max_t
-
-            # Add extra rows to the data to extend each history to match max/min times and interpolate.
-            for g in self.case[c]['grids']:
-                l = self.case[c][g].__len__()
-                if self.case[c][g][0, 0] > min_time:
-                    new_time = [self.case[c][g][0, 0] - dt]
-                    if new_time > min_time:
-                        new_time.append(min_time)
-                        self.case[c][g] = np.insert(self.case[c][g], [l, l], 0, axis=0)
-                        self.case[c][g][0:1, 0] = new_time
-                    else:
-                        self.case[c][g] = np.insert(self.case[c][g], l, 0, axis=0)
-                        self.case[c][g][0, 0] = new_time
-                if self.case[c][g][-1, 0] < max_time:
-                    ext_time = [self.case[c][g][-1, 0] + dt]
-                    if ext_time < max_time:
-                        ext_time.append(max_time)
-                        self.case[c][g] = np.insert(self.case[c][g], [l, l], 0, axis=0)
-                        self.case[c][g][l:, 0] = ext_time
-                    else:
-                        self.case[c][g] = np.insert(self.case[c][g], l, 0, axis=0)
-                        self.case[c][g][l, 0] = ext_time
-
-                # Interpolate each dof
-                full_time = np.arange(min_time, max_time, dt)
-                new_vec = np.zeros([full_time.__len__() + 1, 7])
-                new_vec[0:-1, 0] = full_time
-                new_vec[-1, 0] = full_time[-1] + dt     # Add additional time step to ensure new_vec ends at zero load.
-                for d in range(1, 7):
-                    interp_f = interp1d(self.case[c][g][:, 0], self.case[c][g][:, d])
-                    new_vec[0:-1, d] = interp_f(full_time)
-                self.case[c][g] = new_vec
-
-            # Sync up the duplicate grid blocks into one final vector for that grid.
-            to_remove = []
-            for g in self.case[c]['grids']:
-                if type(g) is str:
-                    g_split = g.split('_')
-                    d_grid = int(g_split[0])
-                    self.case[c][d_grid][:, 1:] = self.case[c][d_grid][:, 1:] + self.case[c][g][:, 1:]
-                    to_remove.append(g)
-            for g in to_remove:
-                self.case[c].pop(g, None)
-                self.case[c]['grids'].remove(g)
-
-            # For auto time step, determine the index of the time steps to be kept.
-            if auto:
-                p_sum = []
-                # Sum the forces in all directions at each time step and accumulate for each grid
-                for g in self.case[c]['grids']:
-                    if type(p_sum) is list:
-                        p_sum = np.zeros_like(self.case[c][g][:, 0])
-                    p_sum = p_sum + np.sum(np.absolute(self.case[c][g][:, 1:]), axis=1)
-                keep_list = auto_ts(self.case[c][g][:, 0], p_sum, tol, ring)
-                for g in self.case[c]['grids']:
-                    self.case[c][g] = self.case[c][g][keep_list, :]
+            if isinstance(self.case, CASEMAP) and not self.case.record(c, (dt, tol, ring, auto)):
+                continue
+            self.sync_case(c, dt, tol, ring, auto)
+            if isinstance(self.case, CASEMAP):
+                self.case.store(c)
+
+    def sync_case(self, c, dt, tol, ring, auto):
+        """Method to interpolate and sync each applied load time to each other for one case, see sync.
+
+            Ex:  pfile.sync_case(76, 0.01, 0.01, 2.0, False)
+        """
+
+        # Keep the case as load terms, each a grid's coefficients times a scalar time function.
+        case = self.case[c]
+        if not isinstance(case, PCASE):
+            case = to_pcase(case)
+            self.case[c] = case
+        edited = case.edited
+        case.clear_histories()
+        case['dt'] = dt
+        case.edited = edited
+        t_terms, f_terms = case.series()
+        nb = t_terms.__len__()
+
+        # Determine the common time grid for all terms in this case.
+        min_time = min([np.min(t_b) for t_b in t_terms])
+        max_time = max([np.max(t_b) for t_b in t_terms])
+        full_time = np.arange(min_time, max_time, dt)
+        time = np.append(full_time, full_time[-1] + dt)     # Additional time step to ensure it ends at zero load.
+
+        # Stack the time functions, each ramps from zero load one time step before it starts and back to zero load
+        # one time step after it ends, and locate the common times in each (as np.interp).
+        xp = []
+        yp = []
+        lo = np.zeros([nb, full_time.size], dtype=int)
+        outside = np.zeros([nb, full_time.size], dtype=bool)
+        n = 0
+        for k in range(nb):
+            t_b = t_terms[k]
+            f_b = f_terms[k]
+            if t_b[0] > min_time:
+                t_b = np.append(t_b[0] - dt, t_b)
+                f_b = np.append(0, f_b)
+            if t_b[-1] < max_time:
+                t_b = np.append(t_b, t_b[-1] + dt)
+                f_b = np.append(f_b, 0)
+            j = np.searchsorted(t_b, full_time, side='right') - 1
+            outside[k] = (j < 0) | (full_time > t_b[-1])
+            lo[k] = n + np.clip(j, 0, t_b.size - 2)
+            n += t_b.size
+            xp.append(t_b)
+            yp.append(f_b)
+        xp = np.concatenate(xp)
+        yp = np.concatenate(yp)[np.newaxis, :]
+
+        # Interpolate all time functions onto the common time grid a block at a time (to stay in cache).
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.diff(yp, axis=1) / np.diff(xp)
+        f_sync = np.zeros([nb, time.size])
+        step = max(1, 2 ** 16 // max(1, full_time.size))
+        for k0 in range(0, nb, step):
+            interp_block(full_time, xp, yp, slope, lo[k0:k0 + step], outside[k0:k0 + step],
+                         f_sync[k0:k0 + step, 0:-1, np.newaxis])
+
+        # The duplicate grid blocks (grid_N) become more terms of their grid.
+        case.term_grid = [int(g.split('_')[0]) if type(g) is str else g for g in case.term_grid]
+        case['grids'][:] = [g for g in case['grids'] if type(g) is not str]
+        case.set_series(time, f_sync)
+
+        # For auto time step, keep only the time steps where the summed force in all directions changes.
+        #  With one tol per dof, keep the time steps where the force in any dof of any grid changes.
+        if auto and np.ndim(tol) > 0:
+            p_hist = np.zeros([time.size, case['grids'].__len__(), 6])
+            for k, rows in enumerate(case.grid_rows()):
+                p_hist[:, k, :] = f_sync[rows].T @ case.coef[rows]
+            keep_list = auto_ts(time, p_hist, np.array(tol), ring)
+        elif auto:
+            p_sum = np.zeros(time.size)
+            for rows in case.grid_rows():
+                p_sum += np.sum(np.absolute(f_sync[rows].T @ case.coef[rows]), axis=1)
+            keep_list = auto_ts(time, p_sum, tol, ring)
+        if auto:
+            case.set_series(time[keep_list], f_sync[:, keep_list])
 
     def load_pfile(self):
-        """Method to load the contents of PFILE and index for later.
+        """Method to map PFILE and index the byte range of each case and grid for later.
 
             Ex:  PFILE.load_pfile()
         """
+        import mmap
+        import os
 
-        # Read the file contents.
-        with open(self.name) as f:
-            self.pf_lines = f.readlines()
-
-        # Go line by line, construct ff dict.
-        i = 1
-        for j, line in enumerate(self.pf_lines):
-            if line[2:7].lower() == 'case=':
-                try:
-                    case_num = int(line[7:11])
-                except:
-                    raise Exception('Could not convert "{0}" in file {1} line {2}\n{3} '
-                                    .format(line[7:11], self.name, j + 1, line))
+        # Map the file contents.
+        with open(self.name, 'rb') as f:
+            if os.fstat(f.fileno()).st_size > 0:
+                self.pf_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.pf_map = b''
+        if self.case.cache is not None:
+            self.index = self.case.cache.load_index()
+            if self.index is not None:
+                return
+            self.index = {}
+        buf = np.frombuffer(self.pf_map, dtype=np.uint8)
+
+        # Find the start of each line and the first 7 characters of each line, lower case.
+        starts = np.append(0, np.flatnonzero(buf == ord('\n')) + 1)
+        starts = starts[starts < buf.size]
+        n_lines = starts.size
+        bounds = np.append(starts, buf.size)
+        cols = starts[:, None] + np.arange(7)
+        head = np.where(cols < bounds[1:, None], buf[np.minimum(cols, buf.size - 1)], 0)
+        head = np.where((head >= ord('A')) & (head <= ord('Z')), head + 32, head).astype(np.uint8)
+        case_lines = np.flatnonzero((head[:, 2:7] == np.frombuffer(b'case=', dtype=np.uint8)).all(axis=1))
+        grid_lines = np.flatnonzero((head[:, 2:6] == np.frombuffer(b'grid', dtype=np.uint8)).all(axis=1))
+
+        # The data of a grid runs from two lines after its header up to the next line starting with a '$'.
+        dollar = np.append(np.flatnonzero(head[:, 0] == ord('$')), n_lines)
+        data_start = np.minimum(grid_lines + 2, n_lines)
+        data_end = dollar[np.searchsorted(dollar, data_start)]
+        spans = np.stack([bounds[data_start], bounds[data_end]], axis=1)
+
+        # Index the cases.
+        case_nums = []
+        for j in case_lines:
+            line = self.pf_map[starts[j]:bounds[j + 1]].decode('latin-1')
+            try:
+                case_num = int(line[7:11])
+            except:
+                raise Exception('Could not convert "{0}" in file {1} line {2}\n{3} '
+                                .format(line[7:11], self.name, j + 1, line))
+            case_nums.append(case_num)
+            if case_num not in self.index.keys():
+                self.index[case_num] = {'loc': int(j), 'grids': [], 'head': [], 'span': []}
+
+        # Index the grids of each case.
+        owner = np.searchsorted(case_lines, grid_lines, side='right') - 1
+        last = -1
+        for g, j in enumerate(grid_lines):
+            if owner[g] < 0:
+                raise Exception('!!! Grid in file {0} line {1} is not in a case !!!'.format(self.name, j + 1))
+            if owner[g] != last:
+                entry = self.index[case_nums[owner[g]]]
+                last = owner[g]
                 i = 1
-                if case_num not in self.case.keys():
-                    self.case[case_num] = {}
-                    if 'loc' not in self.case[case_num]:
-                        self.case[case_num]['loc'] = j
-                        self.case[case_num]['grids'] = []
-                        self.case[case_num]['dt'] = 0
-
-            if line[2:6].lower() == 'grid':
-                grid = int(line[7:15])
-                if grid in self.case[case_num]['grids']:
-                    grid = grid.__str__() + '_' + i.__str__()
-                    self.case[case_num]['grids'].append(grid)
-                    i += 1
-                else:
-                    self.case[case_num]['grids'].append(grid)
-                if grid not in self.case[case_num].keys():
-                    self.case[case_num][grid] = []
+            grid = int(self.pf_map[starts[j] + 7:starts[j] + 15])
+            if grid in entry['grids']:
+                grid = grid.__str__() + '_' + i.__str__()
+                i += 1
+            entry['grids'].append(grid)
+            entry['head'].append(starts[j])
+            entry['span'].append(spans[g])
+        for entry in self.index.values():
+            entry['head'] = np.array(entry['head'], dtype=np.int64)
+            entry['span'] = np.array(entry['span'], dtype=np.int64).reshape(-1, 2)
+        if self.case.cache is not None:
+            self.case.cache.save_index(self.index)
+
+    def read_case(self, case_num):
+        """Method to parse one indexed case of the pfile into real data.
+
+            Ex:  case = PFILE.read_case(1)
+        """
+
+        # Collect the coefficients from the grid headers and the data lines of each grid.
+        entry = self.index[case_num]
+        ng = entry['grids'].__len__()
+        coef = np.zeros([ng, 6])
+        data_lines = []
+        grid_start = np.zeros(ng + 1, dtype=int)
+        for g in range(ng):
+            header = self.pf_map[entry['head'][g]:entry['span'][g, 0]].decode('latin-1').splitlines()
+            coef[g, 0:3] = [float(header[0][19:26]), float(header[0][36:43]), float(header[0][53:60])]
+            coef[g, 3:6] = [float(header[1][19:26]), float(header[1][36:43]), float(header[1][53:60])]
+            grid_start[g] = data_lines.__len__()
+            data = self.pf_map[entry['span'][g, 0]:entry['span'][g, 1]].decode('latin-1')
+            data_lines.extend([line.rstrip() for line in data.splitlines()])
+        grid_start[ng] = data_lines.__len__()
+
+        # Convert all of the data lines for this case in one pass.
+        try:
+            values, counts = parse_fields(data_lines)
+        except ValueError:
+            bad = bad_line(data_lines)
+            g = np.searchsorted(grid_start, bad, side='right') - 1
+            offset = entry['span'][g, 0]
+            line_num = np.count_nonzero(np.frombuffer(self.pf_map, dtype=np.uint8, count=offset) == ord('\n'))
+            raise Exception('Could not convert part of case {0} line {1} to a float:\n\t\t{2}\n{3}'
+                            .format(case_num, line_num + bad - grid_start[g] + 1, self.name, data_lines[bad]))
+
+        # Split the values by grid, each grid block is a term of its coefficients times the time function [t, f].
+        case = PCASE(loc=entry['loc'], grids=list(entry['grids']), dt=0)
+        case.coef = coef
+        case.term_grid = list(entry['grids'])
+        bounds = np.append(0, np.cumsum(counts))[grid_start]
+        case.terms = [values[bounds[g]:bounds[g + 1]].reshape(-1, 2) for g in range(ng)]
+        return case
 
     def parse_pfile(self, **kwargs):
-        """Method to parse a case in the pfile string into real data.
+        """Method to parse cases in the pfile into real data.
+
+            * Cases are parsed when first accessed, this parses them up front (ex: to check the file).
 
             Ex:  Parse the text data into numbers.
                 scr.pfile.parse_pfile(case=[1,100])
@@ -272,104 +395,522 @@ class PFILE:
         else:
             raise Exception('!!! You must supply a case !!!')
 
-        # Loop over the collection of a cases to parse.
+        # Loop over the collection of cases to parse.
         for case_num in case_list:
-            # Parse the section of the pfile for this case.
-            ng = self.case[case_num]['grids'].__len__()
-            g = 0
-            l = self.case[case_num]['loc']
-            while g < ng:
-                line = self.pf_lines[l]
-                if line[2:6].lower() == 'grid':
-                    data = np.empty((0, 2))
-                    grid = int(line[7:15])
-                    fx = float(line[19:26])
-                    fy = float(line[36:43])
-                    fz = float(line[53:60])
-                    l += 1
-                    line = self.pf_lines[l]
-                    mx = float(line[19:26])
-                    my = float(line[36:43])
-                    mz = float(line[53:60])
-                    # Loop over the grid entry for this case.
-                    dollar = False
-                    # while line[0] != '$':
-                    while not dollar:
-                        l += 1
-                        if l == self.pf_lines.__len__():
-                            dollar = True
-                            continue
-                        line = self.pf_lines[l]
-                        if line[0] == '$':
-                            dollar = True
-                            l -= 1
-                            continue
-                        line = line.rstrip()
-                        line_chunk = [line[i:i + 8] for i in range(0, len(line), 8)]  # chunk up in 8-char segments
-                        line_chunk = [i for i in line_chunk if "        " not in i]  # Remove empty first field.
-                        line_chunk = [x.strip(' ') for x in line_chunk]  # Remove all spaces
-                        line_chunk = [i.replace('-', 'e-') for i in line_chunk]  # Add the exponent at the end
-                        line_chunk = [re.sub('^e', '', i) for i in line_chunk]
-                        try:
-                            line_data = list(map(float, line_chunk))  # Convert the strings to floats
-                        except:
-                            raise Exception('Could not convert part of case {0} line {1} to a float:\n\t\t{2}\n{3}'
-                                            .format(case_num, l + 1, self.name, line))
-                        new_times = np.asarray(line_data[0::2])  # Pull just the time columns
-                        new_loads = np.asarray(line_data[1::2])  # Pull just the value columns
-                        new_data = np.array([new_times, new_loads]).transpose()
-                        data = np.append(data, new_data, axis=0)
-                        pass
-                    # Create a full vector using the coefficients.
-                    p_vec = np.zeros([data.shape[0], 7])
-                    p_vec[:, 0] = data[:, 0]  # time
-                    p_vec[:, 1] = fx * data[:, 1]  # fx
-                    p_vec[:, 2] = fy * data[:, 1]  # fy
-                    p_vec[:, 3] = fz * data[:, 1]  # fz
-                    p_vec[:, 4] = mx * data[:, 1]  # mx
-                    p_vec[:, 5] = my * data[:, 1]  # my
-                    p_vec[:, 6] = mz * data[:, 1]  # mz
-                    self.case[case_num][self.case[case_num]['grids'][g]] = p_vec
-                    g += 1
-                l += 1
+            self.case[case_num]
+
+
+class CASEMAP:
+    """Case dictionary of a PFILE that parses each case from the pfile when it is first accessed.
+
+        At most size parsed cases are kept (None for no limit), the least recently used is dropped first.
+        A dropped case is parsed again on its next access and the syncs recorded for it are applied again.
+        The arrays of a parsed case are read-only, so it can only be edited by assignment (ex: case[grid] =
+        p_vec), and an edited case is never dropped, it is kept like the cases assigned directly.  With a
+        PCACHE the parsed and synced cases are read from and written to the cache.
+    """
+
+    def __init__(self, pfile, size=64):
+        """Initializing the CASEMAP object."""
+        self.pfile = pfile
+        self.size = size
+        self.parsed = OrderedDict()
+        self.synced = {}
+        self.user = {}
+        self.cache = None
+
+    def __getitem__(self, c):
+        if c in self.user:
+            return self.user[c]
+        if c in self.parsed:
+            self.parsed.move_to_end(c)
+            return self.parsed[c]
+        if c not in self.pfile.index:
+            raise KeyError(c)
+
+        # Read the case as synced from the cache, or parse it and apply the syncs.
+        syncs = self.synced.get(c, [])
+        case = None
+        if self.cache is not None:
+            case = self.cache.load_case(c, syncs)
+            if case is None and syncs:
+                case = self.cache.load_case(c, [])
+                if case is not None:
+                    self.add(c, case)
+                    self.replay(c, syncs)
+                    return self.parsed[c]
+        if case is not None:
+            self.add(c, case)
+            return case
+        self.add(c, self.pfile.read_case(c))
+        if self.cache is not None:
+            self.cache.save_case(c, [], self.parsed[c])
+        self.replay(c, syncs)
+        return self.parsed[c]
+
+    def add(self, c, case):
+        """Method to add a parsed case, dropping the least recently used cases over the size limit.
+
+            An edited case is kept with the cases assigned directly instead of being dropped.
+        """
+        case.lock()
+        self.parsed[c] = case
+        if self.size:
+            while self.parsed.__len__() > self.size:
+                c_old, case_old = self.parsed.popitem(last=False)
+                if case_old.edited:
+                    self.synced.pop(c_old, None)
+                    self.user[c_old] = case_old
+
+    def replay(self, c, syncs):
+        """Method to apply the recorded syncs to a freshly parsed case."""
+        for opts in syncs:
+            self.pfile.sync_case(c, *opts)
+        if syncs:
+            self.store(c)
+
+    def store(self, c):
+        """Method to write a parsed case as synced so far to the cache."""
+        if c in self.parsed:
+            self.parsed[c].lock()
+        if self.cache is not None and c in self.parsed:
+            self.cache.save_case(c, self.synced.get(c, []), self.parsed[c])
+
+    def __setitem__(self, c, case):
+        self.parsed.pop(c, None)
+        self.synced.pop(c, None)
+        self.user[c] = case
+
+    def __contains__(self, c):
+        return c in self.user or c in self.pfile.index
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self.keys().__len__()
+
+    def keys(self):
+        return list(self.pfile.index.keys()) + [c for c in self.user.keys() if c not in self.pfile.index]
+
+    def values(self):
+        return (self[c] for c in self.keys())
+
+    def items(self):
+        return ((c, self[c]) for c in self.keys())
+
+    def get(self, c, default=None):
+        if c in self:
+            return self[c]
+        return default
+
+    def record(self, c, opts):
+        """Method to record a sync of case c, returns True if the case is in memory and is to be synced now."""
+        if c not in self:
+            raise KeyError(c)
+        if c in self.user:
+            return True
+        self.synced.setdefault(c, []).append(opts)
+        return c in self.parsed
+
+
+class PCASE(dict):
+    """One case of a forcing function kept as load terms, each the constant coefficients [fx, fy, fz, mx, my, mz]
+        of one grid times a scalar time function.
+
+        Before the case is synced each term has its own time, terms[i] = [t, f], after it the terms share time
+        and f [n_terms x n_times].  The [t, x, y, z, mx, my, mz] history of a grid, case[grid], is formed from its
+        terms when first accessed.  A history assigned to case[grid] replaces the terms of that grid.
+
+        An assignment to the case marks it as edited.  A locked case (one parsed by a CASEMAP) has read-only
+        arrays.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initializing the PCASE object.
+
+            Ex:  case = PCASE(loc=0, grids=[100012], dt=0)
+        """
+        dict.__init__(self, *args, **kwargs)
+        self.coef = np.zeros([0, 6])
+        self.term_grid = []
+        self.terms = []
+        self.time = None
+        self.f = None
+        self.edited = False
+        self.locked = False
+
+    def __reduce__(self):
+        # Pickle the terms, not the histories formed from them.
+        grids = dict.get(self, 'grids', [])
+        items = [(k, v) for k, v in dict.items(self) if k not in grids]
+        return self.__class__, (), self.__dict__.copy(), None, iter(items)
+
+    def __missing__(self, g):
+        rows = [b for b, tg in enumerate(self.term_grid) if tg == g]
+        if g not in dict.get(self, 'grids', []) or not rows:
+            raise KeyError(g)
+        if self.f is None:
+            p_vec = np.zeros([self.terms[rows[0]].shape[0], 7])
+            p_vec[:, 0] = self.terms[rows[0]][:, 0]  # time
+            for b in rows:
+                p_vec[:, 1:7] += self.terms[b][:, 1:2] * self.coef[b]  # fx, fy, fz, mx, my, mz
+        else:
+            p_vec = np.zeros([self.time.size, 7])
+            p_vec[:, 0] = self.time
+            p_vec[:, 1:7] = self.f[rows].T @ self.coef[rows]
+        if self.locked:
+            p_vec.setflags(write=False)
+        dict.__setitem__(self, g, p_vec)
+        return p_vec
+
+    def __setitem__(self, k, v):
+        self.edited = True
+        if 'grids' in self and k in self['grids']:
+            self.add_history(k, v)
+        else:
+            dict.__setitem__(self, k, v)
+
+    def __contains__(self, k):
+        return dict.__contains__(self, k) or k in dict.get(self, 'grids', [])
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return self.keys().__len__()
+
+    def keys(self):
+        grids = dict.get(self, 'grids', [])
+        return [k for k in dict.keys(self) if k not in grids] + list(grids)
+
+    def values(self):
+        return [self[k] for k in self.keys()]
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def get(self, k, default=None):
+        if k in self:
+            return self[k]
+        return default
+
+    def add_history(self, g, p_vec):
+        """Method to replace the terms of grid g by its history [t, x, y, z, mx, my, mz], one term per dof with a
+            load.
+
+            Ex:  case.add_history(100012, p_vec)
+        """
+        p_vec = np.asarray(p_vec, dtype=float)
+        if self.f is not None:
+            self.terms = [np.column_stack([self.time, f_b]) for f_b in self.f]
+            self.time = None
+            self.f = None
+        keep = [b for b, tg in enumerate(self.term_grid) if tg != g]
+        dofs = [d for d in range(6) if (p_vec[:, d + 1] != 0).any()] or [0]
+        self.coef = np.concatenate([self.coef[keep], np.eye(6)[dofs]])
+        self.terms = [self.terms[b] for b in keep] + [p_vec[:, [0, d + 1]] for d in dofs]
+        self.term_grid = [self.term_grid[b] for b in keep] + [g] * dofs.__len__()
+        if g not in self['grids']:
+            self['grids'].append(g)
+        dict.__setitem__(self, g, p_vec)
+
+    def lock(self):
+        """Method to make the arrays of the case read-only."""
+        self.locked = True
+        arrays = [self.coef, self.time, self.f] + list(self.terms or [])
+        arrays += [v for k, v in dict.items(self) if k in dict.get(self, 'grids', [])]
+        for a in arrays:
+            if isinstance(a, np.ndarray):
+                a.setflags(write=False)
+
+    def clear_histories(self):
+        """Method to drop the grid histories formed from the terms."""
+        for k in list(dict.keys(self)):
+            if k in self.term_grid or k in self['grids']:
+                dict.__delitem__(self, k)
+
+    def series(self):
+        """Method to return the time and the time function of each term as lists."""
+        if self.f is None:
+            return [t_f[:, 0] for t_f in self.terms], [t_f[:, 1] for t_f in self.terms]
+        return [self.time] * self.f.shape[0], list(self.f)
+
+    def set_series(self, time, f):
+        """Method to set the common time and the time functions of the terms [n_terms x n_times]."""
+        self.time = time
+        self.f = f
+        self.terms = None
+
+    def stacked(self):
+        """Method to return the common time and the time functions of the terms [n_terms x n_times]."""
+        if self.f is not None:
+            return self.time, self.f
+        time = self.terms[0][:, 0]
+        for t_f in self.terms[1:]:
+            if not np.array_equal(t_f[:, 0], time):
+                raise Exception('!!! The grids of this case do not share a time vector, sync it first !!!')
+        return time, np.array([t_f[:, 1] for t_f in self.terms])
+
+    def grid_rows(self):
+        """Method to return the index of the terms of each grid in case['grids']."""
+        term_grid = np.array([g.__str__() for g in self.term_grid])
+        return [np.flatnonzero(term_grid == g.__str__()) for g in self['grids']]
+
+
+def to_pcase(case):
+    """Function to convert a case of grid histories [t, x, y, z, mx, my, mz] into a PCASE of load terms."""
+    pcase = PCASE({k: v for k, v in case.items() if k not in case['grids']})
+    pcase['grids'] = list(case['grids'])
+    for g in case['grids']:
+        pcase.add_history(g, case[g])
+    return pcase
+
+
+class PCACHE:
+    """Sidecar cache directory (pfile name + '.cache') of the index and the parsed and synced cases of a pfile.
+
+        The files are npz, one for the index and one per case and sync history.  Each is stamped with the
+        signature (size, mtime and hash) of the pfile, the cache is cleared when the pfile changes and a
+        case is keyed by the sync parameters (tstep, tol, ring, auto) applied to it.
+
+        The pfile is only hashed when its size or modification time differ from the index stamp (or always
+        when strict), a pfile that was touched but not changed keeps its cache.
+    """
+
+    def __init__(self, name, strict=False):
+        """Initializing the PCACHE object.
+
+            Ex:  cache = PCACHE('ff_xp93s1sp0001.dat')
+        """
+        import glob
+        import os
+
+        self.path = name + '.cache'
+        os.makedirs(self.path, exist_ok=True)
+
+        # Reuse the stamp of the index if the pfile has the same size and modification time, otherwise hash it.
+        index = os.path.join(self.path, 'index.npz')
+        stored = self.stamp(index)
+        stat = os.stat(name)
+        if stored is not None and not strict and stored.split(':')[0:2] == [str(stat.st_size),
+                                                                            str(stat.st_mtime_ns)]:
+            self.signature = stored
+            return
+        self.signature = file_signature(name)
+        if stored is None:
+            return
+
+        # Clear the cache if it was written for another version of the pfile, or restamp the index.
+        if stored.split(':')[2] != self.signature.split(':')[2]:
+            for f in glob.glob(os.path.join(self.path, '*.npz')):
+                os.remove(f)
+        elif stored != self.signature:
+            z = self.read(index)
+            z['signature'] = np.array(self.signature)
+            save_npz(index, **z)
+
+    def stamp(self, name):
+        """Method to read the pfile signature a cache file was written for, None if it cannot be read."""
+        import zipfile
+
+        try:
+            with np.load(name) as z:
+                return str(z['signature'])
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+
+    def read(self, name):
+        """Method to read a cache file, returns None if it is missing or not for this version (hash) of the pfile."""
+        import zipfile
+
+        try:
+            with np.load(name) as z:
+                if str(z['signature']).split(':')[-1] != self.signature.split(':')[-1]:
+                    return None
+                return {k: z[k] for k in z.files}
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+
+    def case_file(self, c, syncs):
+        """Method to return the cache file name of case c with the sync history syncs [(dt, tol, ring, auto)]."""
+        import hashlib
+        import os
+
+        key = hashlib.sha1(repr([tuple(opts) for opts in syncs]).encode()).hexdigest()[:16]
+        return os.path.join(self.path, 'case_{0}_{1}.npz'.format(c, key))
+
+    def load_index(self):
+        """Method to read the pfile index, returns None if it is not cached."""
+        import os
+
+        z = self.read(os.path.join(self.path, 'index.npz'))
+        if z is None:
+            return None
+        index = {}
+        for i, c in enumerate(z['cases'].tolist()):
+            i0, i1 = z['ptr'][i], z['ptr'][i + 1]
+            index[c] = {'loc': int(z['loc'][i]), 'grids': [str2grid(g) for g in z['grids'][i0:i1].tolist()],
+                        'head': z['head'][i0:i1], 'span': z['span'][i0:i1]}
+        return index
+
+    def save_index(self, index):
+        """Method to write the pfile index."""
+        import os
+
+        ptr = np.cumsum([0] + [entry['grids'].__len__() for entry in index.values()])
+        grids = [g.__str__() for entry in index.values() for g in entry['grids']]
+        save_npz(os.path.join(self.path, 'index.npz'), signature=np.array(self.signature),
+                 cases=np.array(list(index.keys()), dtype=np.int64), ptr=ptr,
+                 loc=np.array([entry['loc'] for entry in index.values()], dtype=np.int64),
+                 grids=np.array(grids, dtype=str),
+                 head=np.concatenate([np.zeros(0, dtype=np.int64)] + [e['head'] for e in index.values()]),
+                 span=np.concatenate([np.zeros((0, 2), dtype=np.int64)] + [e['span'] for e in index.values()]))
+
+    def load_case(self, c, syncs):
+        """Method to read case c with the sync history syncs, returns None if it is not cached."""
+        z = self.read(self.case_file(c, syncs))
+        if z is None:
+            return None
+        case = PCASE(loc=int(z['loc']), grids=[str2grid(g) for g in z['grids'].tolist()], dt=z['dt'].item())
+        case.coef = z['coef']
+        case.term_grid = [str2grid(g) for g in z['term_grid'].tolist()]
+        if 'f' in z.keys():
+            case.set_series(z['time'], z['f'])
+        else:
+            case.terms = [z['t{0}'.format(i)] for i in range(case.coef.shape[0])]
+        return case
+
+    def save_case(self, c, syncs, case):
+        """Method to write case c (a PCASE) with the sync history syncs."""
+        if case.f is None:
+            arrays = {'t{0}'.format(i): t_f for i, t_f in enumerate(case.terms)}
+        else:
+            arrays = {'time': case.time, 'f': case.f}
+        save_npz(self.case_file(c, syncs), signature=np.array(self.signature), loc=np.array(case['loc']),
+                 grids=np.array([g.__str__() for g in case['grids']], dtype=str), dt=np.array(case['dt']),
+                 coef=case.coef, term_grid=np.array([g.__str__() for g in case.term_grid], dtype=str), **arrays)
+
+
+def str2grid(g):
+    """Function to convert a cached grid label back to the grid id, duplicate grid blocks stay strings."""
+    if g.isdigit():
+        return int(g)
+    return g
+
+
+def interp_block(t, xp, yp, slope, lo, outside, out):
+    """Function to linearly interpolate a block of stacked histories at the times t, the same as np.interp.
+        inputs: t (times to interpolate at)
+                xp, yp (stacked times and [m x n] values of all histories)
+                slope (slope between each stacked point and the next [m x n - 1])
+                lo (index of the stacked point at or before each time t [n_histories x t.size])
+                outside (times before or after each history, set to zero)
+                out (output block [n_histories x t.size x m])
+    """
+    dt = t - xp[lo]
+    end = t == xp[lo + 1]
+    for j in range(yp.shape[0]):
+        p_j = slope[j][lo]
+        p_j *= dt
+        p_j += yp[j][lo]
+        p_j[end] = yp[j][lo[end] + 1]
+        p_j[outside] = 0
+        out[:, :, j] = p_j
+
+
+def parse_fields(lines):
+    """Function to convert pfile data lines of 8-char fields into floats.
+        inputs: lines (list of data lines with the line endings removed)
+        outputs: values (float values of the non-blank fields in reading order)
+                 counts (number of non-blank fields on each line)
+
+        The fields use the implicit exponent format, ex: -1.234-3 is -1.234e-3.
+    """
+
+    # Pad the lines out to a whole number of fields and view them as an array of 8-byte fields.
+    n_lines = lines.__len__()
+    if n_lines == 0:
+        return np.zeros(0), np.zeros(0, dtype=int)
+    width = -(-max(map(len, lines)) // 8) * 8
+    if width == 0:
+        return np.zeros(0), np.zeros(n_lines, dtype=int)
+    text = ''.join([line.ljust(width) for line in lines]).encode('latin-1')
+    fields = np.frombuffer(text, dtype=np.uint8).reshape(n_lines, width // 8, 8)
+
+    # Drop the blank fields.
+    keep = (fields != ord(' ')).any(axis=2)
+    counts = keep.sum(axis=1)
+    fields = fields[keep]
+
+    # Insert the 'e' in front of any sign that follows a digit or decimal point.
+    prev = np.zeros_like(fields)
+    prev[:, 1:] = fields[:, :-1]
+    sign = (fields == ord('-')) | (fields == ord('+'))
+    num = ((prev >= ord('0')) & (prev <= ord('9'))) | (prev == ord('.'))
+    ins = sign & num
+    has_exp = ins.any(axis=1)
+    col = np.where(has_exp, ins.argmax(axis=1), 8)
+    j = np.arange(8)
+    dest = j + (j >= col[:, None])
+    out = np.full((fields.shape[0], 9), ord(' '), dtype=np.uint8)
+    out[np.arange(fields.shape[0])[:, None], dest] = fields
+    out[has_exp, col[has_exp]] = ord('e')
+
+    values = out.view('S9').ravel().astype(float)
+    return values, counts
+
+
+def bad_line(lines):
+    """Function to find the first pfile data line that will not convert to floats."""
+    for i, line in enumerate(lines):
+        try:
+            parse_fields([line])
+        except ValueError:
+            return i
+    return 0
 
 
 def auto_ts(time, vec, tol, ring):
     """Function to minimize time steps.
         inputs: time
-                vec
-                tol (difference in vec for auto cut outs)
+                vec (one signal [n], or one column per dof [n x m...], the time steps along the first axis)
+                tol (difference in vec for auto cut outs, a scalar or one per dof broadcast over [m...])
                 ring (amount before and after to keep in seconds)
-        outputs: f_index (index of data points to remove)
+        outputs: f_index (index of the time steps to keep)
     """
 
     # Assuming dt is uniform for all time steps.
+    time = np.ravel(time)
+    vec = np.asarray(vec)
+    n = time.size
     dt = time[1] - time[0]
 
     # Determine the ring up/down number of points.
     nk = int(ring/dt)
 
-    # Setup an index of the original vector.
-    index = np.arange(0, time.size, 1)
-
-    # Determine the first non-zero element and delete all but the
-    #  first point and the point before the first non-zero point.
-    i_non_zero = np.nonzero(vec)[0][0]
-    time = np.delete(time, np.s_[1:i_non_zero-1:1], 0)
-    vec = np.delete(vec, np.s_[1:i_non_zero - 1:1], 0)
-    index = np.delete(index, np.s_[1:i_non_zero - 1:1], 0)
-
-    # Keep only indices that have a change in vec greater than tol and
-    #  keep the indices nk indices in both directions around each change in vec.
-    dv = np.absolute(vec[0:-1] - vec[1:])
-    dv = np.append(dv, 0)
-    k_index = index[dv > tol, ]
-    k_index = k_index[:, np.newaxis]
-    to_keep = np.tile(np.arange(-nk, nk, 1), (k_index.size, 1))
-    f_index = k_index + to_keep
-    f_index = np.unique(f_index)
-    f_index = f_index[(f_index >= index[1]) & (f_index <= index[-1])]
-    f_index = np.insert(f_index, 0, 0)
+    # Determine the first non-zero time step, all but the first point and the point before the first
+    #  non-zero point are removed.
+    non_zero = vec != 0
+    if non_zero.ndim > 1:
+        non_zero = non_zero.reshape(n, -1).any(axis=1)
+    if non_zero.any():
+        first = max(1, np.argmax(non_zero) - 1)
+    else:
+        first = n
+
+    # Find the time steps with a change in vec greater than tol (in any dof) to the next time step.
+    change = np.absolute(np.diff(vec, axis=0)) > tol
+    if change.ndim > 1:
+        change = change.reshape(n - 1, -1).any(axis=1)
+    k_index = np.flatnonzero(change)
+
+    # Keep the indices nk indices in both directions around each change in vec, [k - nk, k + nk).
+    cover = np.bincount(np.clip(k_index - nk, 0, n), minlength=n + 1)
+    cover -= np.bincount(np.clip(k_index + nk, 0, n), minlength=n + 1)
+    keep = np.cumsum(cover[0:n]) > 0
+    keep[0:first] = False
+    f_index = np.append(0, np.flatnonzero(keep))
 
     return f_index
 
@@ -379,7 +920,12 @@ def modal_p(pfile, phi):
         inputs: pfile <PFILE object (only one case)>
                 phi <PHI object>
         outputs: p_modal <modal force vector>
+
+        For a case of load terms (PCASE) the coefficients of each term are projected onto the modes once and
+        p_modal is the sum of their products with the time functions.
     """
+    if isinstance(pfile, PCASE):
+        return modal_p_terms(pfile, phi)
 
     # Define the forcing function, retaining only non-zero load vectors.
     applied_grids = pfile['grids']
@@ -396,12 +942,48 @@ def modal_p(pfile, phi):
     p = load.transpose()
 
     # Find the applied load dofs rows in the PHI matrix.
-    phi_applied = np.zeros([ndof, phi.num_modes])
-    for i, dof in enumerate(applied_dofs):
-        i_dof = phi.dofs.index(dof)
-        phi_applied[i, :] = phi.phi[i_dof, :]
+    i_dofs = phi.dof_index.find(applied_dofs)
+    if (i_dofs < 0).any():
+        missing = [dof for dof, i in zip(applied_dofs, i_dofs) if i < 0]
+        raise Exception('!!! Applied DOF {0} not in PHI !!!'.format(missing))
+    phi_applied = phi.phi[i_dofs, :]
 
     # Determine the modal force vector for each time step. P = PHI_T * p
     p_modal = phi_applied.transpose() @ p
 
     return p_modal
+
+
+def modal_p_terms(pcase, phi):
+    """Function to find the modal load vector for a case of load terms (PCASE).
+        inputs: pcase <PCASE of one case>
+                phi <PHI object>
+        outputs: p_modal <modal force vector>
+
+        As in modal_p, a dof of a grid is applied if the sum of its load history is non-zero.
+    """
+
+    # Find the applied dofs of each term (non-zero coefficient of a dof of its grid with a load) in the PHI matrix.
+    time, f = pcase.stacked()
+    grids = [int(g.split('_')[0]) if type(g) is str else g for g in pcase.term_grid]
+    dofs = [(g, d + 1) for g in grids for d in range(6)]
+    i_dofs = phi.dof_index.find(dofs).reshape(-1, 6)
+    applied = pcase.coef != 0
+    for rows in pcase.grid_rows():
+        applied[rows] &= np.abs((f[rows].T @ pcase.coef[rows]).sum(axis=0)) > 0.0
+    if (applied & (i_dofs < 0)).any():
+        missing = [dofs[i] for i in np.flatnonzero(applied & (i_dofs < 0))]
+        raise Exception('!!! Applied DOF {0} not in PHI !!!'.format(missing))
+
+    # Project the coefficients of each term onto the modes, then P = sum of (PHI_T * coef) * f.
+    phi_coef = np.einsum('bd,bdm->bm', np.where(applied, pcase.coef, 0), phi.phi[np.where(applied, i_dofs, 0)])
+    p_modal = phi_coef.T @ f
+
+    return p_modal
+
+
+def case_time(case):
+    """Function to return the time vector of a synced case."""
+    if isinstance(case, PCASE):
+        return case.stacked()[0]
+    return case[case['grids'][0]][:, 0]
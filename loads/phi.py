@@ -1,23 +1,52 @@
 from PyLnD.loads.read_f06 import read_msf06_dofs
-from PyLnD.loads.read_op4 import read_op4_phi
+from PyLnD.loads.read_op4 import index_op4
+from PyLnD.loads.read_op4 import read_op4_matrix
+from PyLnD.loads.dof_index import DOFINDEX
 
 
 class PHI:
     """Normal modes matrix object."""
 
-    def __init__(self, op4file, f06file):
+    def __init__(self, op4file, f06file, dofs=None, modes=None, mmap='no'):
         """Initializing the PHI object attributes.
 
             Ex:  PHI(op4file, f06file)
+
+            Ex:  Keep only the rows of the applied load dofs and modes 1 to 200, the first mode kept is
+                 phi.first_mode.
+                PHI(op4file, f06file, dofs=[(100012, 1), (100012, 2)], modes=[1, 200])
+
+            Ex:  Memory map the mode shapes instead of reading them (full dense columns only).
+                PHI(op4file, f06file, mmap='yes')
         """
         self.op4file = op4file
         self.f06file = f06file
         # Extract the dof from the mode shape f06 file.
         self.grids, self.dofs = read_msf06_dofs(self.f06file)
-        # Extract the mode shapes from the binary op4 file.
-        self.phi_name, self.phi = read_op4_phi(self.op4file)
-        self.num_dofs, self.num_modes = self.phi.shape
-        if self.dofs.__len__() != self.num_dofs:
+        # Index the binary op4 file and check it against the f06 before reading any mode shapes.
+        buf, index = index_op4(self.op4file)
+        if not index:
+            raise Exception('!!! No matrix in the op4 file {0} !!!'.format(self.op4file))
+        self.phi_name = list(index.keys())[0]
+        num_dofs = index[self.phi_name]['n_rows']
+        if self.dofs.__len__() != num_dofs:
             raise Exception("The number of dofs in the binary op4 and the f06 are not the same !!!\n"
-                            "\tNumber of PHI dofs: " + self.num_dofs.__str__() + "\n"
+                            "\tNumber of PHI dofs: " + num_dofs.__str__() + "\n"
             + "\tNumber of F06 dofs: " + self.dofs.__len__().__str__())
+        # Keep only the requested dofs.
+        rows = None
+        if dofs is not None:
+            rows = DOFINDEX(self.dofs).find(dofs)
+            if (rows < 0).any():
+                missing = [dof for dof, i in zip(dofs, rows) if i < 0]
+                raise Exception('!!! DOF {0} not in PHI !!!'.format(missing))
+            self.dofs = [self.dofs[i] for i in rows]
+            self.grids = list(dict.fromkeys([dof[0] for dof in self.dofs]))
+        self.dof_index = DOFINDEX(self.dofs)
+        # Extract the mode shapes from the binary op4 file.
+        self.phi = read_op4_matrix(buf, index[self.phi_name], rows=rows, cols=modes, view=mmap in ['yes', True])
+        if self.phi.base is not buf:
+            buf.close()
+        self.num_dofs, self.num_modes = self.phi.shape
+        self.modes = modes
+        self.first_mode = 1 if modes is None else int(modes[0])
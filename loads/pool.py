@@ -0,0 +1,143 @@
+import numpy as np
+from types import SimpleNamespace
+
+# Screening object rebuilt once in each worker process from the shared model matrices.
+worker_scr = None
+worker_shm = []
+
+
+def share_array(a):
+    """Function to copy an array into a new shared memory block.
+
+        inputs: a <numpy array>
+        outputs: shm <SharedMemory block, the caller must close and unlink it>
+                 desc <(name, shape, dtype) used by attach_array in a worker>
+    """
+    from multiprocessing import shared_memory
+
+    a = np.ascontiguousarray(a)
+    shm = shared_memory.SharedMemory(create=True, size=max(a.nbytes, 1))
+    np.ndarray(a.shape, dtype=a.dtype, buffer=shm.buf)[...] = a
+    return shm, (shm.name, a.shape, a.dtype.str)
+
+
+def new_array(shape, dtype=float):
+    """Function to allocate a zeroed array in a new shared memory block, for a worker to write a result into.
+
+        inputs: shape <array shape>
+        outputs: shm <SharedMemory block, the caller must close and unlink it>
+                 desc <(name, shape, dtype) used by attach_array in a worker>
+    """
+    from multiprocessing import shared_memory
+
+    dtype = np.dtype(dtype)
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * dtype.itemsize, 1))
+    return shm, (shm.name, tuple(shape), dtype.str)
+
+
+def attach_array(desc):
+    """Function to view an array placed in shared memory by share_array or new_array without copying it.
+
+        The block belongs to the process that created it and is not tracked by the attaching process.  Before
+        Python 3.13 attaching always registers the block, but the workers share the resource tracker of the
+        parent (which already holds the block), so the registration is left for the parent's unlink to remove.
+
+        inputs: desc <(name, shape, dtype) from share_array or new_array>
+        outputs: shm <SharedMemory block, keep a reference while the view is in use and close it after>
+                 a <numpy array view of the block>
+    """
+    from multiprocessing import shared_memory
+
+    name, shape, dtype = desc
+    try:
+        shm = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def share_model(scr):
+    """Function to place the PHI, LTM and eigen data of a SCR object in shared memory once.
+
+        inputs: scr <SCR object>
+        outputs: blocks <list of SharedMemory blocks, the caller must close and unlink them>
+                 model <description of the model passed to init_worker>
+    """
+
+    arrays = {'phi': scr.phi.phi, 'dtm': scr.ltm.dtm, 'atm': scr.ltm.atm,
+              'eigenvalues': np.asarray(scr.eig.eigenvalues, dtype=float),
+              'frequency': np.asarray(scr.eig.frequency, dtype=float),
+              'zeta': np.asarray(scr.zeta, dtype=float)}
+    blocks = []
+    model = {'name': scr.name, 'dofs': scr.phi.dofs, 'dof_index': scr.phi.dof_index, 'num_modes': scr.phi.num_modes,
+             'first_mode': scr.phi.first_mode, 'rss_ptr': scr.ltm.rss_ptr, 'rss_idx': scr.ltm.rss_idx,
+             'rss_labels': scr.ltm.rss_labels, 'acron_dofs': scr.ltm.acron_dofs, 'modes': scr.modes,
+             'mode_residual': scr.mode_residual, 'f_rigid': scr.f_rigid}
+    for k, v in arrays.items():
+        shm, model[k] = share_array(v)
+        blocks.append(shm)
+    return blocks, model
+
+
+def init_worker(model):
+    """Function to rebuild the screening model in a worker process from shared memory.
+
+        The shared blocks are closed by close_worker when the worker exits.
+    """
+    from multiprocessing.util import Finalize
+    from PyLnD.loads.scr import SCR
+
+    global worker_scr
+    scr = SCR(model['name'])
+    a = {}
+    for k in ['phi', 'dtm', 'atm', 'eigenvalues', 'frequency', 'zeta']:
+        shm, a[k] = attach_array(model[k])
+        worker_shm.append(shm)
+    scr.phi = SimpleNamespace(phi=a['phi'], dofs=model['dofs'], dof_index=model['dof_index'],
+                              num_modes=model['num_modes'], first_mode=model['first_mode'])
+    scr.ltm = SimpleNamespace(dtm=a['dtm'], atm=a['atm'], rss_ptr=model['rss_ptr'], rss_idx=model['rss_idx'],
+                              rss_labels=model['rss_labels'], acron_dofs=model['acron_dofs'])
+    scr.eig = SimpleNamespace(eigenvalues=a['eigenvalues'], frequency=a['frequency'])
+    scr.zeta = a['zeta']
+    scr.modes = model['modes']
+    scr.mode_residual = model['mode_residual']
+    scr.f_rigid = model['f_rigid']
+    worker_scr = scr
+    Finalize(None, close_worker, exitpriority=10)
+
+
+def close_worker():
+    """Function to drop the worker model and close its views of the shared model blocks."""
+    global worker_scr
+
+    worker_scr = None
+    while worker_shm:
+        worker_shm.pop().close()
+
+
+def run_case(task):
+    """Function to integrate, ring down, recover and RSS one case in a worker process.
+
+        The eta and u histories are written into the shared output blocks made for the case by the parent,
+        only the (small) envelopes are sent back.
+
+        inputs: task <(case number, pfile case dictionary, rbm, method, ring, accel, eta block, u block)>
+        outputs: (case number, env, env_ring), the envelopes are None unless ring='envelope'
+    """
+
+    c, case, rbm, method, ring, accel, eta_desc, u_desc = task
+    scr = worker_scr
+    scr.pfile = SimpleNamespace(case={c: case})
+    scr.time[c], p_modal = scr.modal_load(c, ring)
+    [scr.eta[c], etad] = scr.integrate(scr.time[c], p_modal, method)
+    scr.finish_case(c, etad, rbm, ring, p_modal=p_modal if accel else None)
+
+    # Write the histories into the shared output blocks.
+    for desc, result in [(eta_desc, scr.eta.pop(c)), (u_desc, scr.u.pop(c))]:
+        shm, out = attach_array(desc)
+        out[...] = result
+        del out
+        shm.close()
+    scr.time.pop(c)
+    scr.pfile = []
+    return c, scr.env.pop(c, None), scr.env_ring.pop(c, None)
@@ -1,26 +1,272 @@
-def read_op4_phi(msfile):
-    """Function to read a NASTRAN op4 file into numpy array.
+import mmap
+import numpy as np
+
+
+def index_op4(msfile):
+    """Function to index the matrices of a binary op4 file by the byte offset of their data, without reading it.
 
     \tMSC Nastran 2012.2 DMAP Programmer's Guide: OUTPUT4 page 1243
+
+        Each column record is either dense (a run of values starting at row IROW) or, when IROW = 0, sparse
+        (strings of values each with its own start row, the BIGMAT form when NROW < 0).  Every run of values is
+        indexed as a segment [column, first row, number of values, byte offset], 0 based.
+
+        inputs: msfile <binary op4 file>
+        outputs: buf <read only memory map of the file>
+                 index <dict of matrix name: {'n_rows', 'n_cols', 'form', 'type', 'dtype', 'bigmat', 'segments'}>
     """
-    import numpy as np
 
-    # Read through the binary op4 words to find data.
-    with open(msfile, 'r') as f:
-        [bytes_in_record] = np.fromfile(f, dtype=np.int32, count=1)
+    # Memory map the file, the byte order follows from the length of the first (header) record.
+    with open(msfile, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    size = buf.size()
+    endian = '<'
+    if np.frombuffer(buf, dtype='<i4', count=1)[0] not in (8, 24):
+        endian = '>'
+    i4 = np.dtype(endian + 'i4')
+
+    index = {}
+    pos = 0
+    while pos + 4 <= size:
+        # Read the matrix header record.
+        [bytes_in_record] = np.frombuffer(buf, dtype=i4, count=1, offset=pos)
         if bytes_in_record == 8:    # Slightly different format for plm.f12
-            [num_cols, num_rows] = np.fromfile(f, dtype=np.int32, count=2)
-            [bytes_in_record_end] = np.fromfile(f, dtype=np.int32, count=1)
+            [num_cols, num_rows] = np.frombuffer(buf, dtype=i4, count=2, offset=pos + 4)
+            matrix_form, matrix_type = 0, 1
             matrix_name = 'DIS'
-        elif bytes_in_record == 24: # NASTRAN f12
-            [num_cols, num_rows, matrix_form, matrix_type] = np.fromfile(f, dtype=np.int32, count=4)
-            matrix_name = np.fromfile(f, dtype=np.int8, count=8)
-            matrix_name = ''.join([chr(item) for item in matrix_name]).strip()
-            [bytes_in_record_end] = np.fromfile(f, dtype=np.int32, count=1)
-        phi = np.zeros([num_rows, num_cols])
-        # For each row read and save matrix.
-        for i in range(0, num_cols):
-            [bytes_in_record, i_col, i_row, num_words] = np.fromfile(f, dtype=np.int32, count=4)
-            phi[i_row - 1:num_words, i_col - 1] = np.fromfile(f, dtype=np.float32, count=num_words)
-            [bytes_in_record_end] = np.fromfile(f, dtype=np.int32, count=1)
+        elif bytes_in_record == 24:   # NASTRAN f12
+            [num_cols, num_rows, matrix_form, matrix_type] = np.frombuffer(buf, dtype=i4, count=4, offset=pos + 4)
+            matrix_name = buf[pos + 20:pos + 28].decode('ascii', 'replace').strip()
+        else:
+            raise Exception('!!! Unrecognized op4 header record of {0} bytes at byte {1} !!!'.format(
+                bytes_in_record, pos))
+        if matrix_type not in (1, 2):
+            raise Exception('!!! Only real single and double precision op4 matrices are supported, {0} is type '
+                            '{1} !!!'.format(matrix_name, matrix_type))
+        dtype = np.dtype(endian + ('f4', 'f8')[matrix_type - 1])
+        bigmat = num_rows < 0
+        num_rows = abs(int(num_rows))
+        pos += bytes_in_record + 8
+
+        # Index each column record until the end of the matrix (a column past the last) or the end of the file.
+        segments = []
+        while pos + 16 <= size:
+            [bytes_in_record, i_col, i_row, num_words] = np.frombuffer(buf, dtype=i4, count=4, offset=pos)
+            data = pos + 16
+            pos += bytes_in_record + 8
+            if i_col > num_cols:
+                break
+            if i_row > 0:
+                segments.append((i_col - 1, i_row - 1, (bytes_in_record - 12) // dtype.itemsize, data))
+            else:
+                segments.extend(op4_strings(buf, i4, data, data + bytes_in_record - 12, i_col - 1, dtype.itemsize,
+                                            bigmat))
+            if i_col == num_cols and matrix_form == 0:
+                break
+        index[matrix_name] = {'n_rows': num_rows, 'n_cols': int(num_cols), 'form': int(matrix_form),
+                              'type': int(matrix_type), 'dtype': dtype, 'bigmat': bigmat,
+                              'segments': np.array(segments, dtype=np.int64).reshape(-1, 4)}
+    return buf, index
+
+
+def op4_strings(buf, i4, pos, end, col, itemsize, bigmat):
+    """Function to index the strings of a sparse op4 column record as segments."""
+    segments = []
+    while pos < end:
+        if bigmat:
+            [num_words, i_row] = np.frombuffer(buf, dtype=i4, count=2, offset=pos)
+            num_words -= 1
+            pos += 8
+        else:
+            [string_header] = np.frombuffer(buf, dtype=i4, count=1, offset=pos)
+            num_words = string_header // 65536 - 1
+            i_row = string_header - 65536 * (num_words + 1)
+            pos += 4
+        segments.append((col, i_row - 1, num_words * 4 // itemsize, pos))
+        pos += num_words * 4
+    return segments
+
+
+def read_op4_matrix(buf, entry, rows=None, cols=None, view=False):
+    """Function to read a matrix indexed by index_op4, optionally only some of its rows and columns.
+
+        inputs: buf, entry <memory map and index entry from index_op4>
+                rows <row numbers to read, 0 based, default all>
+                cols <[first, last] column numbers to read, 1 based, default all>
+                view <'yes' to return a read only view of the file without copying when the matrix is stored
+                      as full dense columns equally spaced in the file, the file precision is kept>
+        outputs: matrix <[rows x cols] float64 array>
+    """
+    if cols is None:
+        cols = [1, entry['n_cols']]
+    c0, c1 = int(cols[0]) - 1, int(cols[1])
+    if c0 < 0 or c1 > entry['n_cols'] or c0 >= c1:
+        raise Exception('!!! Columns {0} are not in the op4 matrix of {1} columns !!!'.format(cols, entry['n_cols']))
+    n_rows = entry['n_rows']
+    if rows is not None:
+        rows = np.asarray(rows, dtype=np.int64).ravel()
+        if rows.size and (rows.min() < 0 or rows.max() >= n_rows):
+            raise Exception('!!! Rows outside of the op4 matrix of {0} rows !!!'.format(n_rows))
+    seg = entry['segments']
+    seg = seg[(seg[:, 0] >= c0) & (seg[:, 0] < c1)]
+
+    # Full dense columns at a constant stride are a strided array over the file itself.
+    dense = seg.shape[0] == c1 - c0 and (seg[:, 0] == np.arange(c0, c1)).all() and (seg[:, 1] == 0).all() \
+        and (seg[:, 2] == n_rows).all() and (np.diff(seg[:, 3], 2) == 0).all()
+    if view and dense:
+        stride = int(seg[1, 3] - seg[0, 3]) if seg.shape[0] > 1 else n_rows * entry['dtype'].itemsize
+        matrix = np.ndarray(shape=(n_rows, c1 - c0), dtype=entry['dtype'], buffer=buf, offset=int(seg[0, 3]),
+                            strides=(entry['dtype'].itemsize, stride))
+        return matrix if rows is None else matrix[rows]
+
+    # Otherwise copy each segment into the matrix, with a row subset only the requested values are touched.
+    if rows is None:
+        matrix = np.zeros([n_rows, c1 - c0])
+        for col, row, num, offset in seg.tolist():
+            matrix[row:row + num, col - c0] = np.frombuffer(buf, dtype=entry['dtype'], count=num, offset=offset)
+    else:
+        matrix = np.zeros([rows.size, c1 - c0])
+        order = np.argsort(rows, kind='stable')
+        sorted_rows = rows[order]
+        bounds = np.searchsorted(sorted_rows, np.stack([seg[:, 1], seg[:, 1] + seg[:, 2]]))
+        for (col, row, num, offset), i0, i1 in zip(seg.tolist(), bounds[0].tolist(), bounds[1].tolist()):
+            if i1 > i0:
+                values = np.frombuffer(buf, dtype=entry['dtype'], count=num, offset=offset)
+                matrix[order[i0:i1], col - c0] = values[sorted_rows[i0:i1] - row]
+    return matrix
+
+
+def read_op4_phi(msfile, rows=None, modes=None, mmap='no'):
+    """Function to read a NASTRAN op4 file into numpy array.
+
+    \tMSC Nastran 2012.2 DMAP Programmer's Guide: OUTPUT4 page 1243
+
+        Ex:  Read the whole of the first matrix.
+            matrix_name, phi = read_op4_phi('ms_xp93s1gl.f12')
+
+        Ex:  Read only rows 0, 1 and 2 (0 based) of the first 200 modes.
+            matrix_name, phi = read_op4_phi('ms_xp93s1gl.f12', rows=[0, 1, 2], modes=[1, 200])
+
+        Ex:  Memory map the matrix instead of reading it, when stored as full dense columns.
+            matrix_name, phi = read_op4_phi('ms_xp93s1gl.f12', mmap='yes')
+    """
+    view = mmap in ['yes', True]
+    buf, index = index_op4(msfile)
+    if not index:
+        raise Exception('!!! No matrix in the op4 file {0} !!!'.format(msfile))
+    matrix_name = list(index.keys())[0]
+    phi = read_op4_matrix(buf, index[matrix_name], rows=rows, cols=modes, view=view)
+    if phi.base is not buf:
+        buf.close()
     return matrix_name, phi
+
+
+def read_ascii_op4(name, matrices=None, lines=False):
+    """Function to read the matrices of an ASCII op4 (ot4) file.
+
+        The matrix headers (the lines with the ',' of the format), the integer records (column headers
+        [ICOL, IROW, NW] and, for sparse columns with IROW = 0, the string headers) and the data lines are located in
+        one scan of the file.  The numbers of each requested matrix are then converted from the raw bytes at once and
+        placed from the start row of the column or string they follow.
+
+        The matrices are keyed by their name with the blanks collapsed (' '.join(name.split())), 'header' is the
+        matrix header line for readers that name them otherwise.  With lines, 'lines' is the stack of the data lines
+        that hold a full record count [n_lines x records per line], in file order.
+
+        inputs: name <ASCII op4 file>
+                matrices <names of the matrices to read, default all>
+                lines <True to also return the stack of full data lines>
+        outputs: op4 <dict of matrix name: {'n_rows', 'n_cols', 'form', 'type', 'header', 'data' [n_rows x n_cols]}>
+
+        Ex:  op4 = read_ascii_op4('s4red_90.ot4', matrices=['KAA'])
+    """
+
+    # Locate the lines of the file, padded so a fixed width window can start at any line.
+    with open(name, 'rb') as f:
+        text = f.read()
+    raw = np.frombuffer(text + b' ' * 128, dtype=np.uint8)
+    ends = np.flatnonzero(raw[0:text.__len__()] == ord('\n'))
+    if text and text[-1:] != b'\n':
+        ends = np.append(ends, text.__len__())
+    starts = np.append(0, ends[:-1] + 1).astype(np.int64)
+    ends = ends - ((ends > starts) & (raw[ends - 1] == ord('\r')))
+
+    # Classify the lines as data (a '.' or exponent in the first field), matrix headers (a ',') and integer records.
+    number = np.zeros(256, dtype=bool)
+    number[np.frombuffer(b'.EeDd', dtype=np.uint8)] = True
+    first = np.lib.stride_tricks.sliding_window_view(raw, 24)[starts]
+    is_data = (number[first] & (np.arange(24) < (ends - starts)[:, np.newaxis])).any(axis=1)
+    is_int = ~is_data & (ends > starts)
+    is_head = np.zeros(ends.size, dtype=bool)
+    for i in np.flatnonzero(is_int):
+        is_head[i] = b',' in raw[starts[i]:ends[i]].tobytes()
+    is_int &= ~is_head
+    heads = np.append(np.flatnonzero(is_head), ends.size)
+
+    op4 = {}
+    for h, h_next in zip(heads[:-1], heads[1:]):
+        # Get the matrix properties.
+        line = raw[starts[h]:ends[h]].tobytes().decode('latin-1')
+        n_cols = int(line[0:8])
+        n_rows = abs(int(line[8:16]))
+        form = int(line[16:24])
+        m_type = int(line[24:32])
+        m_name = ' '.join(line[32:40].split())
+        nrec_per_line = int(line[43])
+        rec_size = int(line[45:47])
+        if matrices is not None and m_name not in matrices:
+            continue
+        if m_name not in op4.keys():
+            op4[m_name] = {'n_rows': n_rows, 'n_cols': n_cols, 'form': form, 'type': m_type, 'header': line,
+                           'data': np.zeros([n_rows, n_cols], dtype=complex if m_type > 2 else float)}
+        if lines:
+            op4[m_name]['lines'] = np.zeros([0, nrec_per_line])
+
+        # Read the integer records, the column of each and the row its values start at.
+        i_ints = h + 1 + np.flatnonzero(is_int[h + 1:h_next])
+        seg_col = np.zeros(i_ints.size, dtype=np.int64)
+        seg_row = np.zeros(i_ints.size, dtype=np.int64)
+        col = -1
+        for j, i in enumerate(i_ints):
+            record = raw[starts[i]:ends[i]].tobytes().decode('latin-1')
+            words = [int(record[k:k + 8]) for k in range(0, record.__len__(), 8)]
+            if words.__len__() >= 3:        # Column header, ICOL, IROW (0 for sparse strings), NW
+                col = words[0] - 1
+                row = words[1] - 1
+            elif words.__len__() == 2:      # Sparse string header (BIGMAT), L + 1, IROW
+                row = words[1] - 1
+            else:                           # Sparse string header, IROW + 65536 * (L + 1)
+                row = words[0] % 65536 - 1
+            seg_col[j] = col
+            seg_row[j] = row
+
+        # Convert all the numbers of the data lines at once.
+        i_data = h + 1 + np.flatnonzero(is_data[h + 1:h_next])
+        if i_data.size == 0:
+            continue
+        if i_ints.size == 0 or i_data[0] < i_ints[0]:
+            raise Exception('!!! Data before the first column header of {0} in {1} !!!'.format(m_name, name))
+        field = starts[i_data, np.newaxis] + rec_size * np.arange(nrec_per_line)
+        filled = field + rec_size <= ends[i_data, np.newaxis]
+        fields = np.lib.stride_tricks.sliding_window_view(raw, rec_size)[field[filled]]
+        blank = (fields == ord(' ')).all(axis=1)
+        fields[(fields == ord('D')) | (fields == ord('d'))] = ord('E')
+        values = fields[~blank].view('S{0}'.format(rec_size)).ravel().astype(float)
+        filled[filled] = ~blank
+        if lines:
+            counts = filled.sum(axis=1)
+            full = np.flatnonzero(counts == nrec_per_line)
+            offset = np.append(0, np.cumsum(counts)[:-1])[full]
+            op4[m_name]['lines'] = values[offset[:, np.newaxis] + np.arange(nrec_per_line)]
+        seg = np.repeat(np.searchsorted(i_ints, i_data) - 1, filled.sum(axis=1))
+        if m_type > 2:
+            values = values[0::2] + 1j * values[1::2]
+            seg = seg[0::2]
+
+        # Place the values from the start row of their column or string, skipping the trailing column record.
+        first = np.searchsorted(seg, np.arange(i_ints.size))
+        rows = seg_row[seg] + np.arange(seg.size) - first[seg]
+        cols = seg_col[seg]
+        keep = (cols < n_cols) & (rows >= 0) & (rows < n_rows)
+        op4[m_name]['data'][rows[keep], cols[keep]] = values[keep]
+    return op4
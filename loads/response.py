@@ -0,0 +1,81 @@
+import numpy as np
+
+
+class RESPONSE:
+    """Recovered responses of a case [n_rows x n_points], each row recovered from the modal displacements
+    (dtm[rows] @ eta, then the HWLIST RSS) only when it is first indexed and kept for later use."""
+
+    def __init__(self, dtm, eta, rss_ptr, rss_idx):
+        """Initializing the RESPONSE object.
+
+            Ex:  u = RESPONSE(ltm.dtm, eta, ltm.rss_ptr, ltm.rss_idx)
+                 u[i_dof, :]
+        """
+        self.dtm = dtm
+        self.eta = eta
+        self.rss_ptr = np.asarray(rss_ptr, dtype=np.int64)
+        self.rss_idx = np.asarray(rss_idx, dtype=np.int64)
+        self.n_ltm = dtm.shape[0]
+        self.shape = (self.n_ltm + self.rss_ptr.size - 1, eta.shape[1])
+        self.ndim = 2
+        self.dtype = np.dtype(float)
+        self.rows = {}
+        self.full = None
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        if self.full is not None:
+            return self.full[key]
+
+        # Split the row index from the time index and recover the rows it selects.
+        if type(key) is not tuple:
+            key = (key,)
+        if key[0] is Ellipsis:
+            key = (slice(None),) + key
+        rows = np.arange(self.shape[0])[key[0]]
+        block = self.recover(np.atleast_1d(rows))
+        pos = np.arange(block.shape[0]).reshape(np.shape(rows))
+        return block[(pos,) + key[1:]]
+
+    def __array__(self, dtype=None, copy=None):
+        if self.full is None:
+            self.full = self.recover(np.arange(self.shape[0]))
+            self.rows = {}
+        if dtype is not None:
+            return self.full.astype(dtype)
+        return self.full
+
+    def recover(self, rows):
+        """Method to recover a list of rows [n x n_points], the LTM rows in one product.
+
+            Ex:  u_rows = u.recover([0, 5, 12])
+        """
+        rows = np.asarray(rows, dtype=np.int64).ravel()
+        if (rows < 0).any() or (rows >= self.shape[0]).any():
+            raise Exception('!!! Response row out of range [0, {0}) !!!'.format(self.shape[0]))
+
+        # The LTM rows needed, directly or by the RSS rows, that are not kept yet.
+        new = set(rows.tolist()) - self.rows.keys()
+        need = {i for i in new if i < self.n_ltm}
+        for i in new - need:
+            g = i - self.n_ltm
+            need.update(self.rss_idx[self.rss_ptr[g]:self.rss_ptr[g + 1]].tolist())
+        need = np.array(sorted(need - self.rows.keys()), dtype=np.int64)
+        if need.size:
+            u = np.matmul(self.dtm[need], self.eta)
+            for i, u_row in zip(need.tolist(), u):
+                self.rows[i] = u_row
+
+        # Square sum the LTM rows of each RSS row and take the root.
+        for i in sorted(new):
+            if i >= self.n_ltm:
+                g = i - self.n_ltm
+                items = self.rss_idx[self.rss_ptr[g]:self.rss_ptr[g + 1]].tolist()
+                self.rows[i] = np.sqrt(np.sum(np.square([self.rows[j] for j in items]), axis=0))
+
+        u = np.empty([rows.size, self.shape[1]])
+        for n, i in enumerate(rows.tolist()):
+            u[n] = self.rows[i]
+        return u
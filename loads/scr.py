@@ -1,10 +1,24 @@
 from PyLnD.loads.rf_functions import rf_mdof
+from PyLnD.loads.rf_functions import RFCACHE
+from PyLnD.loads.rf_functions import rf_free
+from PyLnD.loads.rf_functions import rf_fft
+from PyLnD.loads.rf_functions import rf_accel
 from PyLnD.loads.pfile import modal_p
+from PyLnD.loads.pfile import case_time
 from PyLnD.loads.phi import PHI
 from PyLnD.loads.hwlist import HWLIST
 from PyLnD.loads.ltm import LTM
 from PyLnD.loads.eig import EIG
+from PyLnD.loads.bas import BAS
 from PyLnD.loads.pfile import PFILE
+from PyLnD.loads.envelope import ENVELOPE
+from PyLnD.loads.envelope import env_dtype
+from PyLnD.loads.envelope import sweep_table
+from PyLnD.loads.response import RESPONSE
+from PyLnD.loads.bundle import save_bundle
+from PyLnD.loads.bundle import load_bundle
+from PyLnD.loads.checkpoint import checkpoint_files, run_key, ltm_signature, save_checkpoint, read_checkpoint, \
+    remove_checkpoint
 from pylab import *
 
 
@@ -19,22 +33,41 @@ class SCR:
         self.ltm = []
         self.eig = []
         self.pfile = []
+        self.bas = []
         self.zeta = []
+        self.modes = None
+        self.mode_residual = True
+        self.f_rigid = 0.01
+        self.residual = {}
         self.u = {}
         self.eta = {}
         self.time = {}
+        self.env = {}
+        self.env_ring = {}
+        self.env_sweep = {}
+        self.spill = {}
+        self.rfc = RFCACHE()
 
     def load_phi(self, **kwargs):
         """Method to load the Normal Modes Matrix (PHI) into the analysis.
 
         Procedure to load the f12 and corresponding f06.
           scr.load_phi(msf12='ms_xp93s1gl.f12', msf06='ms_xp93s1gl.f06')
+
+        Keep only the rows of some dofs (e.g. the applied loads of a screening run) and/or a range of modes, the
+        eigenvalues and LTM columns are cut to the same modes (see fit_modes).
+          scr.load_phi(msf12='ms_xp93s1gl.f12', msf06='ms_xp93s1gl.f06', dofs=[(100012, 1), (100012, 2)],
+                       modes=[1, 200])
+
+        Memory map the mode shapes instead of reading them.
+          scr.load_phi(msf12='ms_xp93s1gl.f12', msf06='ms_xp93s1gl.f06', mmap='yes')
         """
-        msf12 = kwargs['msf12']
-        msf06 = kwargs['msf06']
+        msf12 = kwargs.pop('msf12')
+        msf06 = kwargs.pop('msf06')
 
-        self.phi = PHI(msf12, msf06)
+        self.phi = PHI(msf12, msf06, **kwargs)
         self.zeta = 0.01 * np.ones([self.phi.num_modes])
+        self.fit_modes()
 
     def load_hwlist(self, **kwargs):
         """Method to load the Hardware List (HWLIST) into the analysis.
@@ -48,11 +81,17 @@ class SCR:
     def load_ltm(self, **kwargs):
         """Method to load the LTM into the analysis.
 
-        Ex:  scr.load_ltm(ltm='xp93zz_scr.pch)"""
-        ltm = kwargs['ltm']
+        Ex:  scr.load_ltm(ltm='xp93zz_scr.pch)
 
-        self.ltm = LTM(ltm)
+        Ex:  Memory map the LTM, keeping atm and dtm in float32.
+            scr.load_ltm(ltm='xp93zz_scr.pch', mmap='yes')
+        """
+        ltm = kwargs.pop('ltm')
+
+        self.ltm = LTM(ltm, **kwargs)
         self.ltm.label_ltm(self.hwlist)
+        self.ltm.index_rss(self.hwlist)
+        self.fit_modes()
 
     def load_eig(self, **kwargs):
         """Method to load the eigenvalue file into the analysis.
@@ -61,6 +100,52 @@ class SCR:
         eig = kwargs['eig']
 
         self.eig = EIG(eig)
+        self.fit_modes()
+
+    def fit_modes(self):
+        """Method to cut the eigenvalues and LTM columns to the mode range of a PHI loaded with modes=[start, end]
+            and check that PHI, EIG and LTM have the same number of modes.
+
+            Ex:  scr.fit_modes()
+        """
+        if not self.phi:
+            return
+        m0 = self.phi.first_mode - 1
+        m1 = m0 + self.phi.num_modes
+        if self.phi.modes is not None:
+            if self.eig and self.eig.eigenvalues.__len__() >= m1 and self.eig.eigenvalues.__len__() != m1 - m0:
+                self.eig.eigenvalues = self.eig.eigenvalues[m0:m1]
+                self.eig.frequency = self.eig.frequency[m0:m1]
+            if self.ltm and self.ltm.dtm.shape[1] >= m1 and self.ltm.dtm.shape[1] != m1 - m0:
+                self.ltm.dtm = self.ltm.dtm[:, m0:m1]
+                self.ltm.atm = self.ltm.atm[:, m0:m1]
+                self.ltm.num_modes = m1 - m0
+
+        # The modes of the loaded EIG and LTM must be the modes of PHI.
+        for name, obj, n_modes in [('EIG', self.eig, lambda: self.eig.eigenvalues.__len__()),
+                                   ('LTM', self.ltm, lambda: self.ltm.dtm.shape[1])]:
+            if obj and n_modes() != self.phi.num_modes:
+                raise Exception('!!! {0} has {1} modes, PHI has {2} (modes {3} to {4}) !!!'.format(
+                    name, n_modes(), self.phi.num_modes, m0 + 1, m1))
+
+    def load_bas(self, **kwargs):
+        """Method to load the BASFILE run parameters into the analysis.
+
+            The BASFILE mode range is run with scr.run(modes='bas').  The BASFILE modal damping (if any) sets the
+            damping of every mode only while it is still the default of load_phi, damping already set (load_zeta,
+            a bundle or scr.zeta) is kept.
+
+            Ex:  scr.load_bas(bas='xp93zz/BASFILE')
+        """
+        bas = kwargs['bas']
+
+        self.bas = BAS(bas)
+        if self.bas.modal_damp_pct != 'na' and self.phi:
+            if np.array_equal(self.zeta, 0.01 * np.ones([self.phi.num_modes])):
+                self.zeta = 0.01 * self.bas.modal_damp_pct * np.ones([self.phi.num_modes])
+            else:
+                print('The BASFILE modal damping of {0}% was not applied, the damping was already set\n'.format(
+                    self.bas.modal_damp_pct))
 
     def load_pfile(self, **kwargs):
         """Method to load the forcing function (PFILE) into the analysis.
@@ -69,6 +154,12 @@ class SCR:
 
         Ex:  scr.load_pfile(pfile='ff_xp93s1sp0001.dat', filetype=['pfile' or 'matfile'])
 
+        Ex:  Keep at most 16 parsed cases of the pfile in memory.
+            scr.load_pfile(pfile='ff_xp93s1sp0001.dat', filetype='pfile', max_cases=16)
+
+        Ex:  Reuse the parsed and synced cases cached by an earlier session (ff_xp93s1sp0001.dat.cache).
+            scr.load_pfile(pfile='ff_xp93s1sp0001.dat', filetype='pfile', cache='yes')
+
         Ex:  Parse the text data into numbers.
             scr.pfile.parse_pfile(case=[1,100])
 
@@ -82,13 +173,36 @@ class SCR:
             scr.pfile.sync(case=76, auto='yes', tstep=0.02)
 
         """
-        pfile = kwargs['pfile']
-        filetype = kwargs['filetype']
+        pfile = kwargs.pop('pfile')
 
-        # Loads the pfile and finds the indices, still need to sync and parse.
-        self.pfile = PFILE(pfile, filetype=filetype)
+        # Indexes the pfile, each case is parsed and synced when first accessed.
+        self.pfile = PFILE(pfile, **kwargs)
         # self.pfile.sync(tstep='auto')
 
+    def save_bundle(self, **kwargs):
+        """Method to save the loaded PHI, EIG, LTM (labelled with the HWLIST) and damping to a model bundle.
+
+            Ex:  scr.save_bundle(bundle='xp93s1_model.npz')
+
+            Ex:  Keep only the PHI rows of the dofs the forcing functions load.
+                scr.save_bundle(bundle='xp93s1_model.npz', dofs=[(100012, 1), (100012, 2)])
+        """
+        bundle = kwargs.pop('bundle')
+
+        save_bundle(self, bundle, **kwargs)
+
+    def load_bundle(self, **kwargs):
+        """Method to load PHI, EIG, LTM and damping from a model bundle instead of their files.
+
+            Ex:  scr.load_bundle(bundle='xp93s1_model.npz')
+
+            Ex:  Skip checking the bundle against its source files.
+                scr.load_bundle(bundle='xp93s1_model.npz', check='no')
+        """
+        bundle = kwargs.pop('bundle')
+
+        self.phi, self.eig, self.ltm, self.zeta = load_bundle(bundle, **kwargs)
+
     def load_zeta(self, **kwargs):
         """Method to load the damping file.
 
@@ -101,7 +215,9 @@ class SCR:
                 if line[0] != '$' and line[0] != 'i':
                     row = line.split()
                     row = list(map(float, row))
-                    self.zeta[int(row[0] - 1)] = 0.01 * row[1]
+                    i = int(row[0]) - self.phi.first_mode
+                    if 0 <= i < self.phi.num_modes:
+                        self.zeta[i] = 0.01 * row[1]
 
     def save2mat(self, outfile):
         """Method to save the scr object to a Matlab mat file.
@@ -112,10 +228,30 @@ class SCR:
         from matlab.mat_utilities import tuple2list as t2l
 
         doflist = {'acron_dofs': t2l(self.ltm.acron_dofs)}
-        outlist = [self.eta, self.u, self.time, doflist]
+        u = {c: np.asarray(self.u[c]) for c in self.u.keys()}
+        outlist = [self.eta, u, self.time, doflist]
         keylist = ['eta', 'u', 'time', 'ltm']
         save2mat(key=keylist, olist=outlist, ofile=outfile)
 
+    def dof_row(self, dof, labels=None):
+        """Method to find the row of an output DOF (acron, dof) or (eid, dof) in the recovered responses.
+
+            The labels of an envelope (the first rows of ltm.acron_dofs) limit the rows that can be found.
+
+            Ex:  i_dof = scr.dof_row(('N1PN3', 'TOR'))
+        """
+
+        # Find the dof tuple in the acron_dof index or the dof index from the ltm object.
+        if dof in self.ltm.acron_index.keys():
+            row = self.ltm.acron_index[dof]
+        elif dof in self.ltm.dof_index:
+            row = self.ltm.dof_index.index(dof)
+        else:
+            row = None
+        if row is None or (labels is not None and row >= labels.__len__()):
+            raise Exception("!!! DOF " + dof.__str__() + " not in LTM " + self.ltm.name)
+        return row
+
     def plot_u(self, **kwargs):
         """Method to plot the response in the time domain.
 
@@ -144,12 +280,7 @@ class SCR:
             dof = (item[1], item[2])
 
             # Find the dof tuple in the acron_dof list or the dof list from the ltm object.
-            if dof in self.ltm.acron_dofs:
-                i_dof = self.ltm.acron_dofs.index(dof)
-            elif dof in self.ltm.dofs:
-                i_dof = self.ltm.dofs.index(dof)
-            else:
-                raise Exception("!!! DOF " + dof.__str__() + " not in LTM " + self.ltm.name)
+            i_dof = self.dof_row(dof)
 
             # Plot the requested time history.
             label = '({0}, {1}) case: {2}'.format(dof[0], dof[1], c)
@@ -181,12 +312,14 @@ class SCR:
         for item in items:
             c = item[0]
             mode = item[1]
-            if mode > self.phi.num_modes:
-                raise Exception("!!! Only %s modes in analysis !!!" % self.phi.num_modes.__str__())
+            i = mode - self.phi.first_mode
+            if i < 0 or i >= self.phi.num_modes:
+                raise Exception("!!! Only modes %s to %s in analysis !!!" % (self.phi.first_mode,
+                                                                         self.phi.first_mode + self.phi.num_modes - 1))
 
             # Plot the requested modal displacement.
             label = 'Mode {0} case: {1}'.format(mode, c)
-            ax.plot(self.time[c], self.eta[c][mode - 1, :], label=label)
+            ax.plot(self.time[c], self.eta[c][i, :], label=label)
         ax.legend()
         plt.title('Modal Response of FF: %s' % self.pfile.name)
         plt.xlabel('Time (s)')
@@ -203,29 +336,77 @@ class SCR:
         if 'item' in kwargs.keys():
             item = kwargs['item']
             if not type(item) is tuple:
-                raise Exception('Requested dof {0} is not a tuple (case, "acron", "dof").'.format(dof))
+                raise Exception('Requested dof {0} is not a tuple (case, "acron", "dof").'.format(item))
             dof = (item[1], item[2])
             case = item[0]
         else:
             raise Exception('You must request a dof:  scr.amx(item=(case, "acron", "dof")).')
 
-        # Determine the location of the requested dof.
-        loc = [x for x, y in enumerate(self.ltm.acron_dofs) if y == dof][0]
-
-        # Determine the max/min and the time at which they occurred.
-        dof_res = self.u[case][loc, :]
-        max_val = np.max(dof_res)
-        min_val = np.min(dof_res)
-        max_loc = np.argmax(dof_res)
-        min_loc = np.argmin(dof_res)
-        max_time = self.time[case][max_loc]
-        min_time = self.time[case][min_loc]
+        # Determine the max/min and the time at which they occurred from the case envelope, or from the one
+        # response if it is recovered lazily.
+        if case not in self.env.keys() and type(self.u.get(case)) is RESPONSE:
+            loc = self.dof_row(dof)
+            u = self.u[case][loc, :]
+            max_val = u.max()
+            min_val = u.min()
+            max_time = self.time[case][np.argmax(u)]
+            min_time = self.time[case][np.argmin(u)]
+        else:
+            self.envelope(case=case)
+            env = self.env[case]
+            loc = self.dof_row(dof, env.labels)
+            max_val = env.max[loc]
+            min_val = env.min[loc]
+            max_time = env.t_max[loc]
+            min_time = env.t_min[loc]
 
         # Print to the screen.
         print('Case {0}- \t{1}\tMax: {2:.4f} (@ {3:.4f} sec)\tMin: {4:.4f} (@ {5:.4f} sec)\n'.format(
             case, dof, max_val, max_time, min_val, min_time
         ))
 
+    def envelope(self, **kwargs):
+        """Method to tabulate the max/min and the times they occur for every output DOF of the run cases.
+
+            Each case is enveloped in one vectorized pass over its responses and kept in scr.env, so later
+            calls only envelope the cases that have finished since.  Returns a structured array with the
+            fields case, acron, dof, eid, dof_id, max, t_max, min and t_min.
+
+            Ex:  Envelope all the run cases.
+                table = scr.envelope()
+
+            Ex:  Envelope cases 1 and 2 and pick out one DOF.
+                table = scr.envelope(case=[1, 2])
+                table[(table['acron'] == 'N2LAB') & (table['dof'] == 'TOR')]
+        """
+
+        # Get the kwargs.
+        if 'case' in kwargs.keys():
+            cases = kwargs['case']
+            if cases == 'all':
+                cases = list(self.env.keys() | self.u.keys())
+            elif type(cases) is not list:
+                cases = [cases]
+        else:
+            cases = list(self.env.keys() | self.u.keys())
+        cases = sorted(cases)
+
+        # Envelope the cases that have not been enveloped yet.
+        for c in cases:
+            if c not in self.env.keys():
+                if c not in self.u.keys():
+                    raise Exception('!!! Case {0} is has not been run or does not exist !!!'.format(c))
+                env = ENVELOPE(self.u[c].shape[0])
+                env.labels = self.ltm.acron_dofs[0:self.u[c].shape[0]]
+                env.fold(self.time[c], np.asarray(self.u[c]))
+                self.env[c] = env
+
+        # Stack the case envelopes into one table.
+        tables = [self.env[c].table(c, self.ltm.dofs) for c in cases]
+        if not tables:
+            return np.zeros(0, dtype=env_dtype(self.ltm.acron_dofs))
+        return np.concatenate(tables)
+
     def fft(self, **kwargs):
         """Method to perform fft on a signal.
 
@@ -264,12 +445,7 @@ class SCR:
                 dof = (resp[1], resp[2])
 
                 # Find the dof tuple in the acron_dof list or the dof list from the ltm object.
-                if dof in self.ltm.acron_dofs:
-                    i_dof = self.ltm.acron_dofs.index(dof)
-                elif dof in self.ltm.dofs:
-                    i_dof = self.ltm.dofs.index(dof)
-                else:
-                    raise Exception("!!! DOF " + dof.__str__() + " not in LTM " + self.ltm.name)
+                i_dof = self.dof_row(dof)
 
                 # Create FFT object.
                 u_fft = FFT(resp, x=self.u[c][i_dof, :], time=self.time[c])
@@ -299,33 +475,586 @@ class SCR:
             Ex:  Perform the rss on case 1.
                 scr.rss(1)
         """
+        if type(self.u[case]) is RESPONSE:
+            return
+        self.u[case] = self.rss_block(self.u[case])
+
+    def rss_block(self, u):
+        """Method to fill the HWLIST RSS rows of a block of recovered responses.
+
+            The RSS items are resolved once by LTM.index_rss.  If u only holds the LTM rows a new block with
+            room for the RSS rows is allocated, otherwise the RSS rows after the LTM rows are filled in place.
+
+            Ex:  u = scr.rss_block(u)
+        """
+        n_ltm = self.ltm.dtm.shape[0]
+        n_rss = self.ltm.rss_labels.__len__()
+        if n_rss == 0:
+            return u
+        if u.shape[0] == n_ltm:
+            u_rss = np.empty((n_ltm + n_rss,) + u.shape[1:])
+            u_rss[0:n_ltm] = u
+            u = u_rss
+
+        # Square sum each group of LTM rows and take the root.
+        u_sq = np.square(u[self.ltm.rss_idx])
+        u[n_ltm:] = np.sqrt(np.add.reduceat(u_sq, self.ltm.rss_ptr[0:-1], axis=0))
+        return u
+
+    def run_stream(self, c, rbm, method, block, spill, spill_dir, checkpoint=0, checkpoint_dir='.', restart=False,
+                   accel=False):
+        """Method to integrate, recover and envelope a case one time block at a time.
+
+            Only the running max/min envelope of every output DOF is kept in scr.env[c], the eta and u
+            histories are dropped.  Histories of the output DOF listed in spill are written to a .npy file
+            in spill_dir and opened as a memory map in scr.spill[c].
+
+            With checkpoint > 0 the modal state and the running envelope are written to a checkpoint file in
+            checkpoint_dir once at least that many time steps were integrated since the last one, and with
+            restart the case resumes from its checkpoint.  With accel the responses are atm @ etadd + dtm @ eta,
+            the modal accelerations of each block are evaluated with its integration.
+
+            Ex:  scr.run_stream(1, 0, 'filter', 5000, [('N2LAB', 'TOR')], '.')
+        """
+        import os
+        from numpy.lib.format import open_memmap
+
+        # Determine the modal force vector and time, drop any histories of a previous run.
+        self.time[c], p_modal = self.modal_load(c)
+        self.eta.pop(c, None)
+        self.u.pop(c, None)
+        time = self.time[c]
+        n_points = time.size
+        n_modes = p_modal.shape[0]
+        k = self.eig.eigenvalues
+        omn = np.multiply(2 * np.pi, self.eig.frequency)
+        n_ltm = self.ltm.dtm.shape[0]
+        n_rows = n_ltm + self.ltm.rss_labels.__len__()
+
+        # Set up the envelope and the spilled histories.
+        env = ENVELOPE(n_rows)
+        env.labels = list(self.ltm.acron_dofs)
+        rows = [self.dof_row(dof, env.labels) for dof in spill]
+        spill_file = os.path.join(spill_dir, '{0}_case{1}_u.npy'.format(self.name, c))
+
+        # Resume from the checkpoint of an interrupted run.
+        dt_state = [0.0, 0.0]
+        eta_last = np.zeros(n_modes)
+        etad_last = np.zeros(n_modes)
+        i0 = 0
+        peak = None if self.modes is None or not self.mode_residual else np.zeros(n_ltm)
+        state = None
+        if checkpoint > 0:
+            state_file = checkpoint_files(checkpoint_dir, self.name, c)[0]
+            key = run_key(method, time, [self.pfile.case[c]['dt']], p_modal, k, omn, self.zeta,
+                          [rbm, block, accel, self.mode_residual, self.f_rigid], rows,
+                          [] if self.modes is None else self.modes,
+                          ltm_signature(self.ltm))
+            if restart:
+                state = read_checkpoint(state_file, key)
+        if state is not None:
+            i0 = int(state['i'])
+            eta_last = state['eta']
+            etad_last = state['etad']
+            dt_state = state['dt_state'].tolist()
+            env.max, env.min, env.t_max, env.t_min = state['max'], state['min'], state['t_max'], state['t_min']
+            if peak is not None:
+                peak = state['residual']
+        if rows:
+            if state is None:
+                u_spill = open_memmap(spill_file, mode='w+', dtype=float, shape=(len(rows), n_points))
+            else:
+                u_spill = open_memmap(spill_file, mode='r+')
+            self.spill[c] = {'dofs': spill, 'file': spill_file, 'u': u_spill}
+        i_saved = i0
+
+        # Integrate the modal EOM one block at a time, the blocks overlap by one point to carry the state.
+        while True:
+            i1 = min(i0 + block, n_points - 1)
+            eta = np.zeros([n_modes, i1 - i0 + 1])
+            etad = np.zeros_like(eta)
+            eta[:, 0] = eta_last
+            etad[:, 0] = etad_last
+            etadd = np.zeros_like(eta) if accel else None
+            self.integrate_modes(time[i0:i1 + 1], p_modal[:, i0:i1 + 1], eta, etad, method, dt_state=dt_state,
+                                 etadd=etadd)
+            eta_last = eta[:, -1].copy()
+            etad_last = etad[:, -1].copy()
+
+            # Remove rigid body modes unless requested not to and recover the block.
+            if rbm == 0:
+                eta[0:self.rigid_modes(), :] = 0.0
+            if peak is not None:
+                self.fold_residual(eta, peak)
+            u = np.empty([n_rows, eta.shape[1]])
+            np.matmul(self.ltm.dtm, eta, out=u[0:n_ltm])
+            if accel:
+                if rbm == 0:
+                    etadd[0:self.rigid_modes(), :] = 0.0
+                u[0:n_ltm] += np.matmul(self.ltm.atm, etadd)
+            u = self.rss_block(u)
+
+            # Fold the block into the envelope and spill the requested histories, the first block
+            # includes its first point.
+            j0 = 0 if i0 == 0 else 1
+            env.fold(time[i0 + j0:i1 + 1], u[:, j0:])
+            if rows:
+                self.spill[c]['u'][:, i0 + j0:i1 + 1] = u[rows, j0:]
+            i0 = i1
+
+            # Checkpoint the state, after the spilled histories are on disk.
+            if checkpoint > 0 and i0 - i_saved >= checkpoint and i0 < n_points - 1:
+                if rows:
+                    self.spill[c]['u'].flush()
+                save_checkpoint(state_file, key, i=np.array(i0), eta=eta_last, etad=etad_last,
+                                dt_state=np.array(dt_state), max=env.max, min=env.min, t_max=env.t_max,
+                                t_min=env.t_min, residual=np.zeros(0) if peak is None else peak)
+                i_saved = i0
+            if i0 == n_points - 1:
+                break
+
+        if rows:
+            self.spill[c]['u'].flush()
+        self.env[c] = env
+        self.residual[c] = peak
+        if checkpoint > 0:
+            remove_checkpoint(state_file)
+
+    def modal_load(self, c, ring='step'):
+        """Method to determine the run time and modal force vector of a case, including the ring down.
+
+            With ring='step' the whole ring down is added, otherwise only its first point is added and the
+            rest is evaluated in closed form by finish_case.
+
+            Ex:  time, p_modal = scr.modal_load(1)
+        """
+
+        # Determine the modal force vector.
+        p_modal = modal_p(self.pfile.case[c], self.phi)
+
+        # Determine the time parameters in the forcing function.
+        time = case_time(self.pfile.case[c])
+        dt = self.pfile.case[c]['dt']
+
+        # Add 100 seconds at the end of the forcing function for ring down.
+        new_time = self.ring_time(time[-1], dt)
+        if ring != 'step':
+            new_time = new_time[0:1]
+        time = np.append(time, new_time)
+        new_p_modal = np.zeros([self.phi.num_modes, new_time.size])
+        p_modal = np.append(p_modal, new_p_modal, axis=1)
+
+        return time, p_modal
+
+    def ring_time(self, t_end, dt):
+        """Method to determine the ring down times added after a forcing function ending at t_end.
+
+            Ex:  tail = scr.ring_time(time[-1], 0.01)
+        """
+
+        # Add 100 seconds at the end of the forcing function for ring down.
+        add_time = [(20, 0.01), (80, 0.5)]
+        time = np.array([t_end])
+        for at in add_time:
+            new_time = np.arange(time[-1] + dt, time[-1] + at[0], at[1])
+            time = np.append(time, new_time)
+
+        return time[1:]
+
+    def integrate(self, time, p_modal, method):
+        """Method to integrate the modal EOM for one case [n_modes x n_points] or a batch of cases
+        sharing one time vector [n_modes x n_cases x n_points].
+
+            method='recurrence' or 'filter' integrate with the Recurrence Formulas (rf_mdof), method='fft'
+            convolves with the modal FRF in the frequency domain (rf_fft).
+
+            Ex:  eta, etad = scr.integrate(time, p_modal, 'filter')
+        """
+        k = self.eig.eigenvalues
+        omn = np.multiply(2 * np.pi, self.eig.frequency)
+        if method == 'fft' and self.modes is None:
+            return rf_fft(time, p_modal, k, omn, self.zeta)
+        if method == 'fft':
+            keep = self.modes
+            eta = np.zeros_like(p_modal)
+            etad = np.zeros_like(p_modal)
+            eta[keep], etad[keep] = rf_fft(time, p_modal[keep], np.asarray(k, dtype=float)[keep], omn[keep],
+                                           np.asarray(self.zeta, dtype=float)[keep])
+            self.static_residual(p_modal, eta, etad)
+            return eta, etad
+
+        # Integrate the modal EOM using Reccurence Formulas:
+        #   etadd + 2 * zeta omn * etad + omn**2 * eta = P
+        eta0 = np.zeros_like(p_modal)
+        etad0 = np.zeros_like(p_modal)
+        return self.integrate_modes(time, p_modal, eta0, etad0, method)
+
+    def integrate_modes(self, time, p_modal, eta, etad, method, **kwargs):
+        """Method to integrate the modal EOM of the retained modes (scr.modes, all if None) with rf_mdof in place.
+
+            The truncated modes are set to their quasi-static response by static_residual.  The kwargs
+            (dt_state, etadd) are passed on to rf_mdof.
+
+            Ex:  scr.integrate_modes(time, p_modal, eta, etad, 'filter', dt_state=dt_state)
+        """
+        k = np.asarray(self.eig.eigenvalues, dtype=float)
+        omn = np.multiply(2 * np.pi, self.eig.frequency)
+        if self.modes is None:
+            return rf_mdof(time, p_modal, k, omn, self.zeta, eta, etad, method=method, cache=self.rfc, **kwargs)
+
+        # Integrate the retained modes and copy them back into the modal state.
+        keep = self.modes
+        etadd = kwargs.pop('etadd', None)
+        eta_keep = eta[keep]
+        etad_keep = etad[keep]
+        etadd_keep = None if etadd is None else np.zeros_like(eta_keep)
+        rf_mdof(time, p_modal[keep], k[keep], omn[keep], np.asarray(self.zeta, dtype=float)[keep], eta_keep,
+                etad_keep, method=method, cache=self.rfc, etadd=etadd_keep, **kwargs)
+        eta[keep] = eta_keep
+        etad[keep] = etad_keep
+        if etadd is not None:
+            etadd[keep] = etadd_keep
+        self.static_residual(p_modal, eta, etad, etadd)
+        return eta, etad
+
+    def truncated(self):
+        """Method to list the modes left out of the integration by scr.modes.
+
+            Ex:  trunc = scr.truncated()
+        """
+        return np.setdiff1d(np.arange(self.phi.num_modes), self.modes)
 
-        # Loop over each HWLIST RSS items, determine if available in the LTM, perform RSS on u.
-        for item in self.hwlist.hw_rss:
-            acron = item[0]
-            eid = item[1]
-            dof = item[2]
-            rss_list = []
-            rss_idx = []
-            rss_dofs = []
-            if acron in self.hwlist.hw.keys():
-                if eid in self.hwlist.hw[acron].keys():
-                    if dof in self.hwlist.hw[acron][eid].keys():
-                        rss_dofs.append((acron, dof))
-                        for d in self.hwlist.hw[acron][eid][dof]['dofs']:
-                            eid_d = (eid, d)
-                            rss_list.append(eid_d)
-                            if eid_d in self.ltm.dofs:
-                                rss_idx.append(self.ltm.dofs.index(eid_d))
-                            else:
-                                raise Exception('Missing {0} in {1} and {2} in ltm.'.format(eid_d, acron, dof))
-                        rss_sum = np.zeros_like(self.u[case][0, :])
-                        for idx in rss_idx:
-                            rss_sum = rss_sum + np.square(self.u[case][idx, :])
-                        rss = np.sqrt(rss_sum)
-                        # Add the RSS to the u and ltm.acron_dof.
-                        self.ltm.acron_dofs.append((acron, dof))
-                        self.u[case] = np.vstack([self.u[case], rss])
+    def static_residual(self, p_modal, eta, etad, etadd=None):
+        """Method to set the truncated modes to their quasi-static response eta = p / k, the mode acceleration
+        residual, computed at every point at once (zero with the residual off).
+
+            Truncated modes below scr.f_rigid Hz (0.01 by default) are rigid body modes without a static response
+            and are set to zero.  Their modal velocity and acceleration are zero, so accelerations recovered from
+            the EOM vanish.
+
+            Ex:  scr.static_residual(p_modal, eta, etad)
+        """
+        trunc = self.truncated()
+        if self.mode_residual:
+            k = np.asarray(self.eig.eigenvalues, dtype=float)[trunc]
+            f = np.asarray(self.eig.frequency, dtype=float)[trunc]
+            inv_k = np.divide(1.0, k, out=np.zeros_like(k), where=np.abs(f) >= self.f_rigid)
+            eta[trunc] = p_modal[trunc] * inv_k.reshape((-1,) + (1,) * (p_modal.ndim - 1))
+        else:
+            eta[trunc] = 0.0
+        etad[trunc] = 0.0
+        if etadd is not None:
+            etadd[trunc] = 0.0
+
+    def rigid_modes(self):
+        """Method to return the number of rigid body modes (modes 1 to 6 of the model) among the loaded modes."""
+        return max(0, min(7 - self.phi.first_mode, self.phi.num_modes))
+
+    def mode_set(self, modes, f_cut):
+        """Method to find the retained modes of a mode range [start, end] (mode numbers of the model, None for all)
+        and a frequency cutoff in Hz (None for none), None if every mode is retained.
+
+            The retained modes are the index of the loaded modes, a PHI loaded with a mode range starts at mode
+            phi.first_mode.
+
+            Ex:  scr.modes = scr.mode_set([1, 120], 50.0)
+        """
+        n_modes = self.phi.num_modes
+        first = self.phi.first_mode
+        keep = np.arange(n_modes)
+        if modes is not None and 'na' not in modes:
+            start, end = int(modes[0]), int(modes[1])
+            if start < first or end < start or start >= first + n_modes:
+                raise Exception('!!! Mode range {0} is not within the loaded modes {1} to {2} !!!'.format(
+                    modes, first, first + n_modes - 1))
+            keep = keep[start - first:end - first + 1]
+        if f_cut is not None:
+            keep = keep[np.asarray(self.eig.frequency, dtype=float)[keep] <= f_cut]
+        if keep.size == 0:
+            raise Exception('!!! No modes retained by the mode range {0} and f_cut {1} !!!'.format(modes, f_cut))
+        if keep.size == n_modes:
+            return None
+        return keep
+
+    def fold_residual(self, eta, peak):
+        """Method to fold the peak response of the truncated modes in a block of modal displacements
+        [n_modes x n_points] into the peak of each LTM row.
+
+            Ex:  scr.fold_residual(eta, peak)
+        """
+        trunc = self.truncated()
+        u_res = np.matmul(self.ltm.dtm[:, trunc], eta[trunc])
+        if u_res.shape[1] > 0:
+            np.maximum(peak, np.abs(u_res).max(axis=1), out=peak)
+
+    def report_residual(self, c, peak=None, verbose=False):
+        """Method to report the residual (truncated mode) response of a case, the peak of each LTM row is kept
+        in scr.residual[c] (None with the residual off).  Returns the report, printed if verbose.
+
+            Ex:  report = scr.report_residual(1)
+        """
+        if not self.mode_residual:
+            self.residual[c] = None
+            report = 'Case {0}- {1} of {2} modes integrated, residual not computed'.format(
+                c, self.modes.size, self.phi.num_modes)
+        else:
+            if peak is None:
+                peak = np.zeros(self.ltm.dtm.shape[0])
+                block = 2000
+                for i0 in range(0, self.eta[c].shape[1], block):
+                    self.fold_residual(self.eta[c][:, i0:i0 + block], peak)
+            self.residual[c] = peak
+            i = int(np.argmax(peak))
+            report = 'Case {0}- {1} of {2} modes integrated, largest residual response {3:.4f} at {4}'.format(
+                c, self.modes.size, self.phi.num_modes, peak[i], self.ltm.acron_dofs[i])
+        if verbose:
+            print(report + '\n')
+        return report
+
+    def integrate_checkpoint(self, c, time, p_modal, method, checkpoint, checkpoint_dir, restart):
+        """Method to integrate the modal EOM of one case checkpoint time steps at a time, writing the modal
+        state to a checkpoint file in checkpoint_dir after each interval.
+
+            The eta history is integrated into a .npy file next to the checkpoint, so a restarted case
+            resumes from the state of the last checkpoint and gives the same eta as a run that was not
+            interrupted.  Only one interval is integrated in memory at a time, eta is returned as a copy on
+            write memory map of the .npy file (which is kept after the run), so the rigid body modes zeroed by
+            recover never change the saved history, with the modal velocity at the last point [n_modes x 1].
+
+            Ex:  eta, etad = scr.integrate_checkpoint(1, time, p_modal, 'filter', 10000, 'xp93zz', True)
+        """
+        from numpy.lib.format import open_memmap
+
+        if method == 'fft':
+            raise Exception('!!! checkpoint cannot be combined with method="fft" !!!')
+        k = self.eig.eigenvalues
+        omn = np.multiply(2 * np.pi, self.eig.frequency)
+        n_modes, n_points = p_modal.shape
+        state_file, eta_file = checkpoint_files(checkpoint_dir, self.name, c)
+        key = run_key(method, time, [self.pfile.case[c]['dt']], p_modal, k, omn, self.zeta,
+                      [checkpoint, self.mode_residual, self.f_rigid], [] if self.modes is None else self.modes,
+                      ltm_signature(self.ltm))
+
+        # Drop the eta of a previous run, it may be a memory map of the file about to be written.
+        self.eta.pop(c, None)
+
+        # Resume from the state of the last checkpoint of an interrupted run, the eta history before it is
+        # left on disk.
+        state = read_checkpoint(state_file, key) if restart else None
+        if state is None:
+            eta = open_memmap(eta_file, mode='w+', dtype=float, shape=(n_modes, n_points))
+            eta_last = np.zeros(n_modes)
+            etad_last = np.zeros(n_modes)
+            dt_state = [0.0, 0.0]
+            i0 = 0
+        else:
+            eta = open_memmap(eta_file, mode='r+')
+            eta_last = state['eta']
+            etad_last = state['etad']
+            dt_state = state['dt_state'].tolist()
+            i0 = int(state['i'])
+
+        # Integrate an interval at a time in memory, the intervals overlap by one point to carry the state.
+        while i0 < n_points - 1:
+            i1 = min(i0 + checkpoint, n_points - 1)
+            eta_block = np.zeros([n_modes, i1 - i0 + 1])
+            etad = np.zeros_like(eta_block)
+            eta_block[:, 0] = eta_last
+            etad[:, 0] = etad_last
+            self.integrate_modes(time[i0:i1 + 1], p_modal[:, i0:i1 + 1], eta_block, etad, method,
+                                 dt_state=dt_state)
+            eta[:, i0:i1 + 1] = eta_block
+            eta_last = eta_block[:, -1].copy()
+            etad_last = etad[:, -1].copy()
+            i0 = i1
+
+            # Checkpoint the state, after the eta history is on disk.
+            eta.flush()
+            save_checkpoint(state_file, key, i=np.array(i0), eta=eta_last, etad=etad_last,
+                            dt_state=np.array(dt_state))
+
+        eta.flush()
+        del eta
+        return np.load(eta_file, mmap_mode='c'), etad_last[:, np.newaxis]
+
+    def recover(self, c, rbm, recover='all', etad=None, p_modal=None):
+        """Method to recover the responses of a case from its modal displacements.
+
+            With recover='lazy' scr.u[c] is a RESPONSE that recovers (and RSS) only the rows that are indexed.
+            Given the modal velocity and force histories the responses are atm @ etadd + dtm @ eta, the modal
+            accelerations are evaluated from the EOM a block of time steps at a time and not kept.
+
+            Ex:  scr.recover(1, 0)
+
+            Ex:  scr.recover(1, 0, etad=etad, p_modal=p_modal)
+        """
+
+        # Remove rigid body modes unless requested not to.
+        if rbm == 0:
+            self.eta[c][0:self.rigid_modes(), :] = 0.0
+        if recover == 'lazy':
+            self.u[c] = RESPONSE(self.ltm.dtm, self.eta[c], self.ltm.rss_ptr, self.ltm.rss_idx)
+            self.env.pop(c, None)
+            return
+
+        # Recover the desired responses with superposition of modes using the LTM, leaving room for the RSS.
+        n_ltm = self.ltm.dtm.shape[0]
+        self.u[c] = np.empty([n_ltm + self.ltm.rss_labels.__len__(), self.eta[c].shape[1]])
+        np.matmul(self.ltm.dtm, self.eta[c], out=self.u[c][0:n_ltm])
+        self.env.pop(c, None)
+        if p_modal is None:
+            return
+
+        # Add the acceleration terms a block at a time.
+        k = self.eig.eigenvalues
+        omn = np.multiply(2 * np.pi, self.eig.frequency)
+        block = 2000
+        for i0 in range(0, self.eta[c].shape[1], block):
+            run = slice(i0, i0 + block)
+            etadd = rf_accel(p_modal[:, run], k, omn, self.zeta, self.eta[c][:, run], etad[:, run])
+            if rbm == 0:
+                etadd[0:self.rigid_modes(), :] = 0.0
+            if self.modes is not None:
+                etadd[self.truncated()] = 0.0
+            self.u[c][0:n_ltm, run] += np.matmul(self.ltm.atm, etadd)
+
+    def finish_case(self, c, etad, rbm, ring, recover='all', p_modal=None):
+        """Method to complete the ring down of an integrated case and recover its responses.
+
+            ring='step' - the ring down was integrated with the forcing function.
+            ring='analytic' - the rest of the ring down is evaluated in closed form from the modal state at
+                its first point and added to the eta and u histories.
+            ring='envelope' - the histories stop at the first ring down point, the rest of the ring down is
+                only folded into the case envelope scr.env[c] and the ring down envelope scr.env_ring[c].
+
+            Given the modal force history p_modal the responses include the acceleration terms, atm @ etadd.
+
+            Ex:  scr.finish_case(1, etad, 0, 'analytic')
+        """
+        if ring not in ['step', 'analytic', 'envelope']:
+            raise Exception('!!! Unknown ring {0}, use "step", "analytic" or "envelope" !!!'.format(ring))
+
+        # Evaluate the rest of the ring down from the state at its first point.
+        if ring != 'step':
+            time = self.time[c]
+            tail = self.ring_time(time[-2], self.pfile.case[c]['dt'])[1:]
+            eta0 = self.eta[c][:, -1].copy()
+            etad0 = etad[:, -1].copy()
+            omn = np.multiply(2 * np.pi, self.eig.frequency)
+        if ring == 'analytic':
+            eta_tail, etad_tail = rf_free(tail - time[-1], omn, self.zeta, eta0, etad0)
+            self.eta[c] = np.append(self.eta[c], eta_tail, axis=1)
+            self.time[c] = np.append(time, tail)
+            if p_modal is not None:
+                etad = np.append(etad, etad_tail, axis=1)
+                p_modal = np.append(p_modal, np.zeros_like(eta_tail), axis=1)
+
+        # Recover the responses and perform the required RSS set out in the HWLIST.
+        if p_modal is not None:
+            self.recover(c, rbm, recover, etad, p_modal)
+        else:
+            self.recover(c, rbm, recover)
+        self.rss(c)
+        if ring != 'envelope':
+            return
+
+        # Fold the recovered histories and then the ring down, one block at a time, into the envelopes.
+        n_ltm = self.ltm.dtm.shape[0]
+        n_rows = self.u[c].shape[0]
+        env = ENVELOPE(n_rows)
+        env_ring = ENVELOPE(n_rows)
+        env.labels = list(self.ltm.acron_dofs[0:n_rows])
+        env_ring.labels = env.labels
+        env.fold(time, np.asarray(self.u[c]))
+        block = 2000
+        for i0 in range(0, tail.size, block):
+            t_block = tail[i0:i0 + block]
+            eta, etad_b = rf_free(t_block - time[-1], omn, self.zeta, eta0, etad0)
+            if rbm == 0:
+                eta[0:self.rigid_modes(), :] = 0.0
+            u = np.empty([n_rows, t_block.size])
+            np.matmul(self.ltm.dtm, eta, out=u[0:n_ltm])
+            if p_modal is not None:
+                etadd = rf_accel(0.0, self.eig.eigenvalues, omn, self.zeta, eta, etad_b)
+                if rbm == 0:
+                    etadd[0:self.rigid_modes(), :] = 0.0
+                u[0:n_ltm] += np.matmul(self.ltm.atm, etadd)
+            u = self.rss_block(u)
+            env.fold(t_block, u)
+            env_ring.fold(t_block, u)
+        self.env[c] = env
+        self.env_ring[c] = env_ring
+
+    def run_pool(self, cases, rbm, method, ring, workers, accel=False):
+        """Method to run cases over a process pool with the model matrices placed in shared memory once.
+
+            The time vector of each case is known up front, so its eta and u histories are written by the
+            worker into shared output blocks made here instead of being sent back through the pool.  At most
+            workers cases are in flight, the output blocks of a case are made when it is submitted and released
+            when its results are returned into the SCR object, in case order.
+
+            Ex:  scr.run_pool([1, 2, 3, 4], 0, 'filter', 'step', 4)
+        """
+        from collections import deque
+        from multiprocessing import Pool
+        from PyLnD.loads.pool import share_model, init_worker, run_case, new_array
+
+        n_rows = self.ltm.dtm.shape[0] + self.ltm.rss_labels.__len__()
+        blocks, model = share_model(self)
+        outputs = {}
+        pending = deque()
+        todo = iter(cases)
+
+        def submit():
+            c = next(todo, None)
+            if c is None:
+                return
+            time = self.run_time(c, ring)
+            eta_shm, eta_desc = new_array((self.phi.num_modes, time.size))
+            u_shm, u_desc = new_array((n_rows, time.size))
+            outputs[c] = (time, eta_shm, eta_desc, u_shm, u_desc)
+            task = (c, self.pfile.case[c], rbm, method, ring, accel, eta_desc, u_desc)
+            pending.append(pool.apply_async(run_case, (task,)))
+
+        pool = Pool(processes=workers, initializer=init_worker, initargs=(model,))
+        try:
+            for i in range(workers):
+                submit()
+            while pending:
+                c, env, env_ring = pending.popleft().get()
+                submit()
+                time, eta_shm, eta_desc, u_shm, u_desc = outputs.pop(c)
+                self.time[c] = time
+                for key, shm, desc in [('eta', eta_shm, eta_desc), ('u', u_shm, u_desc)]:
+                    view = np.ndarray(desc[1], dtype=np.dtype(desc[2]), buffer=shm.buf)
+                    getattr(self, key)[c] = view.copy()
+                    del view
+                    shm.close()
+                    shm.unlink()
+                self.env.pop(c, None)
+                if env is not None:
+                    self.env[c] = env
+                    self.env_ring[c] = env_ring
+            pool.close()
+            pool.join()
+        finally:
+            pool.terminate()
+            for time, eta_shm, eta_desc, u_shm, u_desc in outputs.values():
+                blocks.extend([eta_shm, u_shm])
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+    def run_time(self, c, ring='step'):
+        """Method to determine the time vector a case is run and recovered on, including the ring down.
+
+            Ex:  time = scr.run_time(1, 'analytic')
+        """
+        time = case_time(self.pfile.case[c])
+        tail = self.ring_time(time[-1], self.pfile.case[c]['dt'])
+        if ring == 'envelope':
+            tail = tail[0:1]
+        return np.append(time, tail)
 
     def run(self, **kwargs):
         """Method to perform numerical integration of EOM via Recurrence Formulas.
@@ -335,12 +1064,56 @@ class SCR:
 
             Ex:  Run all cases.
                 scr.run(case='all')
+
+            Ex:  Run case 1 integrating each constant time step run as a filter.
+                scr.run(case=1, method='filter')
+
+            Ex:  Run all cases, integrating the cases that share a time vector together as one batch.
+                scr.run(case='all', batch='yes')
+
+            Ex:  Run all cases spread over 8 processes.
+                scr.run(case='all', workers=8)
+
+            Ex:  Run all cases 5000 time steps at a time keeping only the envelopes (scr.env) and the
+                 histories of one output DOF written to disk (scr.spill).
+                scr.run(case='all', stream='yes', block=5000, spill=[('N2LAB', 'TOR')], spill_dir='xp93zz')
+
+            Ex:  Run case 1 evaluating the 100 sec ring down in closed form once the load is zero.
+                scr.run(case=1, ring='analytic')
+
+            Ex:  Run case 1 keeping only the envelope of the ring down (scr.env and scr.env_ring).
+                scr.run(case=1, ring='envelope')
+
+            Ex:  Run case 1 in the frequency domain (constant time step), the ring down is closed form.
+                scr.run(case=1, method='fft')
+
+            Ex:  Run case 1 and recover only the output DOF that are used, when they are first used (plot_u, fft,
+                 amx, ...), scr.u[1] is a RESPONSE.
+                scr.run(case=1, recover='lazy')
+
+            Ex:  Run case 1 writing the modal state to a checkpoint in xp93zz every 10000 time steps, and
+                 after an interruption resume it from the last checkpoint, scr.eta[1] is a copy on write
+                 memory map of xp93zz/{name}_case1_eta.npy.
+                scr.run(case=1, checkpoint=10000, checkpoint_dir='xp93zz')
+                scr.run(case=1, checkpoint=10000, checkpoint_dir='xp93zz', restart='yes')
+
+            Ex:  Run case 1 recovering the responses from the modal accelerations too, atm @ etadd + dtm @ eta.
+                scr.run(case=1, accel='yes')
+
+            Ex:  Run case 1 integrating only modes 1 to 120 below 50 Hz, the truncated modes are added as a
+                 quasi-static (mode acceleration) residual and their peak response kept in scr.residual[1],
+                 verbose='yes' prints the largest.  Truncated modes below f_rigid Hz (default 0.01) are rigid
+                 body modes and get no residual.
+                scr.run(case=1, modes=[1, 120], f_cut=50.0, verbose='yes')
+
+            Ex:  Run case 1 on the BASFILE mode range (scr.load_bas) without the residual.
+                scr.run(case=1, modes='bas', residual='no')
         """
 
         # Get the kwargs.
         cases = kwargs['case']
         if cases == 'all':
-            cases = scr.pfile.case.keys()
+            cases = list(self.pfile.case.keys())
         elif type(cases) is not list:
             cases = [cases]
         if 'rbm' in kwargs.keys():
@@ -350,47 +1123,270 @@ class SCR:
                 rbm = 0
         else:
             rbm = 0
+        if 'method' in kwargs.keys():
+            method = kwargs['method']
+        else:
+            method = 'recurrence'
+        if 'batch' in kwargs.keys() and kwargs['batch'].lower() == 'yes':
+            batch = True
+        else:
+            batch = False
+        if 'workers' in kwargs.keys():
+            workers = int(kwargs['workers'])
+        else:
+            workers = 1
+        if workers > 1 and batch:
+            raise Exception('!!! batch and workers > 1 cannot be combined !!!')
+        if 'stream' in kwargs.keys() and kwargs['stream'].lower() == 'yes':
+            stream = True
+        else:
+            stream = False
+        if 'block' in kwargs.keys():
+            block = int(kwargs['block'])
+        else:
+            block = 5000
+        if 'spill' in kwargs.keys():
+            spill = kwargs['spill']
+            if type(spill) is not list:
+                spill = [spill]
+        else:
+            spill = []
+        if 'spill_dir' in kwargs.keys():
+            spill_dir = kwargs['spill_dir']
+        else:
+            spill_dir = '.'
+        if 'ring' in kwargs.keys():
+            ring = kwargs['ring']
+        else:
+            ring = 'step'
+        if 'checkpoint' in kwargs.keys():
+            checkpoint = int(kwargs['checkpoint'])
+        else:
+            checkpoint = 0
+        if 'checkpoint_dir' in kwargs.keys():
+            checkpoint_dir = kwargs['checkpoint_dir']
+        else:
+            checkpoint_dir = '.'
+        if 'restart' in kwargs.keys() and kwargs['restart'].lower() == 'yes':
+            restart = True
+        else:
+            restart = False
+        if 'recover' in kwargs.keys():
+            recover = kwargs['recover']
+        else:
+            recover = 'all'
+        if recover not in ['all', 'lazy']:
+            raise Exception('!!! Unknown recover {0}, use "all" or "lazy" !!!'.format(recover))
+        if 'modes' in kwargs.keys():
+            modes = kwargs['modes']
+        else:
+            modes = None
+        if isinstance(modes, str) and modes.lower() == 'bas':
+            if not self.bas:
+                raise Exception('!!! modes="bas" needs a BASFILE, use scr.load_bas first !!!')
+            modes = [self.bas.modes_start, self.bas.modes_end]
+        if 'f_cut' in kwargs.keys():
+            f_cut = float(kwargs['f_cut'])
+        else:
+            f_cut = None
+        if 'residual' in kwargs.keys() and kwargs['residual'].lower() == 'no':
+            self.mode_residual = False
+        else:
+            self.mode_residual = True
+        if 'f_rigid' in kwargs.keys():
+            self.f_rigid = float(kwargs['f_rigid'])
+        else:
+            self.f_rigid = 0.01
+        if 'verbose' in kwargs.keys() and kwargs['verbose'].lower() == 'yes':
+            verbose = True
+        else:
+            verbose = False
+        self.fit_modes()
+        self.modes = self.mode_set(modes, f_cut)
+        if 'accel' in kwargs.keys() and kwargs['accel'].lower() == 'yes':
+            accel = True
+        else:
+            accel = False
+        if accel and (recover == 'lazy' or (checkpoint > 0 and not stream)):
+            raise Exception('!!! accel cannot be combined with recover="lazy" or checkpoint without stream !!!')
+        if recover == 'lazy' and (stream or workers > 1):
+            raise Exception('!!! recover="lazy" cannot be combined with stream or workers > 1 !!!')
+        if stream and (batch or workers > 1 or ring != 'step' or method == 'fft'):
+            raise Exception('!!! stream cannot be combined with batch, workers > 1, ring or method="fft" !!!')
+        if checkpoint > 0 and (batch or workers > 1 or method == 'fft'):
+            raise Exception('!!! checkpoint cannot be combined with batch, workers > 1 or method="fft" !!!')
+        if method == 'fft' and ring == 'step':
+            ring = 'analytic'
+
+        # Stream each case through integration, recovery and the envelope.
+        if stream:
+            for c in cases:
+                self.run_stream(c, rbm, method, block, spill, spill_dir, checkpoint, checkpoint_dir, restart, accel)
+                if self.modes is not None:
+                    self.report_residual(c, self.residual[c], verbose)
+            return
+
+        # Spread the cases over a process pool.
+        if workers > 1:
+            self.run_pool(cases, rbm, method, ring, workers, accel)
+            if self.modes is not None:
+                for c in cases:
+                    self.report_residual(c, verbose=verbose)
+            return
 
         # Run all the requested cases.
+        if not batch:
+            for c in cases:
+                self.time[c], p_modal = self.modal_load(c, ring)
+                if checkpoint > 0:
+                    [self.eta[c], etad] = self.integrate_checkpoint(c, self.time[c], p_modal, method, checkpoint,
+                                                                    checkpoint_dir, restart)
+                else:
+                    [self.eta[c], etad] = self.integrate(self.time[c], p_modal, method)
+                self.finish_case(c, etad, rbm, ring, recover, p_modal if accel else None)
+                if self.modes is not None:
+                    self.report_residual(c, verbose=verbose)
+                if checkpoint > 0:
+                    remove_checkpoint(checkpoint_files(checkpoint_dir, self.name, c)[0])
+            return
+
+        # Group the cases that share an identical time vector.
+        groups = []
         for c in cases:
-            # Create the current case dictionary key.
-            if c not in self.time.keys():
-                self.time[c] = []
-            if c not in self.u.keys():
-                self.u[c] = []
-            if c not in self.eta.keys():
-                self.eta[c] = []
-
-            # Determine the modal force vector.
-            p_modal = modal_p(self.pfile.case[c], self.phi)
-
-            # Determine the time parameters in the forcing function.
-            grid = self.pfile.case[c]['grids'][0]
-            self.time[c] = self.pfile.case[c][grid][:, 0]
-            dt = self.pfile.case[c]['dt']
-
-            # Add 100 seconds at the end of the forcing function for ring down.
-            add_time = [(20, 0.01), (80, 0.5)]
-            for at in add_time:
-                new_time = np.arange(self.time[c][-1] + dt, self.time[c][-1] + at[0], at[1])
-                self.time[c] = np.append(self.time[c], new_time)
-                new_p_modal = np.zeros([self.phi.num_modes, new_time.size])
-                p_modal = np.append(p_modal, new_p_modal, axis=1)
-
-            # Integrate the modal EOM using Reccurence Formulas:
-            #   etadd + 2 * zeta omn * etad + omn**2 * eta = P
-            eta0 = np.zeros_like(p_modal)
-            etad0 = np.zeros_like(p_modal)
-            [self.eta[c], etad] = rf_mdof(self.time[c], p_modal, self.eig.eigenvalues,
-                                          np.multiply(2 * np.pi, self.eig.frequency), self.zeta,
-                                          eta0, etad0)
-
-            # Remove rigid body modes unless requested not to.
-            if rbm == 0:
-                self.eta[c][0:6, :] = 0.0
-
-            # Recover the desired responses with superposition of modes using the LTM
-            self.u[c] = self.ltm.dtm @ self.eta[c]
+            time, p_modal = self.modal_load(c, ring)
+            for group in groups:
+                if np.array_equal(group['time'], time):
+                    group['cases'].append(c)
+                    group['p_modal'].append(p_modal)
+                    break
+            else:
+                groups.append({'time': time, 'cases': [c], 'p_modal': [p_modal]})
+
+        # Integrate each group as one [n_modes x n_cases x n_points] modal state and recover each case.
+        for group in groups:
+            p_modal = np.stack(group['p_modal'], axis=1)
+            group['p_modal'] = []
+            [eta, etad] = self.integrate(group['time'], p_modal, method)
+            for i, c in enumerate(group['cases']):
+                self.time[c] = group['time'].copy()
+                self.eta[c] = np.ascontiguousarray(eta[:, i, :])
+                self.finish_case(c, etad[:, i, :], rbm, ring, recover, p_modal[:, i, :] if accel else None)
+                if self.modes is not None:
+                    self.report_residual(c, verbose=verbose)
+
+    def sweep(self, **kwargs):
+        """Method to run cases for several variants of the damping and natural frequencies at once.
+
+            The variants are integrated together as one [n_modes x n_variants] modal state sharing the modal
+            force vector, a block of time steps at a time, and recovered with one LTM product per block.  Only
+            the envelope of each variant is kept, in scr.env_sweep[c] (a list of ENVELOPE).  Returns a table of
+            every output DOF with the largest max and smallest min over the variants and the percentiles of the
+            max and min across the variants, see envelope.sweep_dtype.
+
+            zeta - damping of each mode [n_modes] or of each mode of each variant [n_variants x n_modes],
+                   defaults to scr.zeta
+            freq_scale - factor on the natural frequencies of each variant [n_variants] or of each mode of each
+                         variant [n_variants x n_modes], defaults to 1
+
+            Ex:  Run case 1 with the frequencies 5% low, nominal and 5% high.
+                table = scr.sweep(case=1, freq_scale=[0.95, 1.0, 1.05])
+
+            Ex:  Run 100 random variants of the damping and frequencies, reporting the 5th, 50th and 95th
+                 percentiles of the max/min of each output DOF.
+                zeta = scr.zeta * np.random.lognormal(0.0, 0.2, (100, scr.phi.num_modes))
+                scale = np.random.normal(1.0, 0.02, 100)
+                table = scr.sweep(case='all', zeta=zeta, freq_scale=scale, percentiles=[5, 50, 95])
+
+            Ex:  Integrate 2000 time steps at a time with the filter.
+                table = scr.sweep(case=1, freq_scale=[0.95, 1.05], method='filter', block=2000)
+        """
 
-            # Perform the required RSS set out in the HWLIST.
-            self.rss(c)
+        # Get the kwargs.
+        cases = kwargs['case']
+        if cases == 'all':
+            cases = list(self.pfile.case.keys())
+        elif type(cases) is not list:
+            cases = [cases]
+        if 'rbm' in kwargs.keys() and kwargs['rbm'].lower() == 'yes':
+            rbm = 1
+        else:
+            rbm = 0
+        if 'method' in kwargs.keys():
+            method = kwargs['method']
+        else:
+            method = 'recurrence'
+        if method not in ['recurrence', 'filter']:
+            raise Exception('!!! sweep integrates with method="recurrence" or "filter" !!!')
+        if 'block' in kwargs.keys():
+            block = int(kwargs['block'])
+        else:
+            block = 5000
+        if 'percentiles' in kwargs.keys():
+            percentiles = list(kwargs['percentiles'])
+        else:
+            percentiles = [5, 50, 95]
+
+        # Stack the damping and natural frequencies of the variants [n_modes x n_variants].
+        n_modes = self.phi.num_modes
+        zeta = np.asarray(kwargs.get('zeta', self.zeta), dtype=float)
+        freq_scale = np.asarray(kwargs.get('freq_scale', 1.0), dtype=float)
+        if freq_scale.ndim < 2:
+            freq_scale = freq_scale.reshape(-1, 1)
+        try:
+            zeta = zeta.reshape(-1, n_modes)
+            n_variants = np.broadcast_shapes(zeta.shape, freq_scale.shape, (1, n_modes))[0]
+        except ValueError:
+            raise Exception('!!! zeta {0} and freq_scale {1} do not match the {2} modes !!!'.format(
+                zeta.shape, freq_scale.shape, n_modes))
+        scale = np.broadcast_to(freq_scale, (n_variants, n_modes)).T
+        zeta = np.ascontiguousarray(np.broadcast_to(zeta, (n_variants, n_modes)).T)
+        omn = np.multiply(2 * np.pi, self.eig.frequency)[:, np.newaxis] * scale
+        k = np.asarray(self.eig.eigenvalues, dtype=float)[:, np.newaxis] * scale ** 2
+
+        tables = []
+        n_ltm = self.ltm.dtm.shape[0]
+        n_rows = n_ltm + self.ltm.rss_labels.__len__()
+        for c in cases:
+            time, p_modal = self.modal_load(c)
+            p_modal = p_modal[:, np.newaxis, :]
+            n_points = time.size
+            envs = []
+            for v in range(n_variants):
+                envs.append(ENVELOPE(n_rows))
+                envs[v].labels = list(self.ltm.acron_dofs)
+
+            # Integrate the variants one block at a time, the blocks overlap by one point to carry the state.
+            dt_state = [0.0, 0.0]
+            eta_last = np.zeros([n_modes, n_variants])
+            etad_last = np.zeros([n_modes, n_variants])
+            i0 = 0
+            while True:
+                i1 = min(i0 + block, n_points - 1)
+                eta = np.zeros([n_modes, n_variants, i1 - i0 + 1])
+                etad = np.zeros_like(eta)
+                eta[:, :, 0] = eta_last
+                etad[:, :, 0] = etad_last
+                rf_mdof(time[i0:i1 + 1], p_modal[:, :, i0:i1 + 1], k, omn, zeta, eta, etad,
+                        method=method, cache=self.rfc, dt_state=dt_state)
+                eta_last = eta[:, :, -1].copy()
+                etad_last = etad[:, :, -1].copy()
+
+                # Remove rigid body modes unless requested not to and recover all the variants at once.
+                if rbm == 0:
+                    eta[0:self.rigid_modes()] = 0.0
+                u = np.empty([n_rows, n_variants, eta.shape[2]])
+                np.matmul(self.ltm.dtm, eta.reshape(n_modes, -1), out=u[0:n_ltm].reshape(n_ltm, -1))
+                u = self.rss_block(u)
+
+                # Fold the block into the envelope of each variant.
+                j0 = 0 if i0 == 0 else 1
+                for v in range(n_variants):
+                    envs[v].fold(time[i0 + j0:i1 + 1], u[:, v, j0:])
+                if i1 == n_points - 1:
+                    break
+                i0 = i1
+
+            self.env_sweep[c] = envs
+            tables.append(sweep_table(c, envs, self.ltm.dofs, percentiles))
+
+        return np.concatenate(tables)
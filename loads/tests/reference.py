@@ -0,0 +1,146 @@
+import re
+import numpy as np
+
+
+def read_pfile(path):
+    """Function to parse a pfile line by line into grid histories [t, x, y, z, mx, my, mz], the way PFILE did
+    before the cases were indexed and parsed in one pass.
+
+        Ex:  case = read_pfile('ff.dat')
+    """
+    with open(path) as f:
+        lines = f.readlines()
+    case = {}
+    for j, line in enumerate(lines):
+        if line[2:7].lower() == 'case=':
+            c = int(line[7:11])
+            case[c] = {'loc': j, 'grids': [], 'dt': 0}
+            i = 1
+        elif line[2:6].lower() == 'grid':
+            grid = int(line[7:15])
+            if grid in case[c]['grids']:
+                grid = grid.__str__() + '_' + i.__str__()
+                i += 1
+            coef = [float(line[19:26]), float(line[36:43]), float(line[53:60])]
+            coef += [float(lines[j + 1][19:26]), float(lines[j + 1][36:43]), float(lines[j + 1][53:60])]
+            data = []
+            for data_line in lines[j + 2:]:
+                if data_line[0] == '$':
+                    break
+                data_line = data_line.rstrip()
+                chunks = [data_line[i:i + 8] for i in range(0, len(data_line), 8)]
+                chunks = [x.strip(' ') for x in chunks if '        ' not in x]
+                chunks = [re.sub('^e', '', x.replace('-', 'e-').replace('+', 'e+')) for x in chunks]
+                data.extend(map(float, chunks))
+            data = np.array(data).reshape(-1, 2)
+            p_vec = np.zeros([data.shape[0], 7])
+            p_vec[:, 0] = data[:, 0]
+            p_vec[:, 1:7] = data[:, 1:2] * coef
+            case[c]['grids'].append(grid)
+            case[c][grid] = p_vec
+    return case
+
+
+def sync_case(case, dt):
+    """Function to sync the grid histories of a case onto one time grid one grid and dof at a time, each history
+    ramping from zero load one time step before it starts and back to zero one time step after it ends, then
+    sum the duplicate grid blocks into their grid.
+
+        Ex:  sync_case(case[1], 0.01)
+    """
+    min_time = min([np.min(case[g][:, 0]) for g in case['grids']])
+    max_time = max([np.max(case[g][:, 0]) for g in case['grids']])
+    full_time = np.arange(min_time, max_time, dt)
+    for g in case['grids']:
+        p_vec = case[g]
+        if p_vec[0, 0] > min_time:
+            p_vec = np.vstack([np.append(p_vec[0, 0] - dt, np.zeros(6)), p_vec])
+        if p_vec[-1, 0] < max_time:
+            p_vec = np.vstack([p_vec, np.append(p_vec[-1, 0] + dt, np.zeros(6))])
+        new_vec = np.zeros([full_time.size + 1, 7])
+        new_vec[0:-1, 0] = full_time
+        new_vec[-1, 0] = full_time[-1] + dt
+        for d in range(1, 7):
+            new_vec[0:-1, d] = np.interp(full_time, p_vec[:, 0], p_vec[:, d], left=0, right=0)
+        case[g] = new_vec
+    for g in [g for g in case['grids'] if type(g) is str]:
+        case[int(g.split('_')[0])][:, 1:] += case.pop(g)[:, 1:]
+        case['grids'].remove(g)
+    case['dt'] = dt
+
+
+def auto_ts(time, vec, tol, ring):
+    """Function to pick the time steps of a signal to keep, the way auto time step did it with a window of kept
+    points around each change (the first point of vec must be zero).
+
+        Ex:  keep = auto_ts(time, p_sum, 0.01, 2.0)
+    """
+    dt = time[1] - time[0]
+    nk = int(ring / dt)
+    index = np.arange(0, time.size, 1)
+
+    # Delete all but the first point and the point before the first non-zero point.
+    i_non_zero = np.nonzero(vec)[0][0]
+    vec = np.delete(vec, np.s_[1:i_non_zero - 1:1], 0)
+    index = np.delete(index, np.s_[1:i_non_zero - 1:1], 0)
+
+    # Keep the indices nk indices in both directions around each change in vec.
+    dv = np.absolute(vec[0:-1] - vec[1:])
+    dv = np.append(dv, 0)
+    k_index = index[dv > tol, ][:, np.newaxis]
+    f_index = np.unique(k_index + np.tile(np.arange(-nk, nk, 1), (k_index.size, 1)))
+    f_index = f_index[(f_index >= index[1]) & (f_index <= index[-1])]
+    return np.insert(f_index, 0, 0)
+
+
+def read_op4_lines(path):
+    """Function to read the data lines of 5 values of each matrix of an ASCII op4 file, keyed by the header columns
+    32 to 40 with the blanks removed, the way read_op4_ascii did it line by line.
+
+        Ex:  data = read_op4_lines('s4red_90.ot4')
+    """
+    data = {}
+    with open(path) as f:
+        for line in f:
+            compact = re.sub(r'\s+', '', line).replace(',', '').replace('.', '')
+            if compact.isalnum() and not compact.isnumeric():
+                case = re.sub(r'\s+', '', line[31:40])
+                data[case] = np.zeros([0, 5])
+            elif not compact.isnumeric():
+                try:
+                    row = [float(line[i:i + 16]) for i in range(0, 80, 16)]
+                except ValueError:
+                    continue
+                data[case] = np.append(data[case], [row], axis=0)
+    return data
+
+
+def read_ltm(path):
+    """Function to read a LTMFILE one record at a time, the way LTM did before the file was read as one structured
+    array.
+
+        Ex:  types, dofs, atm, dtm = read_ltm('scr.pch')
+    """
+    import os
+
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        [bytes_in_record] = np.fromfile(f, dtype=np.int32, count=1)
+    num_ltms = int(file_size / (bytes_in_record + 8))
+    types = []
+    dofs = []
+    atm = []
+    dtm = []
+    with open(path, 'rb') as f:
+        for i in range(num_ltms):
+            np.fromfile(f, dtype=np.int32, count=1)
+            matrix_name = np.fromfile(f, dtype=np.int8, count=80)
+            matrix_name = ''.join([chr(item) for item in matrix_name]).strip()
+            types.append(matrix_name[0:15])
+            dofs.append((int(matrix_name[16:24]), int(matrix_name[30:32])))
+            [num_modes] = np.fromfile(f, dtype=np.int32, count=1)
+            raw_otm = np.fromfile(f, dtype=np.float32, count=num_modes * 2)
+            atm.append(raw_otm[0::2])
+            dtm.append(raw_otm[1::2])
+            np.fromfile(f, dtype=np.int32, count=1)
+    return types, dofs, np.array(atm, dtype=float), np.array(dtm, dtype=float)
@@ -0,0 +1,216 @@
+import numpy as np
+from types import SimpleNamespace
+from PyLnD.loads.scr import SCR
+from PyLnD.loads.dof_index import DOFINDEX
+from PyLnD.loads.ltm import LTM
+
+
+def make_modes(n_modes=12, seed=0):
+    """Function to make a random mode set, the first 3 modes are near rigid (1e-4 Hz).
+
+        outputs: k <eigenvalues>, omn <natural frequencies [rad/s]>, zeta <damping>
+    """
+    rng = np.random.default_rng(seed)
+    f = np.concatenate([np.full(3, 1e-4), np.sort(rng.uniform(0.1, 40.0, n_modes - 3))])
+    omn = 2 * np.pi * f
+    return omn**2, omn, 0.03 * np.ones(n_modes)
+
+
+def make_scr(n_modes=20, n_cases=3, n_ltm=30, seed=0, same_time=True):
+    """Function to make a SCR object with a random model (PHI, EIG, LTM with two RSS items) and forcing functions,
+    without reading any files.
+
+        Ex:  scr = make_scr()
+             scr.run(case='all')
+    """
+    rng = np.random.default_rng(seed)
+    scr = SCR('test')
+
+    # Mode shapes of 8 grids, 6 near rigid body modes.
+    grids = [100 + i for i in range(0, 8)]
+    dofs = [(g, d) for g in grids for d in range(1, 7)]
+    scr.phi = SimpleNamespace(phi=rng.normal(size=(len(dofs), n_modes)), dofs=dofs, dof_index=DOFINDEX(dofs),
+                              num_modes=n_modes, num_dofs=len(dofs), grids=grids, modes=None, first_mode=1)
+    f = np.concatenate([np.full(6, 1e-4), np.sort(rng.uniform(0.1, 30.0, n_modes - 6))])
+    omn = 2 * np.pi * f
+    scr.eig = SimpleNamespace(eigenvalues=list(omn**2), frequency=list(f))
+    scr.zeta = 0.01 * np.ones(n_modes)
+
+    # LTM rows of 6 dofs per element, labelled by the HWLIST with two RSS items.
+    ldofs = [(e, d) for e in range(500, 500 + n_ltm // 6) for d in range(1, 7)]
+    ltm = LTM.__new__(LTM)
+    ltm.name = 'ltm'
+    ltm.mmap = 'no'
+    ltm.dtm = rng.normal(size=(len(ldofs), n_modes))
+    ltm.atm = rng.normal(size=(len(ldofs), n_modes))
+    ltm.num_ltms, ltm.num_modes = ltm.dtm.shape
+    ltm.dofs = ldofs
+    ltm.dof_index = DOFINDEX(ldofs)
+    ltm.types = ['BAR'] * len(ldofs)
+    ltm.acron_dofs = [('A{0}'.format(e), 'D{0}'.format(d)) for e, d in ldofs]
+    scr.hwlist = SimpleNamespace(hw_rss=[('R1', 501, 'RSS'), ('R2', 503, 'RSST')],
+                                 hw={'R1': {501: {'RSS': {'dofs': [1, 2, 3]}}},
+                                     'R2': {503: {'RSST': {'dofs': [4, 5]}}}})
+    ltm.index_rss(scr.hwlist)
+    ltm.index_acron()
+    scr.ltm = ltm
+
+    # Forcing functions on 3 grids, zero over the last two points.
+    case = {}
+    for c in range(1, n_cases + 1):
+        dt = 0.01
+        n = 500 if same_time else 400 + 50 * c
+        t = np.arange(0, n) * dt
+        cd = {'grids': [], 'dt': dt, 'loc': 0}
+        for g in grids[0:3]:
+            v = np.zeros((n, 7))
+            v[:, 0] = t
+            fn = np.sin(2 * np.pi * rng.uniform(0.2, 3.0) * t) * (t < (n - 2) * dt)
+            v[:, 1:] = fn[:, np.newaxis] * rng.normal(size=6)
+            cd[g] = v
+            cd['grids'].append(g)
+        case[c] = cd
+    scr.pfile = SimpleNamespace(case=case, name='ff')
+    return scr
+
+
+def nastran_field(x):
+    """Function to write a value as an 8 character field with the implicit exponent, ex: -1.234-3."""
+    if x == 0:
+        return '     0.0'
+    m, e = ('%.3e' % x).split('e')
+    if int(e) == 0:
+        return ('%.5f' % x).rjust(8)[:8]
+    return (m + ('-' if int(e) < 0 else '+') + str(abs(int(e)))).rjust(8)[:8]
+
+
+def write_pfile(path, n_cases=4, n_grids=4, seed=0):
+    """Function to write a random pfile, the first grid of each case is repeated (a duplicate grid block) and the
+    grids start at different times.
+
+        Ex:  write_pfile(str(tmp_path / 'ff.dat'))
+    """
+    rng = np.random.default_rng(seed)
+    lines = []
+    for c in range(1, n_cases + 1):
+        lines.append('$ CASE=%4d  test case\n' % c)
+        grids = [int(g) for g in rng.choice(np.arange(100, 108), n_grids, replace=False)]
+        for g in grids + grids[0:1]:
+            coef = rng.uniform(-1, 1, 6)
+            lines.append('$ GRID %8d    %7.4f          %7.4f          %7.4f\n' % (g, *coef[0:3]))
+            lines.append('$               %7.4f          %7.4f          %7.4f\n' % tuple(coef[3:6]))
+            n = int(rng.integers(20, 200)) * 2
+            t = np.round(np.arange(n) * 0.02 + 0.01 * int(rng.integers(0, 3)), 4)
+            f = rng.normal(size=n) * 10.0 ** rng.integers(-4, 2, size=n)
+            f[0] = 0
+            f[-1] = 0
+            values = [x for pair in zip(t, f) for x in pair]
+            for i in range(0, values.__len__(), 8):
+                fields = ['%8.3f' % x if j % 2 == 0 else nastran_field(x) for j, x in enumerate(values[i:i + 8])]
+                lines.append(' ' * 8 + ''.join(fields) + '\n')
+            lines.append('$\n')
+    with open(path, 'w') as f:
+        f.writelines(lines)
+
+
+def op4_record(f, payload, endian):
+    """Function to write one Fortran record, the payload between its byte counts."""
+    count = np.array([payload.__len__()], dtype=endian + 'i4').tobytes()
+    f.write(count + payload + count)
+
+
+def write_op4(path, a, form='dense', precision=2, endian='<', name='PHI'):
+    """Function to write a matrix to a binary op4 file with each column record dense (the run from the first to
+    the last non-zero row), full, sparse (strings of non-zero rows) or sparse BIGMAT.
+
+        Ex:  write_op4(str(tmp_path / 'phi.op4'), a, 'bigmat', 1)
+    """
+    n_rows, n_cols = a.shape
+    ft = endian + ('f4', 'f8')[precision - 1]
+    i4 = endian + 'i4'
+    with open(path, 'wb') as f:
+        header = np.array([n_cols, -n_rows if form == 'bigmat' else n_rows, 2, precision], dtype=i4).tobytes()
+        op4_record(f, header + name.ljust(8).encode(), endian)
+        for c in range(n_cols):
+            col = a[:, c]
+            nz = np.flatnonzero(col)
+            if form in ['dense', 'full']:
+                if form == 'dense' and nz.size == 0:
+                    continue
+                r0, r1 = (nz[0], nz[-1] + 1) if form == 'dense' else (0, n_rows)
+                data = col[r0:r1].astype(ft).tobytes()
+                op4_record(f, np.array([c + 1, r0 + 1, data.__len__() // 4], dtype=i4).tobytes() + data, endian)
+                continue
+            body = b''
+            for run in np.split(nz, np.flatnonzero(np.diff(nz) > 1) + 1) if nz.size else []:
+                data = col[run[0]:run[-1] + 1].astype(ft).tobytes()
+                n_words = data.__len__() // 4
+                if form == 'bigmat':
+                    body += np.array([n_words + 1, run[0] + 1], dtype=i4).tobytes() + data
+                else:
+                    body += np.array([(n_words + 1) * 65536 + run[0] + 1], dtype=i4).tobytes() + data
+            op4_record(f, np.array([c + 1, 0, body.__len__() // 4], dtype=i4).tobytes() + body, endian)
+        op4_record(f, np.array([n_cols + 1, 1, 1], dtype=i4).tobytes() + np.zeros(1, dtype=ft).tobytes()[0:4], endian)
+
+
+def write_ascii_op4(path, matrices, form='dense', n_per_line=5, width=16):
+    """Function to write matrices [(name, a)] to an ASCII op4 file with each column record full, dense (the run
+    from the first to the last non-zero row), sparse (strings of non-zero rows) or sparse BIGMAT.
+
+        Ex:  write_ascii_op4(str(tmp_path / 'kaa.ot4'), [('KAA', kaa)], 'sparse')
+    """
+    def data_lines(v):
+        fmt = '{0:' + str(width) + '.' + str(width - 7) + 'E}'
+        return [''.join(fmt.format(x) for x in v[k:k + n_per_line]) for k in range(0, v.__len__(), n_per_line)]
+
+    lines = []
+    for name, a in matrices:
+        n_rows, n_cols = a.shape
+        lines.append('{0:8d}{1:8d}{2:8d}{3:8d}{4:8s}1P,{5}E{6}.{7}'.format(
+            n_cols, -n_rows if form == 'bigmat' else n_rows, 2, 2, name, n_per_line, width, width - 7))
+        for c in range(n_cols):
+            col = a[:, c]
+            nz = np.flatnonzero(col)
+            if form == 'full':
+                lines.append('{0:8d}{1:8d}{2:8d}'.format(c + 1, 1, n_rows))
+                lines += data_lines(col)
+            elif nz.size and form == 'dense':
+                lines.append('{0:8d}{1:8d}{2:8d}'.format(c + 1, nz[0] + 1, nz[-1] - nz[0] + 1))
+                lines += data_lines(col[nz[0]:nz[-1] + 1])
+            elif nz.size:
+                body = []
+                for run in np.split(nz, np.flatnonzero(np.diff(nz) > 1) + 1):
+                    n = run[-1] - run[0] + 1
+                    if form == 'bigmat':
+                        body.append('{0:8d}{1:8d}'.format(n + 1, run[0] + 1))
+                    else:
+                        body.append('{0:8d}'.format((n + 1) * 65536 + run[0] + 1))
+                    body += data_lines(col[run[0]:run[-1] + 1])
+                lines.append('{0:8d}{1:8d}{2:8d}'.format(c + 1, 0, body.__len__()))
+                lines += body
+        lines.append('{0:8d}{1:8d}{2:8d}'.format(n_cols + 1, 1, 1))
+        lines += data_lines([1.0])
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def write_ltm(path, n_ltm=14, n_modes=9, seed=0):
+    """Function to write a LTMFILE of float32 records [bytes, name (80 chars), number of modes, atm and dtm of each
+    mode, bytes], the names carry the type, element and dof in fixed columns.
+
+        outputs: dofs <(element, dof) of each record>, atm, dtm <[n_ltm x n_modes] as written>
+
+        Ex:  dofs, atm, dtm = write_ltm(str(tmp_path / 'scr.pch'))
+    """
+    rng = np.random.default_rng(seed)
+    atm = rng.normal(size=(n_ltm, n_modes)).astype(np.float32)
+    dtm = rng.normal(size=(n_ltm, n_modes)).astype(np.float32)
+    dofs = [(100100 + i // 6 * 10, i % 6 + 1) for i in range(0, n_ltm)]
+    n_bytes = 80 + 4 + 8 * n_modes
+    with open(path, 'wb') as f:
+        for i, (element, dof) in enumerate(dofs):
+            name = '{0:<15} {1:>8}      {2:>2}'.format('CBAR' if i % 2 else 'CBUSH FORCE', element, dof).ljust(80)
+            otm = np.stack([atm[i], dtm[i]], axis=1).astype(np.float32)
+            f.write(np.int32(n_bytes).tobytes() + name.encode() + np.int32(n_modes).tobytes() + otm.tobytes()
+                    + np.int32(n_bytes).tobytes())
+    return dofs, atm, dtm
@@ -0,0 +1,106 @@
+import os
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from PyLnD.loads.file_cache import load_npz, save_npz
+from PyLnD.loads.tests.synthetic import make_scr
+
+
+def make_sources(scr, path):
+    """Function to give a synthetic model source files for the bundle to sign."""
+    names = {}
+    for kind in ['phi.op4', 'phi.f06', 'model.eig', 'model.pch', 'hwlist.xls']:
+        names[kind] = str(path / kind)
+        with open(names[kind], 'w') as f:
+            f.write('{0}\n'.format(kind))
+    scr.phi.op4file = names['phi.op4']
+    scr.phi.f06file = names['phi.f06']
+    scr.phi.phi_name = 'PHIG'
+    scr.eig.name = names['model.eig']
+    scr.ltm.name = names['model.pch']
+    scr.hwlist.name = names['hwlist.xls']
+    return names
+
+
+def test_bundle_round_trip(tmp_path):
+    ref = make_scr()
+    make_sources(ref, tmp_path)
+    bundle = str(tmp_path / 'model.npz')
+    ref.save_bundle(bundle=bundle)
+    ref.run(case='all')
+
+    scr = make_scr()
+    scr.phi = scr.eig = scr.ltm = scr.zeta = []
+    scr.load_bundle(bundle=bundle)
+    assert scr.phi.dofs == ref.phi.dofs
+    assert scr.ltm.acron_dofs == ref.ltm.acron_dofs
+    assert not scr.ltm.dtm.flags.writeable
+    scr.run(case='all')
+    table = scr.envelope()
+    ref_table = ref.envelope()
+    for c in ref.u.keys():
+        np.testing.assert_array_equal(scr.time[c], ref.time[c])
+        np.testing.assert_array_equal(scr.eta[c], ref.eta[c])
+        np.testing.assert_array_equal(scr.u[c], ref.u[c])
+    np.testing.assert_array_equal(table, ref_table)
+
+
+def test_bundle_keeps_phi_dofs(tmp_path):
+    ref = make_scr()
+    make_sources(ref, tmp_path)
+    bundle = str(tmp_path / 'model.npz')
+    dofs = [(101, 3), (100, 1)]
+    ref.save_bundle(bundle=bundle, dofs=dofs)
+    scr = make_scr()
+    scr.load_bundle(bundle=bundle)
+    assert scr.phi.dofs == dofs
+    np.testing.assert_array_equal(scr.phi.phi, ref.phi.phi[ref.phi.dof_index.find(dofs)])
+    with pytest.raises(Exception, match='not in PHI'):
+        ref.save_bundle(bundle=bundle, dofs=[(999, 1)])
+
+
+def test_stale_bundle(tmp_path):
+    ref = make_scr()
+    names = make_sources(ref, tmp_path)
+    bundle = str(tmp_path / 'model.npz')
+    ref.save_bundle(bundle=bundle)
+    scr = make_scr()
+
+    # A new modification time with the same contents is not stale.
+    stat = os.stat(names['model.pch'])
+    os.utime(names['model.pch'], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    scr.load_bundle(bundle=bundle)
+
+    # Changed contents of the same size, or a changed size, are.
+    with open(names['model.pch'], 'w') as f:
+        f.write('MODEL.PCH\n')
+    os.utime(names['model.pch'], ns=(stat.st_atime_ns, stat.st_mtime_ns + 2 * 10**9))
+    with pytest.raises(Exception, match='stale, the ltm file'):
+        scr.load_bundle(bundle=bundle)
+    with open(names['phi.f06'], 'a') as f:
+        f.write('more\n')
+    with pytest.raises(Exception, match='stale'):
+        scr.load_bundle(bundle=bundle)
+    scr.load_bundle(bundle=bundle, check='no')
+
+    # A removed source is not checked.
+    os.remove(names['model.pch'])
+    os.remove(names['phi.f06'])
+    scr.load_bundle(bundle=bundle)
+
+
+def test_load_npz(tmp_path):
+    name = str(tmp_path / 'arrays.npz')
+    a = np.arange(12.0).reshape(3, 4)
+    save_npz(name, a=a, f=np.asfortranarray(a), s=np.array(['x', 'yz']), i=np.array(3))
+    z = load_npz(name)
+    np.testing.assert_array_equal(z['a'], a)
+    np.testing.assert_array_equal(z['f'], a)
+    assert z['s'].tolist() == ['x', 'yz']
+    assert int(z['i']) == 3
+    assert not z['a'].flags.writeable
+    assert not os.path.exists(name + '.tmp')
+
+    np.savez_compressed(name, a=a)
+    with pytest.raises(Exception, match='compressed'):
+        load_npz(name)
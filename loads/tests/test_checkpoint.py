@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+import PyLnD.loads.scr as scr_module
+from PyLnD.loads.checkpoint import run_key, ltm_signature
+from PyLnD.loads.tests.synthetic import make_scr
+
+
+class Interrupt(Exception):
+    pass
+
+
+def interrupt_after(monkeypatch, n):
+    """Function to make the run stop after writing n checkpoints, as an interrupted run would."""
+    save = scr_module.save_checkpoint
+    count = [0]
+
+    def save_then_stop(*args, **kwargs):
+        save(*args, **kwargs)
+        count[0] += 1
+        if count[0] == n:
+            raise Interrupt()
+    monkeypatch.setattr(scr_module, 'save_checkpoint', save_then_stop)
+
+
+@pytest.mark.parametrize('stream', ['no', 'yes'])
+def test_restart_matches_uninterrupted(tmp_path, monkeypatch, stream):
+    kwargs = {'case': 1, 'checkpoint': 500, 'stream': stream, 'block': 100}
+    if stream == 'no':
+        kwargs.pop('block')
+    (tmp_path / 'full').mkdir()
+    full = make_scr()
+    full.run(checkpoint_dir=str(tmp_path / 'full'), **kwargs)
+
+    scr = make_scr()
+    with monkeypatch.context() as m:
+        interrupt_after(m, 2)
+        with pytest.raises(Interrupt):
+            scr.run(checkpoint_dir=str(tmp_path), **kwargs)
+    assert list(tmp_path.glob('test_case1_ckpt.npz'))
+    scr = make_scr()
+    scr.run(checkpoint_dir=str(tmp_path), restart='yes', **kwargs)
+    assert not list(tmp_path.glob('test_case1_ckpt.npz'))
+
+    if stream == 'yes':
+        for a in ['max', 'min', 't_max', 't_min']:
+            np.testing.assert_array_equal(getattr(scr.env[1], a), getattr(full.env[1], a))
+    else:
+        np.testing.assert_array_equal(np.asarray(scr.eta[1]), np.asarray(full.eta[1]))
+        np.testing.assert_array_equal(np.asarray(scr.u[1]), np.asarray(full.u[1]))
+
+
+def test_restart_rejects_changed_run(tmp_path, monkeypatch):
+    for change in ['ltm', 'dt']:
+        scr = make_scr()
+        with monkeypatch.context() as m:
+            interrupt_after(m, 1)
+            with pytest.raises(Interrupt):
+                scr.run(case=1, checkpoint=500, checkpoint_dir=str(tmp_path))
+        scr = make_scr()
+        if change == 'ltm':
+            scr.ltm.dtm = 2 * scr.ltm.dtm
+        else:
+            scr.pfile.case[1]['dt'] = 0.02
+        with pytest.raises(Exception, match='different run'):
+            scr.run(case=1, checkpoint=500, checkpoint_dir=str(tmp_path), restart='yes')
+
+
+def test_ltm_signature():
+    scr = make_scr()
+    sig = ltm_signature(scr.ltm)
+    assert run_key('filter', sig) == run_key('filter', ltm_signature(make_scr().ltm))
+    scr.ltm.atm = scr.ltm.atm + 1.0
+    assert ltm_signature(scr.ltm) != sig
+
+
+def test_rigid_modes_are_not_zeroed_on_disk(tmp_path):
+    scr = make_scr()
+    scr.run(case=1, checkpoint=500, checkpoint_dir=str(tmp_path))
+    ref = make_scr()
+    ref.run(case=1, rbm='yes')
+    assert not np.asarray(scr.eta[1][0:6]).any()
+    saved = np.load(str(tmp_path / 'test_case1_eta.npy'))
+    assert saved[0:6].any()
+    np.testing.assert_array_equal(saved, ref.eta[1])
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from PyLnD.loads.dof_index import DOFINDEX, pack_dofs, unpack_dofs
+
+
+def test_find_present_missing_and_duplicate():
+    dofs = [(100012, 3), (100012, 1), (7, 2), (100012, 3), (7, 0), (5, 65535)]
+    index = DOFINDEX(dofs)
+    assert len(index) == 6
+    queries = [(7, 2), (100012, 3), (100012, 2), (8, 2), (5, 65535), (7, 0), (6, 0)]
+    expected = [dofs.index(q) if q in dofs else -1 for q in queries]
+    assert index.find(queries).tolist() == expected
+    assert index.find(np.array(queries)).tolist() == expected
+    assert index.find([]).tolist() == []
+    assert index.index((100012, 3)) == 0
+    with pytest.raises(ValueError):
+        index.index((100012, 2))
+    assert (7, 2) in index
+    assert (100012, 2) not in index
+    assert DOFINDEX([]).find([(1, 1)]).tolist() == [-1]
+
+
+def test_join():
+    phi = DOFINDEX([(1, 1), (1, 2), (2, 1), (3, 6), (2, 1)])
+    ltm = DOFINDEX([(3, 6), (4, 1), (1, 2), (1, 2)])
+    i_phi, i_ltm = phi.join(ltm)
+    assert i_phi.tolist() == [1, 3]
+    assert i_ltm.tolist() == [2, 0]
+    i_ltm, i_phi = ltm.join(phi)
+    assert i_ltm.tolist() == [0, 2, 3]
+    assert i_phi.tolist() == [3, 1, 1]
+    assert DOFINDEX([]).join(ltm)[0].size == 0
+
+
+def test_packing_limit():
+    dofs = [(1, 65535), (2, 0), (-3, 4)]
+    assert unpack_dofs(pack_dofs(dofs)) == dofs
+
+    # A component past the packing limit would alias (2, 0), it is rejected.
+    for bad in [(1, 65536), (1, -1)]:
+        with pytest.raises(ValueError, match='component outside'):
+            pack_dofs([bad])
+        with pytest.raises(ValueError):
+            DOFINDEX([(2, 0), bad])
+        assert bad not in DOFINDEX(dofs)
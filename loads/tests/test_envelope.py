@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from PyLnD.loads.tests.synthetic import make_scr
+
+
+def long_labels(scr):
+    """Function to give the first element of a synthetic model an acronym longer than 16 characters."""
+    scr.ltm.acron_dofs = [('LONG_ACRONYM_OVER_16_CHARACTERS', dof) if acron == 'A500' else (acron, dof)
+                          for acron, dof in scr.ltm.acron_dofs]
+    scr.ltm.index_acron()
+
+
+def test_envelope_matches_histories():
+    scr = make_scr()
+    long_labels(scr)
+    scr.run(case='all')
+    table = scr.envelope()
+    for c in scr.u.keys():
+        u = scr.u[c]
+        rows = table[table['case'] == c]
+        np.testing.assert_array_equal(rows['max'], u.max(axis=1))
+        np.testing.assert_array_equal(rows['t_min'], scr.time[c][u.argmin(axis=1)])
+
+    # Labels are kept whole and their rows found through the acronym index.
+    row = scr.dof_row(('LONG_ACRONYM_OVER_16_CHARACTERS', 'D2'))
+    assert table['acron'][row] == 'LONG_ACRONYM_OVER_16_CHARACTERS'
+    assert table['dof'][row] == 'D2'
+    assert scr.dof_row(('A501', 'D3'), scr.env[1].labels) == scr.ltm.acron_dofs.index(('A501', 'D3'))
+
+
+def test_dof_row_unknown():
+    scr = make_scr()
+    with pytest.raises(Exception):
+        scr.dof_row(('NOPE', 'D1'))
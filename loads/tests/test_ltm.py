@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from PyLnD.loads.ltm import LTM
+from PyLnD.loads.dof_index import DOFINDEX
+from PyLnD.loads.tests.synthetic import write_ltm
+from PyLnD.loads.tests.reference import read_ltm
+
+
+def make_hwlist(dofs):
+    """Function to make a HWLIST labelling every other LTM dof, with a duplicate label and two RSS items."""
+    eid_dofids = dofs[::2] + [dofs[0], (999, 1)]
+    acron_dofs = [('E{0}'.format(e), 'F{0}'.format(d)) for e, d in dofs[::2]] + [('DUP', 'F1'), ('NONE', 'F1')]
+    acron_dofs[1] = ('RSS_ITEM', 'RSS')
+    e0, e1 = dofs[0][0], dofs[6][0]
+    return SimpleNamespace(eid_dofids=eid_dofids, acron_dofs=acron_dofs, dof_index=DOFINDEX(eid_dofids),
+                           hw_rss=[('R1', e0, 'RSS'), ('R2', e1, 'RSST'), ('R3', 5, 'RSS')],
+                           hw={'R1': {e0: {'RSS': {'dofs': [1, 2, 3]}}}, 'R2': {e1: {'RSST': {'dofs': [6, 4]}}}})
+
+
+@pytest.mark.parametrize('mmap', ['no', 'yes'])
+def test_ltm_matches_record_reader(tmp_path, mmap):
+    name = str(tmp_path / 'scr.pch')
+    dofs, atm, dtm = write_ltm(name)
+    types, ref_dofs, ref_atm, ref_dtm = read_ltm(name)
+    ltm = LTM(name, mmap=mmap)
+    assert ltm.dofs == ref_dofs == dofs
+    assert ltm.types == types
+    assert (ltm.num_ltms, ltm.num_modes) == ref_atm.shape
+    np.testing.assert_array_equal(ltm.atm, ref_atm)
+    np.testing.assert_array_equal(ltm.dtm, ref_dtm)
+    if mmap == 'yes':
+        assert ltm.atm.dtype == np.float32 and ltm.dtm.dtype == np.float32
+        assert not ltm.dtm.flags.writeable
+    else:
+        assert ltm.atm.dtype == float and ltm.dtm.dtype == float
+
+
+def test_ltm_rejects_bad_file(tmp_path):
+    name = str(tmp_path / 'scr.pch')
+    write_ltm(name)
+    with open(name, 'ab') as f:
+        f.write(b'\0' * 4)
+    with pytest.raises(Exception, match='is not a LTMFILE'):
+        LTM(name)
+
+
+def test_ltm_indexes_match_lookups(tmp_path):
+    name = str(tmp_path / 'scr.pch')
+    dofs, atm, dtm = write_ltm(name)
+    hwlist = make_hwlist(dofs)
+    ltm = LTM(name)
+    ltm.label_ltm(hwlist)
+
+    # The labels, as found with the HWLIST lists.
+    labels = []
+    for dof in ltm.dofs:
+        if dof in hwlist.eid_dofids:
+            acron_dof = hwlist.acron_dofs[hwlist.eid_dofids.index(dof)]
+            if acron_dof[1][0:3].upper() == 'RSS':
+                acron_dof = (acron_dof[0], acron_dof[1] + '_' + str(dof[1]))
+            labels.append(acron_dof)
+        else:
+            labels.append(None)
+    assert ltm.acron_dofs == labels
+
+    # The RSS rows, as found with the LTM dof list.
+    ltm.index_rss(hwlist)
+    ltm.index_rss(hwlist)
+    assert ltm.rss_labels == [('R1', 'RSS'), ('R2', 'RSST')]
+    assert ltm.acron_dofs == labels + ltm.rss_labels
+    items = [[ltm.dofs.index((dofs[0][0], d)) for d in [1, 2, 3]], [ltm.dofs.index((dofs[6][0], d)) for d in [6, 4]]]
+    for i, rows in enumerate(items):
+        assert ltm.rss_idx[ltm.rss_ptr[i]:ltm.rss_ptr[i + 1]].tolist() == rows
+
+    # The first row of each label, as found with the label list.
+    for label in set(item for item in ltm.acron_dofs if item is not None):
+        assert ltm.acron_index[label] == ltm.acron_dofs.index(label)
+    for dof in dofs + [(999, 1)]:
+        assert (ltm.dof_index.index(dof) if dof in ltm.dof_index else -1) == \
+            (ltm.dofs.index(dof) if dof in ltm.dofs else -1)
+
+    # A RSS item whose LTM rows are missing.
+    hwlist.hw['R1'][dofs[0][0]]['RSS']['dofs'] = [1, 9]
+    with pytest.raises(Exception, match='Missing'):
+        ltm.index_rss(hwlist)
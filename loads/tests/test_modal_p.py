@@ -0,0 +1,33 @@
+import numpy as np
+from types import SimpleNamespace
+from PyLnD.loads.dof_index import DOFINDEX
+from PyLnD.loads.pfile import modal_p, to_pcase
+
+
+def make_case(rng):
+    """A synced case of 3 grid histories, the x load of the first grid sums to zero over the case."""
+    time = np.arange(0, 200) * 0.01
+    case = {'grids': [101, 102, 103], 'dt': 0.01, 'loc': 0}
+    for g in case['grids']:
+        p_vec = np.zeros([time.size, 7])
+        p_vec[:, 0] = time
+        p_vec[:, 1:7] = np.sin(2 * np.pi * rng.uniform(0.5, 2.0) * time)[:, np.newaxis] * rng.normal(size=6)
+        case[g] = p_vec
+    case[101][:, 1] = np.r_[np.ones(100), -np.ones(100)]
+    case[102][:, 5] = 0.0
+    return case
+
+
+def test_terms_match_histories():
+    rng = np.random.default_rng(6)
+    case = make_case(rng)
+    dofs = [(g, d) for g in [101, 102, 103, 104] for d in range(1, 7)]
+    phi = SimpleNamespace(phi=rng.normal(size=(len(dofs), 8)), dof_index=DOFINDEX(dofs))
+    p_modal = modal_p(case, phi)
+    np.testing.assert_allclose(modal_p(to_pcase(case), phi), p_modal, rtol=0, atol=1e-12 * np.abs(p_modal).max())
+
+    # The dof with a zero sum load is not applied, so it need not be in PHI.
+    dofs.remove((101, 1))
+    phi = SimpleNamespace(phi=np.delete(phi.phi, 0, axis=0), dof_index=DOFINDEX(dofs))
+    np.testing.assert_allclose(modal_p(to_pcase(case), phi), modal_p(case, phi), rtol=0,
+                               atol=1e-12 * np.abs(p_modal).max())
@@ -0,0 +1,139 @@
+import os
+import numpy as np
+import pytest
+from PyLnD.loads import pfile as pfile_module
+from PyLnD.loads.pfile import PFILE, parse_fields, auto_ts
+from PyLnD.loads.tests import reference
+from PyLnD.loads.tests.synthetic import write_pfile
+
+
+@pytest.fixture
+def pfile_name(tmp_path):
+    name = str(tmp_path / 'ff.dat')
+    write_pfile(name)
+    return name
+
+
+def assert_cases(pfile, ref, tol=1e-12):
+    assert sorted(pfile.case.keys()) == sorted(ref.keys())
+    for c in ref.keys():
+        case = pfile.case[c]
+        assert case['grids'] == ref[c]['grids']
+        for g in ref[c]['grids']:
+            np.testing.assert_allclose(case[g], ref[c][g], rtol=0, atol=tol * np.abs(ref[c][g]).max())
+
+
+def test_parse_matches_reference(pfile_name):
+    assert_cases(PFILE(pfile_name, filetype='pfile'), reference.read_pfile(pfile_name))
+
+
+def test_parse_fields():
+    lines = ['           0.000-1.234-3   0.010 1.5+2', '', '   0.020      0.    0.03  -2.5-1']
+    values, counts = parse_fields(lines)
+    np.testing.assert_array_equal(values, [0.0, -1.234e-3, 0.01, 150.0, 0.02, 0.0, 0.03, -0.25])
+    np.testing.assert_array_equal(counts, [4, 0, 4])
+    with pytest.raises(ValueError):
+        parse_fields(['     1.0    abcd'])
+
+
+@pytest.mark.parametrize('dt', [0.01, 0.005, 0.03])
+def test_sync_matches_reference(pfile_name, dt):
+    ref = reference.read_pfile(pfile_name)
+    pfile = PFILE(pfile_name, filetype='pfile')
+    pfile.sync(case='all', tstep=dt)
+    for c in ref.keys():
+        reference.sync_case(ref[c], dt)
+    assert_cases(pfile, ref, tol=1e-10)
+
+
+def test_auto_ts_matches_reference():
+    rng = np.random.default_rng(5)
+    for trial in range(300):
+        n = int(rng.integers(3, 400))
+        time = np.arange(0, n) * [0.01, 0.005, 0.02][trial % 3]
+        vec = np.round(rng.normal(size=n) * (rng.uniform(size=n) < rng.uniform()), 1)
+        vec[0:int(rng.integers(1, n))] = 0
+        vec[-1] = 1.0
+        tol = float(rng.choice([0.0, 0.05, 0.3, 1.0]))
+        ring = float(rng.choice([0.0, 0.01, 0.05, 0.3, 2.0]))
+        np.testing.assert_array_equal(auto_ts(time, vec, tol, ring), reference.auto_ts(time, vec, tol, ring))
+
+
+def test_auto_sync_matches_reference(pfile_name):
+    ref = reference.read_pfile(pfile_name)
+    pfile = PFILE(pfile_name, filetype='pfile')
+    pfile.sync(case='all', tstep=0.01, auto='yes', tol=0.05, ring=0.1)
+    for c in ref.keys():
+        reference.sync_case(ref[c], 0.01)
+        p_sum = sum([np.sum(np.absolute(ref[c][g][:, 1:]), axis=1) for g in ref[c]['grids']])
+        keep = reference.auto_ts(ref[c][ref[c]['grids'][0]][:, 0], p_sum, 0.05, 0.1)
+        for g in ref[c]['grids']:
+            ref[c][g] = ref[c][g][keep]
+    assert_cases(pfile, ref, tol=1e-10)
+
+
+def test_evicted_cases_are_parsed_again(pfile_name):
+    ref = reference.read_pfile(pfile_name)
+    pfile = PFILE(pfile_name, filetype='pfile', max_cases=1)
+    pfile.sync(case=[1], tstep=0.01)
+    synced = {g: pfile.case[1][g].copy() for g in pfile.case[1]['grids']}
+    for c in [2, 3, 1]:
+        pfile.case[c]
+    assert list(pfile.case.parsed.keys()) == [1]
+
+    # Case 2 was dropped and is parsed again, case 1 was dropped and its sync applied again.
+    np.testing.assert_allclose(pfile.case[2][ref[2]['grids'][1]], ref[2][ref[2]['grids'][1]], rtol=1e-12)
+    for g, p_vec in synced.items():
+        np.testing.assert_array_equal(pfile.case[1][g], p_vec)
+
+
+def test_edited_cases_are_kept(pfile_name):
+    pfile = PFILE(pfile_name, filetype='pfile', max_cases=1)
+    case = pfile.case[1]
+    g = case['grids'][1]
+
+    # The parsed arrays are read-only, an edit by assignment keeps the case past the size limit.
+    with pytest.raises(ValueError):
+        case[g][:, 1] = 0.0
+    p_vec = case[g].copy()
+    p_vec[:, 1] = 0.0
+    case[g] = p_vec
+    for c in [2, 3, 4]:
+        pfile.case[c]
+    assert pfile.case[1] is case
+    np.testing.assert_array_equal(pfile.case[1][g][:, 1], 0.0)
+    assert pfile.case.parsed.__len__() == 1
+
+
+def test_cache_follows_the_pfile(pfile_name, monkeypatch):
+    pfile = PFILE(pfile_name, filetype='pfile', cache='yes')
+    pfile.sync(case='all', tstep=0.01)
+    synced = pfile.case[2][pfile.case[2]['grids'][0]].copy()
+
+    # Reopened unchanged, the pfile is not hashed and the synced cases are read from the cache.
+    hashed = []
+    signature = pfile_module.file_signature
+    monkeypatch.setattr(pfile_module, 'file_signature', lambda name: hashed.append(name) or signature(name))
+    monkeypatch.setattr(PFILE, 'read_case', lambda self, c: pytest.fail('case {0} parsed'.format(c)))
+    pfile = PFILE(pfile_name, filetype='pfile', cache='yes')
+    pfile.sync(case=[2], tstep=0.01)
+    np.testing.assert_array_equal(pfile.case[2][pfile.case[2]['grids'][0]], synced)
+    assert hashed == []
+
+    # Touched but not changed, the pfile is hashed once and the cache is kept.
+    stat = os.stat(pfile_name)
+    os.utime(pfile_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    pfile = PFILE(pfile_name, filetype='pfile', cache='yes')
+    pfile.sync(case=[2], tstep=0.01)
+    np.testing.assert_array_equal(pfile.case[2][pfile.case[2]['grids'][0]], synced)
+    PFILE(pfile_name, filetype='pfile', cache='yes')
+    assert hashed.__len__() == 1
+    PFILE(pfile_name, filetype='pfile', cache='strict')
+    assert hashed.__len__() == 2
+
+    # Changed, the cache is cleared and the cases are parsed from the new pfile.
+    monkeypatch.undo()
+    write_pfile(pfile_name, seed=1)
+    os.utime(pfile_name, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    pfile = PFILE(pfile_name, filetype='pfile', cache='yes')
+    assert_cases(pfile, reference.read_pfile(pfile_name))
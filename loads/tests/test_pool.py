@@ -0,0 +1,60 @@
+import os
+import numpy as np
+import pytest
+from PyLnD.loads.tests.synthetic import make_scr
+
+
+def shm_names():
+    return set(os.listdir('/dev/shm')) if os.path.isdir('/dev/shm') else set()
+
+
+@pytest.mark.parametrize('ring', ['step', 'analytic', 'envelope'])
+def test_pool_matches_serial(ring):
+    serial = make_scr()
+    serial.run(case='all', ring=ring)
+    before = shm_names()
+    pooled = make_scr()
+    pooled.run(case='all', ring=ring, workers=2)
+
+    # The shared model and output blocks are all released.
+    assert shm_names() == before
+    for c in serial.eta.keys():
+        np.testing.assert_array_equal(pooled.time[c], serial.time[c])
+        np.testing.assert_allclose(pooled.eta[c], serial.eta[c], rtol=0, atol=1e-12)
+        np.testing.assert_allclose(np.asarray(pooled.u[c]), np.asarray(serial.u[c]), rtol=0, atol=1e-12)
+        if ring == 'envelope':
+            np.testing.assert_allclose(pooled.env[c].max, serial.env[c].max, rtol=0, atol=1e-12)
+
+
+def test_pool_accel_matches_serial():
+    serial = make_scr()
+    serial.run(case='all', accel='yes')
+    pooled = make_scr()
+    pooled.run(case='all', accel='yes', workers=2)
+    for c in serial.eta.keys():
+        np.testing.assert_allclose(np.asarray(pooled.u[c]), np.asarray(serial.u[c]), rtol=0, atol=1e-12)
+
+
+def test_pool_bounds_output_blocks(monkeypatch):
+    import PyLnD.loads.pool as pool_module
+    new_array = pool_module.new_array
+    made = []
+    live = []
+
+    def count_new_array(shape, dtype=float):
+        shm, desc = new_array(shape, dtype)
+        made.append(shm.name)
+        live.append(len(set(made) & shm_names()))
+        return shm, desc
+    monkeypatch.setattr(pool_module, 'new_array', count_new_array)
+
+    serial = make_scr(n_cases=8)
+    serial.run(case='all')
+    pooled = make_scr(n_cases=8)
+    pooled.run(case='all', workers=2)
+
+    # The eta and u blocks of at most workers + 1 cases exist at once.
+    assert len(made) == 16
+    assert max(live) <= 2 * 3
+    for c in serial.eta.keys():
+        np.testing.assert_allclose(np.asarray(pooled.u[c]), np.asarray(serial.u[c]), rtol=0, atol=1e-12)
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from PyLnD.loads import phi as phi_module
+from PyLnD.loads.op4 import OP4
+from PyLnD.loads.op4_ishit import read_op4_ascii
+from PyLnD.loads.read_op4 import index_op4, read_op4_matrix, read_ascii_op4
+from PyLnD.loads.tests import reference
+from PyLnD.loads.tests.synthetic import make_scr, write_op4, write_ascii_op4
+from PyLnD.thermal.ot4 import OT4
+
+
+def sparse_matrix(n_rows=60, n_cols=12, seed=7):
+    """A matrix with empty columns and columns of several runs of non-zero rows."""
+    rng = np.random.default_rng(seed)
+    a = rng.normal(size=(n_rows, n_cols)) * (rng.uniform(size=(n_rows, n_cols)) < 0.4)
+    a[:, 3] = 0.0
+    a[:, 5] = rng.normal(size=n_rows)
+    return a.astype(np.float32).astype(float)
+
+
+@pytest.mark.parametrize('form', ['dense', 'full', 'sparse', 'bigmat'])
+@pytest.mark.parametrize('precision', [1, 2])
+@pytest.mark.parametrize('endian', ['<', '>'])
+def test_read_matches_matrix(tmp_path, form, precision, endian):
+    a = sparse_matrix()
+    name = str(tmp_path / 'phi.op4')
+    write_op4(name, a, form, precision, endian)
+    buf, index = index_op4(name)
+    entry = index['PHI']
+    assert (entry['n_rows'], entry['n_cols'], entry['bigmat']) == (60, 12, form == 'bigmat')
+    np.testing.assert_array_equal(read_op4_matrix(buf, entry), a)
+    rows = [40, 2, 17, 2]
+    np.testing.assert_array_equal(read_op4_matrix(buf, entry, rows=rows, cols=[3, 9]), a[rows, 2:9])
+    np.testing.assert_array_equal(read_op4_matrix(buf, entry, cols=[2, 12], view='yes'), a[:, 1:12])
+    with pytest.raises(Exception):
+        read_op4_matrix(buf, entry, cols=[5, 13])
+    buf.close()
+
+
+@pytest.mark.parametrize('form', ['dense', 'full', 'sparse', 'bigmat'])
+def test_read_ascii_matches_matrix(tmp_path, form):
+    kaa = sparse_matrix()
+    maa = sparse_matrix(17, 8, seed=8)
+    name = str(tmp_path / 'a.ot4')
+    write_ascii_op4(name, [('KAA', kaa), ('MAA', maa)], form)
+    op4 = read_ascii_op4(name)
+    assert list(op4.keys()) == ['KAA', 'MAA']
+    np.testing.assert_allclose(op4['KAA']['data'], kaa, rtol=1e-9, atol=0)
+    np.testing.assert_allclose(op4['MAA']['data'], maa, rtol=1e-9, atol=0)
+    assert list(read_ascii_op4(name, matrices=['MAA']).keys()) == ['MAA']
+
+    # OP4 keeps its matrix dictionaries and OT4 its matrices.
+    op4 = OP4(op4=name, type='ascii').op4
+    assert sorted(op4['KAA'].keys()) == ['data', 'form', 'n_cols', 'n_rows', 'type']
+    ot4 = OT4(name, matrices=['KAA'])
+    assert ot4.ot4_names == ['KAA']
+    np.testing.assert_array_equal(ot4.ot4['KAA'], op4['KAA']['data'])
+
+
+@pytest.mark.parametrize('form', ['dense', 'full', 'sparse'])
+def test_read_op4_ascii_lines(tmp_path, form):
+    name = str(tmp_path / 'a.ot4')
+    write_ascii_op4(name, [('KAA', sparse_matrix()), ('MAA', sparse_matrix(17, 8, seed=8))], form)
+    data = read_op4_ascii(name).data
+    ref = reference.read_op4_lines(name)
+    assert list(data.keys()) == list(ref.keys())
+    for case in ref.keys():
+        np.testing.assert_array_equal(data[case], ref[case])
+
+
+def test_phi_mode_range(tmp_path, monkeypatch):
+    scr = make_scr(n_modes=12)
+    dofs = scr.phi.dofs
+    name = str(tmp_path / 'phi.op4')
+    write_op4(name, scr.phi.phi, 'full')
+    monkeypatch.setattr(phi_module, 'read_msf06_dofs', lambda f06file: (scr.phi.grids, list(dofs)))
+    full = make_scr(n_modes=12)
+    full.run(case='all', modes=[3, 10], residual='no')
+
+    # Loading PHI modes 3 to 10 cuts the eigenvalues, damping and LTM columns to the same modes.
+    part = make_scr(n_modes=12)
+    part.phi = phi_module.PHI(name, 'phi.f06', modes=[3, 10])
+    part.fit_modes()
+    part.zeta = part.zeta[2:10]
+    assert part.eig.eigenvalues.__len__() == 8 and part.ltm.dtm.shape == (full.ltm.dtm.shape[0], 8)
+    part.run(case='all')
+    for c in full.u.keys():
+        np.testing.assert_allclose(part.u[c], full.u[c], rtol=0, atol=1e-12 * np.abs(full.u[c]).max())
+        np.testing.assert_array_equal(part.eta[c], full.eta[c][2:10])
+
+    # The run mode range is in mode numbers of the model.
+    part.run(case=1, modes=[5, 10], residual='no')
+    np.testing.assert_array_equal(part.modes, np.arange(2, 8))
+    with pytest.raises(Exception):
+        part.run(case=1, modes=[1, 10])
+
+    # A LTM of other modes than PHI is found before the run.
+    part.ltm.dtm = part.ltm.dtm[:, 0:7]
+    with pytest.raises(Exception, match='LTM has 7 modes'):
+        part.run(case=1)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from PyLnD.loads.response import RESPONSE
+from PyLnD.loads.tests.synthetic import make_scr
+
+
+def test_lazy_recovery_matches_full():
+    full = make_scr()
+    full.run(case='all')
+    lazy = make_scr()
+    lazy.run(case='all', recover='lazy')
+    n_ltm = full.ltm.dtm.shape[0]
+    for c in full.u.keys():
+        u = full.u[c]
+        assert type(lazy.u[c]) is RESPONSE
+        assert lazy.u[c].shape == u.shape
+
+        # Single LTM and RSS rows, a row list with time slicing, then everything.
+        for row in [0, 7, n_ltm, n_ltm + 1]:
+            np.testing.assert_allclose(lazy.u[c][row, :], u[row, :], rtol=0, atol=1e-12)
+        rows = [n_ltm + 1, 3, n_ltm, 3]
+        np.testing.assert_allclose(lazy.u[c][rows, 10:50], u[rows, 10:50], rtol=0, atol=1e-12)
+        np.testing.assert_allclose(lazy.u[c][-1], u[-1], rtol=0, atol=1e-12)
+        assert set(lazy.u[c].rows.keys()) < set(range(u.shape[0]))
+        np.testing.assert_allclose(np.asarray(lazy.u[c]), u, rtol=0, atol=1e-12)
+        with pytest.raises(Exception, match='out of range'):
+            lazy.u[c].recover([u.shape[0]])
+
+
+def test_lazy_amx_matches_full(capsys):
+    full = make_scr()
+    full.run(case='all')
+    lazy = make_scr()
+    lazy.run(case='all', recover='lazy')
+    n_ltm = full.ltm.dtm.shape[0]
+    for dof in [full.ltm.acron_dofs[4], full.ltm.acron_dofs[n_ltm], full.ltm.acron_dofs[n_ltm + 1]]:
+        full.amx(item=(2,) + tuple(dof))
+        lazy.amx(item=(2,) + tuple(dof))
+        out = capsys.readouterr().out.split('\n\n')
+        assert out[0] == out[1]
+    assert 2 not in lazy.env
+
+
+def test_lazy_rejects_accel():
+    scr = make_scr()
+    with pytest.raises(Exception, match='accel cannot be combined with recover="lazy"'):
+        scr.run(case=1, recover='lazy', accel='yes')
@@ -0,0 +1,167 @@
+import numpy as np
+import pytest
+from PyLnD.loads.rf_functions import rf_mdof, rf_free, rf_fft, RFCACHE, rf_fingerprint, rf_table
+from PyLnD.loads.tests.synthetic import make_modes, make_scr
+
+
+def integrate(t, p, k, omn, zeta, shape, method, blocks=None):
+    """Integrate from a nonzero initial state, in one call or in blocks carrying the time step state."""
+    eta = np.zeros(shape)
+    etad = np.zeros(shape)
+    eta[..., 0] = 0.5
+    etad[..., 0] = -0.2
+    if blocks is None:
+        rf_mdof(t, p, k, omn, zeta, eta, etad, method=method)
+    else:
+        dt_state = [0.0, 0.0]
+        for i0, i1 in blocks:
+            rf_mdof(t[i0:i1 + 1], p[..., i0:i1 + 1], k, omn, zeta, eta[..., i0:i1 + 1], etad[..., i0:i1 + 1],
+                    method=method, dt_state=dt_state)
+    return eta, etad
+
+
+def time_vector():
+    """Three constant time step runs, long, medium and shorter than the direct stepping limit."""
+    return np.concatenate([np.arange(0, 1, 0.01), 1 + np.arange(1, 300) * 0.002, 1.598 + np.arange(1, 7) * 0.05])
+
+
+def assert_close(eta, etad, ref):
+    assert np.abs(eta - ref[0]).max() <= 1e-12 * np.abs(ref[0]).max()
+    assert np.abs(etad - ref[1]).max() <= 1e-12 * np.abs(ref[1]).max()
+
+
+@pytest.mark.parametrize('layout', ['modes', 'cases', 'variants'])
+def test_filter_matches_recurrence(layout):
+    rng = np.random.default_rng(1)
+    k, omn, zeta = make_modes()
+    t = time_vector()
+    n_modes = k.size
+    if layout == 'modes':
+        p = rng.normal(size=(n_modes, t.size))
+        shape = p.shape
+    elif layout == 'cases':
+        p = rng.normal(size=(n_modes, 3, t.size))
+        shape = p.shape
+    else:
+        p = rng.normal(size=(n_modes, 1, t.size))
+        k, omn, zeta = [np.stack([v, s * v], axis=1) for v, s in zip([k, omn, zeta], [1.1, 1.05, 2.0])]
+        shape = (n_modes, 2, t.size)
+
+    ref = integrate(t, p, k, omn, zeta, shape, 'recurrence')
+    assert_close(*integrate(t, p, k, omn, zeta, shape, 'filter'), ref)
+    assert_close(*integrate(t, p, k, omn, zeta, shape, 'filter', blocks=[(0, 50), (50, 51), (51, 250),
+                                                                          (250, t.size - 1)]), ref)
+
+
+def test_filter_many_short_runs():
+    rng = np.random.default_rng(2)
+    k, omn, zeta = make_modes()
+    t = np.concatenate([[0.0], np.cumsum(np.where((np.arange(0, 999) // 7) % 2, 0.005, 0.01))])
+    p = rng.normal(size=(k.size, t.size))
+    ref = integrate(t, p, k, omn, zeta, p.shape, 'recurrence')
+    assert_close(*integrate(t, p, k, omn, zeta, p.shape, 'filter'), ref)
+
+
+@pytest.mark.parametrize('n_cases', [0, 3])
+def test_free_matches_recurrence(n_cases):
+    rng = np.random.default_rng(3)
+    k, omn, zeta = make_modes()
+    t = np.arange(0, 2000) * 0.01
+    shape = (k.size,) + (n_cases,) * (n_cases > 0) + (t.size,)
+    eta0 = rng.normal(size=shape[:-1])
+    etad0 = rng.normal(size=shape[:-1])
+    eta = np.zeros(shape)
+    etad = np.zeros(shape)
+    eta[..., 0] = eta0
+    etad[..., 0] = etad0
+    rf_mdof(t, np.zeros(shape), k, omn, zeta, eta, etad, method='recurrence')
+    assert_close(*rf_free(t, omn, zeta, eta0, etad0), (eta, etad))
+
+
+@pytest.mark.parametrize('n_cases', [0, 3])
+def test_fft_matches_recurrence(n_cases):
+    rng = np.random.default_rng(4)
+    k, omn, zeta = make_modes()
+    t = np.arange(0, 3000) * 0.01
+    shape = (k.size,) + (n_cases,) * (n_cases > 0) + (t.size,)
+    f = rng.uniform(0.2, 3.0, size=shape[:-1] + (1,))
+    p = np.sin(2 * np.pi * f * t) * (t < 20)
+    ref = rf_mdof(t, p, k, omn, zeta, np.zeros(shape), np.zeros(shape), method='recurrence')
+
+    # The error of the elastic modes is from the FRF aliases left out, it drops as more are folded in.
+    err = []
+    for aliases in [2, 8]:
+        eta, etad = rf_fft(t, p, k, omn, zeta, aliases=aliases)
+        err.append(np.abs(eta - ref[0]).max(axis=-1) / np.abs(ref[0]).max(axis=-1))
+    assert err[0].max() < 2e-4
+    assert (err[1][3:] < 0.1 * err[0][3:]).all()
+
+
+def test_fft_needs_constant_step():
+    k, omn, zeta = make_modes()
+    t = time_vector()
+    with pytest.raises(Exception):
+        rf_fft(t, np.zeros((k.size, t.size)), k, omn, zeta)
+
+
+def test_rf_cache_hits_and_misses():
+    k, omn, zeta = make_modes()
+    rfc = RFCACHE()
+    first = rfc.get(0.01, k, omn, zeta)
+    again = rfc.get(0.01, list(k), omn.copy(), zeta.copy())
+    assert again is first
+    assert (rfc.hits, rfc.misses) == (1, 1)
+    np.testing.assert_array_equal(first, rf_table(0.01, k, omn, zeta))
+    assert not first.flags.writeable
+    rfc.clear()
+    assert (rfc.hits, rfc.misses, len(rfc.table)) == (0, 0, 0)
+
+
+def test_rf_cache_evicts_least_recently_used():
+    k, omn, zeta = make_modes()
+    rfc = RFCACHE(size=2)
+    a = rfc.get(0.01, k, omn, zeta)
+    rfc.get(0.02, k, omn, zeta)
+    assert rfc.get(0.01, k, omn, zeta) is a
+    rfc.get(0.03, k, omn, zeta)
+
+    # 0.02 was the least recently used, 0.01 and 0.03 are kept.
+    assert len(rfc.table) == 2
+    misses = rfc.misses
+    assert rfc.get(0.01, k, omn, zeta) is a
+    assert rfc.misses == misses
+    rfc.get(0.02, k, omn, zeta)
+    assert rfc.misses == misses + 1
+    assert len(rfc.table) == 2
+
+
+def test_rf_cache_keys_on_the_mode_set_and_time_step():
+    k, omn, zeta = make_modes()
+    base = rf_fingerprint(k, omn, zeta)
+    zeta2 = zeta.copy()
+    zeta2[4] *= 1.01
+    omn2 = omn.copy()
+    omn2[5] *= 1.01
+    k2 = k.copy()
+    k2[6] *= 1.01
+    for changed in [(k, omn, zeta2), (k, omn2, zeta), (k2, omn, zeta), (k[0:-1], omn[0:-1], zeta[0:-1])]:
+        assert rf_fingerprint(*changed) != base
+
+    # Every change gives the coefficients of the new mode set or time step, never a stale entry.
+    rfc = RFCACHE()
+    for dt, modes in [(0.01, (k, omn, zeta)), (0.01, (k, omn, zeta2)), (0.01, (k, omn2, zeta)),
+                      (0.01, (k2, omn, zeta)), (0.0101, (k, omn, zeta)), (0.01, (k, omn, zeta))]:
+        np.testing.assert_array_equal(rfc.get(dt, *modes), rf_table(dt, *modes))
+    assert (rfc.hits, rfc.misses) == (1, 5)
+
+
+def test_rf_cache_session_follows_damping():
+    scr = make_scr()
+    scr.run(case='all')
+    scr.zeta = 2 * scr.zeta
+    scr.run(case='all')
+    ref = make_scr()
+    ref.zeta = 2 * ref.zeta
+    ref.run(case='all')
+    for c in ref.u.keys():
+        np.testing.assert_array_equal(scr.u[c], ref.u[c])
@@ -0,0 +1,134 @@
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from PyLnD.loads.tests.synthetic import make_scr
+
+
+def assert_responses(scr, ref, tol=1e-10):
+    for c in ref.u.keys():
+        np.testing.assert_array_equal(scr.time[c], ref.time[c])
+        u = np.asarray(scr.u[c])
+        u_ref = np.asarray(ref.u[c])
+        assert np.abs(u - u_ref).max() <= tol * np.abs(u_ref).max()
+
+
+@pytest.mark.parametrize('batch', ['no', 'yes'])
+def test_ring_analytic_matches_step(batch):
+    step = make_scr()
+    step.run(case='all', ring='step')
+    analytic = make_scr()
+    analytic.run(case='all', ring='analytic', batch=batch)
+    assert_responses(analytic, step)
+
+
+@pytest.mark.parametrize('batch', ['no', 'yes'])
+def test_fft_method_matches_recurrence(batch):
+    ref = make_scr()
+    ref.run(case='all', ring='analytic')
+    fft = make_scr()
+    fft.run(case='all', method='fft', batch=batch)
+    assert_responses(fft, ref, tol=1e-4)
+
+
+def accel_reference(scr):
+    """Function to recover the responses of every case of scr with all modes, atm @ etadd + dtm @ eta, the modal
+    accelerations evaluated from the EOM on the whole integrated history."""
+    omn = 2 * np.pi * np.asarray(scr.eig.frequency)
+    zeta = np.asarray(scr.zeta)[:, np.newaxis]
+    n_rigid = scr.rigid_modes()
+    u = {}
+    for c in scr.pfile.case.keys():
+        time, p_modal = scr.modal_load(c)
+        eta, etad = scr.integrate(time, p_modal, 'recurrence')
+        etadd = p_modal - 2 * zeta * omn[:, np.newaxis] * etad - (omn**2)[:, np.newaxis] * eta
+        eta[0:n_rigid] = 0.0
+        etadd[0:n_rigid] = 0.0
+        u[c] = scr.rss_block(scr.ltm.dtm @ eta + scr.ltm.atm @ etadd)
+    return u
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'ring': 'analytic'}, {'batch': 'yes'}, {'stream': 'yes', 'block': 137}])
+def test_accel_matches_full_recovery(kwargs):
+    ref = make_scr()
+    u_ref = accel_reference(ref)
+    scr = make_scr()
+    scr.run(case='all', accel='yes', **kwargs)
+    for c, u in u_ref.items():
+        tol = 1e-9 * np.abs(u).max()
+        if 'stream' in kwargs:
+            np.testing.assert_allclose(scr.env[c].max, u.max(axis=1), rtol=0, atol=tol)
+            np.testing.assert_allclose(scr.env[c].min, u.min(axis=1), rtol=0, atol=tol)
+        else:
+            np.testing.assert_allclose(np.asarray(scr.u[c]), u, rtol=0, atol=tol)
+
+    # The acceleration terms are not negligible, the displacement recovery alone differs.
+    disp = make_scr()
+    disp.run(case='all')
+    assert np.abs(np.asarray(disp.u[1]) - u_ref[1]).max() > 1e-3 * np.abs(u_ref[1]).max()
+
+
+def test_truncation_matches_full():
+    full = make_scr()
+    full.run(case='all')
+    every = make_scr()
+    every.run(case='all', modes=[1, 20])
+    assert every.modes is None
+    assert_responses(every, full, tol=0.0)
+
+    # The quasi-static residual of the truncated modes brings the truncated run closer to the full one.
+    res = make_scr()
+    res.run(case='all', f_cut=12.0)
+    nores = make_scr()
+    nores.run(case='all', f_cut=12.0, residual='no')
+    assert 0 < res.modes.size < res.phi.num_modes
+    for c in full.u.keys():
+        scale = np.abs(full.u[c]).max()
+        err_res = np.abs(res.u[c] - full.u[c]).max() / scale
+        err_nores = np.abs(nores.u[c] - full.u[c]).max() / scale
+        assert err_res < err_nores
+        assert err_res < 1e-2
+        assert res.residual[c].max() > 0
+        assert nores.residual[c] is None
+
+
+def test_truncated_rigid_modes_have_no_residual():
+    scr = make_scr()
+    scr.run(case='all', modes=[7, 20], rbm='yes')
+    ref = make_scr()
+    ref.run(case='all', rbm='yes')
+    for c in ref.eta.keys():
+        assert not scr.eta[c][0:6].any()
+        np.testing.assert_array_equal(scr.eta[c][6:], ref.eta[c][6:])
+
+
+def test_residual_report(capsys):
+    scr = make_scr()
+    scr.run(case=1, f_cut=12.0)
+    assert capsys.readouterr().out == ''
+    assert 'largest residual response' in scr.report_residual(1)
+    scr.run(case=1, f_cut=12.0, residual='no', verbose='yes')
+    assert 'residual not computed' in capsys.readouterr().out
+
+
+def test_bas_modes_are_explicit():
+    scr = make_scr()
+    with pytest.raises(Exception, match='load_bas'):
+        scr.run(case=1, modes='bas')
+    scr.bas = SimpleNamespace(modes_start=1, modes_end=14, modal_damp_pct='na')
+    scr.run(case=1)
+    assert scr.modes is None
+    scr.run(case=1, modes='bas')
+    np.testing.assert_array_equal(scr.modes, np.arange(14))
+
+
+def test_load_bas_keeps_set_damping(monkeypatch):
+    import PyLnD.loads.scr as scr_module
+    monkeypatch.setattr(scr_module, 'BAS', lambda name: SimpleNamespace(modes_start=1, modes_end=14,
+                                                                        modal_damp_pct=2.0))
+    scr = make_scr()
+    scr.zeta = 0.03 * np.ones(20)
+    scr.load_bas(bas='BASFILE')
+    np.testing.assert_array_equal(scr.zeta, 0.03 * np.ones(20))
+    scr.zeta = 0.01 * np.ones(20)
+    scr.load_bas(bas='BASFILE')
+    np.testing.assert_array_equal(scr.zeta, 0.02 * np.ones(20))
@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+from PyLnD.loads.tests.synthetic import make_scr
+
+
+@pytest.mark.parametrize('method', ['recurrence', 'filter'])
+@pytest.mark.parametrize('block', [1, 137, 100000])
+def test_stream_envelope_matches_memory(tmp_path, method, block):
+    mem = make_scr(same_time=False)
+    mem.run(case='all', method=method)
+    spill = [('A501', 'D3'), (502, 1)]
+    stream = make_scr(same_time=False)
+    stream.run(case='all', method=method, stream='yes', block=block, spill=spill, spill_dir=str(tmp_path))
+
+    for c in mem.u.keys():
+        u = mem.u[c]
+        t = mem.time[c]
+        env = stream.env[c]
+        assert c not in stream.u
+        np.testing.assert_allclose(env.max, u.max(axis=1), rtol=0, atol=1e-12)
+        np.testing.assert_allclose(env.min, u.min(axis=1), rtol=0, atol=1e-12)
+        np.testing.assert_array_equal(env.t_max, t[u.argmax(axis=1)])
+        np.testing.assert_array_equal(env.t_min, t[u.argmin(axis=1)])
+        for i, dof in enumerate(spill):
+            np.testing.assert_allclose(stream.spill[c]['u'][i], u[mem.dof_row(dof)], rtol=0, atol=1e-12)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from PyLnD.loads.tests.synthetic import make_scr
+
+
+@pytest.mark.parametrize('method', ['recurrence', 'filter'])
+def test_nominal_sweep_matches_run(method):
+    ref = make_scr()
+    ref.run(case='all', method=method)
+    scr = make_scr()
+    table = scr.sweep(case='all', freq_scale=[1.0], method=method, block=137)
+    for c in ref.u.keys():
+        u = ref.u[c]
+        tol = 1e-12 * np.abs(u).max()
+        env = scr.env_sweep[c][0]
+        np.testing.assert_allclose(env.max, u.max(axis=1), rtol=0, atol=tol)
+        np.testing.assert_allclose(env.min, u.min(axis=1), rtol=0, atol=tol)
+        np.testing.assert_allclose(table[table['case'] == c]['max'], u.max(axis=1), rtol=0, atol=tol)
+
+
+def test_variants_match_scaled_runs():
+    scale = np.array([0.95, 1.0, 1.05])
+    damp = np.array([0.5, 1.0, 2.0])
+    nominal = make_scr()
+    zeta = nominal.zeta * damp[:, np.newaxis]
+    scr = make_scr()
+    table = scr.sweep(case='all', freq_scale=scale, zeta=zeta, percentiles=[50])
+    for v in range(scale.size):
+        ref = make_scr()
+        ref.eig.frequency = list(np.asarray(ref.eig.frequency) * scale[v])
+        ref.eig.eigenvalues = list(np.asarray(ref.eig.eigenvalues) * scale[v] ** 2)
+        ref.zeta = zeta[v]
+        ref.run(case='all')
+        for c in ref.u.keys():
+            u = ref.u[c]
+            tol = 1e-12 * np.abs(u).max()
+            np.testing.assert_allclose(scr.env_sweep[c][v].max, u.max(axis=1), rtol=0, atol=tol)
+            np.testing.assert_allclose(scr.env_sweep[c][v].min, u.min(axis=1), rtol=0, atol=tol)
+
+    # The table holds the extremes and the median over the variants.
+    for c in scr.env_sweep.keys():
+        rows = table[table['case'] == c]
+        e_max = np.stack([env.max for env in scr.env_sweep[c]], axis=1)
+        np.testing.assert_array_equal(rows['max'], e_max.max(axis=1))
+        np.testing.assert_array_equal(rows['v_max'], e_max.argmax(axis=1))
+        np.testing.assert_allclose(rows['max_p50'], np.median(e_max, axis=1), rtol=0, atol=0)
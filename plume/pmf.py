@@ -160,10 +160,13 @@ class PMF:
         self.time = new_time
         self.pmf = interp_pmf
 
-        # For auto time step, determine the index of the time steps to be kept.
+        # For auto time step, determine the index of the time steps to be kept, one tol per mode or on the sum.
         if self.auto:
-            p_sum = np.sum(np.absolute(self.pmf), axis=0)
-            keep_list = auto_ts(self.time, p_sum, self.tol, self.ring)
+            if np.ndim(self.tol) > 0:
+                keep_list = auto_ts(self.time, self.pmf.T, np.array(self.tol), self.ring)
+            else:
+                p_sum = np.sum(np.absolute(self.pmf), axis=0)
+                keep_list = auto_ts(self.time, p_sum, self.tol, self.ring)
             pmf = np.zeros([self.n_modes, keep_list.__len__()])
             for m in range(0, self.n_modes):
                 pmf[m, :] = self.pmf[m, keep_list]
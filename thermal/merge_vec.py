@@ -101,20 +101,27 @@ class MVEC:
             raise Exception('!!! You must specify which set to look for in the uset table.')
         get_set = kwargs['set']
 
+        # Select the DOF index of the requested set in the uset table.
+        if get_set == 'aset':
+            set_index = self.uset.aset_index
+        elif get_set == 'gset':
+            set_index = self.uset.gset_index
+        elif get_set == 'oset':
+            set_index = self.uset.oset_index
+        else:
+            return
+
         # For each dof in the merge vec dof look up the index in the uset table for the selected set.
         for i, case in self.mvec_dof.items():
             if i not in self.u_pos.keys():
                 self.u_pos[i] = []
-            for dof in case:
-                if get_set == 'aset':
-                    self.u_pos[i].append(self.uset.aset.index(dof) + 1)
-                    self.set_size = self.uset.aset.__len__()
-                if get_set == 'gset':
-                    self.u_pos[i].append(self.uset.gset.index(dof) + 1)
-                    self.set_size = self.uset.gset.__len__()
-                if get_set == 'oset':
-                    self.u_pos[i].append(self.uset.oset.index(dof) + 1)
-                    self.set_size = self.uset.oset.__len__()
+            if case:
+                i_set = set_index.find(case)
+                if (i_set < 0).any():
+                    missing = [dof for dof, j in zip(case, i_set) if j < 0]
+                    raise ValueError('{0} is not in the {1} of the uset table'.format(missing, get_set))
+                self.u_pos[i].extend((i_set + 1).tolist())
+            self.set_size = set_index.__len__()
 
     def write_merge_vec(self, **kwargs):
         """Method to write out the merge vec ot4."""
@@ -4,64 +4,37 @@ import os
 import numpy as np
 import argparse
 from numpy import unravel_index
+from PyLnD.loads.read_op4 import read_ascii_op4
 
 
 class OT4:
     """Class of object that contains NASTRAN op4 matrices."""
 
-    def __init__(self, name):
-        """Method to initialize the OT4 object."""
+    def __init__(self, name, matrices=None):
+        """Method to initialize the OT4 object.
+
+            Ex:  Read only some of the matrices.
+                OT4('s0red_0.ot4', matrices=['KAA', 'MAA'])
+        """
         self.name = name
+        self.matrices = matrices
         self.ot4 = {}
         self.ot4_names = []
         self.read_ot4()
 
     def read_ot4(self):
-        """Method to read the ot4 file."""
-        import time
-
-        # Read the file
-        with open(self.name) as f:
-            lines = f.read().splitlines()
-
-        # Determine the number of matrices in the ot4
-        i_headers = [i for i, val in enumerate(lines) if ',' in val]
-
-        # Determine the name and size of the matrices and allocate.
-        for i in i_headers:
-            matrix_name = lines[i][32:40].rstrip()
-            n_cols = int(lines[i][0:8])
-            n_rows = int(lines[i][8:16])
-            rec_per_line = int(lines[i][43:44])
-            rec_len = int(lines[i][45:47])
-            if matrix_name not in self.ot4.keys():
-                self.ot4[matrix_name] = np.zeros([n_rows, n_cols])
+        """Method to read the ot4 file, the matrices are named by the header name field with trailing blanks
+        removed."""
+
+        matrices = self.matrices
+        if matrices is not None:
+            matrices = [' '.join(matrix_name.split()) for matrix_name in matrices]
+        for matrix in read_ascii_op4(self.name, matrices=matrices).values():
+            matrix_name = matrix['header'][32:40].rstrip()
+            if self.matrices is None or matrix_name in self.matrices:
+                self.ot4[matrix_name] = matrix['data']
                 self.ot4_names.append(matrix_name)
 
-        # Loop over the data and extract the matrices
-        h = 0
-        for i, h in enumerate(i_headers):
-            ns_cols = self.ot4[self.ot4_names[i]].shape[1]
-            ns_rows = self.ot4[self.ot4_names[i]].shape[0]
-            ns_per_rec = int(ns_rows / rec_per_line)
-            ns_stinger = ns_rows % rec_per_line
-            if ns_stinger > 0:
-                ns_per_rec += 1
-            p = h
-            for c in range(0, ns_cols):
-                start = 0
-                for k in range(0, ns_per_rec + 1):
-                    p += 1
-                    if k == ns_per_rec and ns_stinger > 0:
-                        seg_end = ns_stinger
-                    else:
-                        seg_end = rec_per_line
-                    if k > 0:
-                        line_chunk = [lines[p][m:m + rec_len] for m in range(0, len(lines[p]), rec_len)]
-                        line_data = list(map(float, line_chunk[0:seg_end]))
-                        self.ot4[self.ot4_names[i]][start:start + seg_end, c] = line_data
-                        start += seg_end
-
 
 def ot4_compare():
     """Function to compare two ot4 files and their matrices."""